@@ -0,0 +1,73 @@
+"""
+Recall vs latency of the IVF-PQ skill search backend against exact search.
+
+Runs on synthetic clustered unit vectors shaped like all-MiniLM-L6-v2
+embeddings, so no model download is needed:
+
+    python -m benchmarks.ann_recall --sizes 50000 200000 --nprobe 4 8 16 32
+"""
+import time
+import argparse
+import numpy as np
+from utils.skill_index import SkillIndex
+from utils.skill_search import ExactSearch, IVFPQSearch
+
+def synthetic_skills(n: int, dim: int, clusters: int, rng) -> np.ndarray:
+    """Unit vectors scattered around random topic centres"""
+    centres = rng.normal(size=(clusters, dim))
+    vectors = centres[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+def synthetic_queries(vectors: np.ndarray, count: int, skills_per_profile: int, rng):
+    """Profiles are means of a few existing skills, which are excluded from the results"""
+    exclude = [list(rng.choice(len(vectors), skills_per_profile, replace=False)) for _ in range(count)]
+    queries = np.stack([vectors[ids].mean(axis=0) for ids in exclude]).astype(np.float32)
+    return queries, exclude
+
+def time_queries(searcher, queries, exclude, k, **kwargs):
+    latencies = []
+    results = []
+    for row in range(len(queries)):
+        started = time.perf_counter()
+        ids, _ = searcher.search(queries[row:row + 1], k, exclude[row:row + 1], **kwargs)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append(ids[0])
+    return np.array(results), np.array(latencies)
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t[t >= 0])) for f, t in zip(found, truth))
+    return hits / max(1, int((truth >= 0).sum()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50000, 200000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'skills':>8} {'backend':>14} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in args.sizes:
+        vectors = synthetic_skills(size, args.dim, max(10, size // 500), rng)
+        index = SkillIndex([f"skill-{i}" for i in range(size)], vectors, "synthetic")
+        queries, exclude = synthetic_queries(vectors, args.queries, 5, rng)
+
+        exact = ExactSearch(index)
+        truth, latencies = time_queries(exact, queries, exclude, args.k)
+        print(f"{size:>8} {'exact':>14} {1.0:>9.3f} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f}")
+
+        started = time.perf_counter()
+        ann = IVFPQSearch.train(index)
+        print(f"{size:>8} {'ivfpq build':>14} {'':>9} {(time.perf_counter() - started) * 1000:>8.0f}")
+        for nprobe in args.nprobe:
+            found, latencies = time_queries(ann, queries, exclude, args.k, nprobe=nprobe)
+            label = f"ivfpq/{nprobe}"
+            print(f"{size:>8} {label:>14} {recall_at_k(found, truth):>9.3f} "
+                  f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f}")
+
+if __name__ == "__main__":
+    main()
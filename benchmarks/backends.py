@@ -0,0 +1,92 @@
+"""
+Parity and CPU throughput of the embedder and NER inference backends.
+
+Every backend is compared against eager torch: embeddings by cosine
+similarity, NER by overlap of the extracted entity sets. With --check the
+script exits non-zero when a backend falls below the parity thresholds.
+
+    MODEL_BACKEND=torch python -m benchmarks.backends --backends torch onnx openvino-int8 --check
+"""
+import sys
+import time
+import argparse
+import numpy as np
+from utils.model_registry import get_model, BACKENDS
+
+SAMPLE_SKILLS = [
+    "Python", "SQL", "Machine Learning", "Leadership", "Docker", "Kubernetes", "React",
+    "Financial Modeling", "UX Research", "TensorFlow", "Communication", "AWS", "Tableau",
+    "Project Management", "Data Visualization", "Git", "Figma", "Spark", "Pandas", "Java",
+]
+
+SAMPLE_TEXTS = [
+    "Thomas Davis worked at Google and Microsoft as a software engineer using Python and AWS.",
+    "Led a team at Deloitte delivering SAP migrations for clients in London and New York.",
+    "Certified by Amazon Web Services; contributed to TensorFlow and PyTorch at Meta AI.",
+    "Juan Jose Carin, data scientist at Stanford University, built dashboards in Tableau.",
+]
+
+# Minimum agreement with the torch backend
+MIN_EMBEDDING_COSINE = 0.98
+MIN_ENTITY_OVERLAP = 0.9
+
+def embed(backend):
+    return get_model("embedder", backend).encode(SAMPLE_SKILLS, convert_to_numpy=True, normalize_embeddings=True)
+
+def entities(backend):
+    ner = get_model("ner", backend)
+    return [{(e["entity_group"], e["word"]) for e in ner(text)} for text in SAMPLE_TEXTS]
+
+def embedding_cosine(vectors, reference) -> float:
+    """Lowest cosine similarity between a backend's normalized embeddings and the reference ones"""
+    return float(np.min(np.sum(vectors * reference, axis=1)))
+
+def entity_overlap(found, reference) -> float:
+    """Mean Jaccard overlap of the entity sets found per sample text"""
+    return float(np.mean([len(a & b) / max(1, len(a | b)) for a, b in zip(found, reference)]))
+
+def throughput(fn, items, seconds):
+    """Items processed per second, calling fn repeatedly for about `seconds`"""
+    fn()
+    done = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        fn()
+        done += items
+    return done / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--seconds", type=float, default=5.0, help="Timing window per measurement")
+    parser.add_argument("--check", action="store_true", help="Fail if parity is below the thresholds")
+    args = parser.parse_args()
+
+    reference_vectors = embed("torch")
+    reference_entities = entities("torch")
+
+    failures = []
+    print(f"{'backend':>14} {'min cos':>8} {'entity overlap':>15} {'embed/s':>9} {'ner docs/s':>11}")
+    for backend in args.backends:
+        try:
+            vectors = embed(backend)
+            found = entities(backend)
+        except Exception as e:
+            print(f"{backend:>14} unavailable: {e}")
+            continue
+
+        cosine = embedding_cosine(vectors, reference_vectors)
+        overlap = entity_overlap(found, reference_entities)
+        embed_rate = throughput(lambda: embed(backend), len(SAMPLE_SKILLS), args.seconds)
+        ner_rate = throughput(lambda: entities(backend), len(SAMPLE_TEXTS), args.seconds)
+        print(f"{backend:>14} {cosine:>8.4f} {overlap:>15.3f} {embed_rate:>9.0f} {ner_rate:>11.1f}")
+
+        if cosine < MIN_EMBEDDING_COSINE or overlap < MIN_ENTITY_OVERLAP:
+            failures.append(backend)
+
+    if args.check and failures:
+        print(f"❌ Parity check failed for: {', '.join(failures)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
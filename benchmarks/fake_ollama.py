@@ -0,0 +1,193 @@
+"""
+Local stand-in for the Ollama HTTP API, for reproducible offline benchmarks.
+
+Serves /api/chat and /api/generate (streaming and not) with a configurable
+prompt-evaluation latency and generation token rate, and a bounded number
+of parallel generations like OLLAMA_NUM_PARALLEL. The answer is a skills
+JSON built from a small vocabulary matched against the prompt, limited to
+the categories of a JSON schema sent as "format". A failure rate makes a
+share of generations answer HTTP 500, to exercise retries, and a malformed
+rate cuts a share of answers off mid-JSON, to exercise repair.
+
+    python -m benchmarks.fake_ollama --port 11500 --latency 0.5 --tokens-per-second 40
+    OLLAMA_URL=http://127.0.0.1:11500 uvicorn main:app
+    OLLAMA_URLS=http://127.0.0.1:11500,http://127.0.0.1:11501 uvicorn main:app
+"""
+import re
+import random
+import json
+import time
+import asyncio
+import argparse
+import threading
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Skills the fake model "finds" when they occur in the prompt, by category path
+VOCABULARY = {
+    ("technical_skills", "programming_languages"): ["Python", "Java", "SQL", "JavaScript", "R", "C++"],
+    ("technical_skills", "frameworks"): ["React", "Django", "TensorFlow", "Spring", "Flask"],
+    ("technical_skills", "databases"): ["PostgreSQL", "MySQL", "MongoDB", "Redis"],
+    ("technical_skills", "devops_tools"): ["Docker", "Kubernetes", "Git", "Jenkins"],
+    ("technical_skills", "data_science_tools"): ["Pandas", "Spark", "Tableau", "Excel"],
+    ("technical_skills", "design_tools"): ["Figma", "Photoshop"],
+    ("platforms",): ["AWS", "Azure", "GCP", "Salesforce"],
+    ("soft_skills",): ["Leadership", "Communication", "Teamwork", "Problem Solving"],
+    ("certifications",): ["PMP", "CPA"],
+    ("languages",): ["English", "Spanish", "French", "German"],
+    ("domain_skills",): ["Financial Modeling", "Marketing", "Accounting", "Project Management"],
+}
+
+# Characters per generated token, roughly what llama3 tokenizers give for JSON
+CHARS_PER_TOKEN = 4
+
+def schema_paths(schema: dict, prefix: tuple = ()) -> list:
+    """Key paths of the array properties of a JSON schema"""
+    paths = []
+    for key, value in schema.get("properties", {}).items():
+        if value.get("type") == "object":
+            paths.extend(schema_paths(value, prefix + (key,)))
+        else:
+            paths.append(prefix + (key,))
+    return paths
+
+def answer_for(prompt: str, paths=None) -> str:
+    """Skills JSON listing every vocabulary entry that appears in the prompt's resume text"""
+    resume = prompt.split("RESUME TEXT:", 1)[-1].lower()
+    skills = {}
+    for path, words in VOCABULARY.items():
+        if paths is not None and path not in paths:
+            continue
+        found = [word for word in words if re.search(rf"(?<!\w){re.escape(word.lower())}(?!\w)", resume)]
+        if len(path) == 2:
+            skills.setdefault(path[0], {})[path[1]] = found
+        else:
+            skills[path[0]] = found
+    return json.dumps(skills)
+
+def create_app(latency: float = 0.5, tokens_per_second: float = 40.0, parallel: int = 4,
+               failure_rate: float = 0.0, malformed_rate: float = 0.0) -> FastAPI:
+    """
+    latency is the simulated load + prompt evaluation time per request (seconds),
+    tokens_per_second the generation speed, parallel the concurrent generations,
+    failure_rate the share of generations that fail with HTTP 500,
+    malformed_rate the share of answers truncated somewhere in their second half.
+    """
+    app = FastAPI(title="Fake Ollama")
+    slots = asyncio.Semaphore(parallel)
+    stats = {"requests": 0, "active": 0, "failed": 0, "malformed": 0}
+
+    def prompt_of(body: dict) -> str:
+        if "messages" in body:
+            return "\n".join(message.get("content", "") for message in body["messages"])
+        return body.get("prompt", "")
+
+    def timings(prompt: str, tokens: int, started: float, prompt_seconds: float) -> dict:
+        total = time.perf_counter() - started
+        return {
+            "total_duration": int(total * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": len(prompt) // CHARS_PER_TOKEN,
+            "prompt_eval_duration": int(prompt_seconds * 1e9),
+            "eval_count": tokens,
+            "eval_duration": int(max(0.0, total - prompt_seconds) * 1e9),
+        }
+
+    def message(chat: bool, content: str, done: bool, model: str) -> dict:
+        base = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"), "done": done}
+        if chat:
+            base["message"] = {"role": "assistant", "content": content}
+        else:
+            base["response"] = content
+        return base
+
+    async def generate(request: Request, chat: bool):
+        body = await request.json()
+        if random.random() < failure_rate:
+            stats["failed"] += 1
+            return JSONResponse({"error": "simulated failure"}, status_code=500)
+        prompt = prompt_of(body)
+        model = body.get("model", "fake")
+        num_predict = (body.get("options") or {}).get("num_predict")
+        schema = body.get("format")
+        content = answer_for(prompt, schema_paths(schema) if isinstance(schema, dict) else None)
+        if random.random() < malformed_rate:
+            stats["malformed"] += 1
+            content = content[:random.randint(len(content) // 2, len(content) - 1)]
+        if num_predict is not None:
+            content = content[:max(0, num_predict) * CHARS_PER_TOKEN]
+        pieces = [content[i:i + CHARS_PER_TOKEN] for i in range(0, len(content), CHARS_PER_TOKEN)]
+        token_delay = 1.0 / tokens_per_second if tokens_per_second > 0 else 0.0
+
+        async def run():
+            started = time.perf_counter()
+            async with slots:
+                stats["requests"] += 1
+                stats["active"] += 1
+                try:
+                    await asyncio.sleep(latency)
+                    prompt_seconds = time.perf_counter() - started
+                    for piece in pieces:
+                        await asyncio.sleep(token_delay)
+                        yield message(chat, piece, False, model)
+                    final = message(chat, "", True, model)
+                    final.update(timings(prompt, len(pieces), started, prompt_seconds))
+                    yield final
+                finally:
+                    stats["active"] -= 1
+
+        if body.get("stream", True):
+            async def lines():
+                async for part in run():
+                    yield json.dumps(part) + "\n"
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+        final = None
+        async for part in run():
+            final = part
+        final.update(message(chat, content, True, model))
+        return JSONResponse(final)
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        return await generate(request, chat=True)
+
+    @app.post("/api/generate")
+    async def generate_endpoint(request: Request):
+        return await generate(request, chat=False)
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "llama3.2:3b"}]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return {"models": [{"name": "llama3.2:3b"}], **stats}
+
+    return app
+
+def serve_in_thread(port: int, **kwargs):
+    """Starts the fake server on a daemon thread and returns the uvicorn.Server once it is up"""
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(create_app(**kwargs), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name=f"fake-ollama-{port}", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", type=float, default=0.5, help="Prompt evaluation time per request (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Generation speed")
+    parser.add_argument("--parallel", type=int, default=4, help="Concurrent generations")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of generations that fail with HTTP 500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of answers cut off mid-JSON")
+    args = parser.parse_args()
+    app = create_app(args.latency, args.tokens_per_second, args.parallel, args.failure_rate, args.malformed_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
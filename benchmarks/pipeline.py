@@ -0,0 +1,233 @@
+"""
+Benchmarks the parse -> extract -> recommend pipeline, stage by stage and
+end to end, against a local fake Ollama so runs are reproducible offline.
+
+Stages:
+  to_markdown           pdf_to_markdown (pymupdf4llm) on every input PDF
+  extract_all_skills    LLM extraction per resume (result cache cleared each call)
+  extract_skills_logic  NER extraction per resume (needs the NER model)
+  recommend_skills      recommendations per extracted profile (needs the embedder)
+  e2e                   POST /extract-skills/pdf/ against the running app under concurrent load
+
+Inputs are the PDFs in Resumes/ plus generated synthetic resumes. Save a
+report and compare later runs against it to catch regressions:
+
+    python -m benchmarks.pipeline --output baseline.json
+    python -m benchmarks.pipeline --compare baseline.json --tolerance 0.1
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import contextlib
+import numpy as np
+from pathlib import Path
+from benchmarks.fake_ollama import VOCABULARY, serve_in_thread
+from benchmarks.report import (
+    summarize, build_report, print_report, compare_reports, save_report, load_report, REGRESSION_TOLERANCE
+)
+
+STAGES = ("to_markdown", "extract_all_skills", "extract_skills_logic", "recommend_skills", "e2e")
+
+FILLER = (
+    "delivered managed designed built improved reduced costs across teams clients projects reporting "
+    "analysis stakeholders quarterly revenue platform migration customers operations strategy growth "
+    "automated pipelines dashboards processes quality launched mentored coordinated budget"
+).split()
+
+# Source lines per synthetic page (bullets wrap to about two lines each)
+LINES_PER_PAGE = 30
+
+def synthetic_resume_pdf(rng, number: int) -> bytes:
+    """A two-page resume with headings, skills from the fake model's vocabulary and filler text"""
+    import pymupdf
+    skills = [word for words in VOCABULARY.values() for word in words]
+
+    def sentence():
+        words = list(rng.choice(FILLER, 10)) + list(rng.choice(skills, 2))
+        rng.shuffle(words)
+        return " ".join(words).capitalize() + "."
+
+    sections = [
+        f"Candidate {number}\ncandidate{number}@example.com",
+        "SUMMARY\n" + " ".join(sentence() for _ in range(4)),
+        "EXPERIENCE\n" + "\n".join(f"- {sentence()}" for _ in range(18)),
+        "PROJECTS\n" + "\n".join(f"- {sentence()}" for _ in range(8)),
+        "SKILLS\n" + ", ".join(rng.choice(skills, 12, replace=False)),
+        "EDUCATION\nBSc Computer Science, Example University",
+    ]
+    document = pymupdf.open()
+    lines = "\n\n".join(sections).splitlines()
+    for start in range(0, len(lines), LINES_PER_PAGE):
+        page = document.new_page()
+        page.insert_textbox(page.rect + (50, 50, -50, -50), "\n".join(lines[start:start + LINES_PER_PAGE]), fontsize=10)
+    data = document.tobytes()
+    document.close()
+    return data
+
+def load_inputs(resumes_dir: str, synthetic: int, seed: int):
+    rng = np.random.default_rng(seed)
+    pdfs = [(path.name, path.read_bytes()) for path in sorted(Path(resumes_dir).glob("*.pdf"))]
+    pdfs += [(f"synthetic-{i}.pdf", synthetic_resume_pdf(rng, i)) for i in range(synthetic)]
+    return pdfs
+
+def time_calls(fn, items, repeat: int = 1):
+    latencies = []
+    results = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            call_started = time.perf_counter()
+            results.append(fn(item))
+            latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started), results
+
+def flatten_skills(skills: dict):
+    flat = []
+    for values in skills.values():
+        flat.extend(values if isinstance(values, list) else flatten_skills(values))
+    return flat
+
+async def load_test(url: str, pdfs, requests: int, concurrency: int):
+    """Posts PDFs to the app with `concurrency` requests in flight; returns (summary, errors)"""
+    import httpx
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(client, name, data):
+        nonlocal errors
+        async with slots:
+            started = time.perf_counter()
+            try:
+                response = await client.post("/extract-skills/pdf/", files={"file": (name, data, "application/pdf")})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors += 1
+                print(f"❌ {name}: {e}", file=sys.stderr)
+
+    async with httpx.AsyncClient(base_url=url, timeout=600) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(client, *pdfs[i % len(pdfs)]) for i in range(requests)))
+        wall = time.perf_counter() - started
+    summary = summarize(latencies, wall)
+    summary["errors"] = errors
+    return summary
+
+def serve_app(app, port: int):
+    """Runs the FastAPI app on a daemon thread and returns the uvicorn.Server once it is up"""
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="benchmark-app", daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+def run_stages(args) -> dict:
+    """Runs the selected stages and returns (summaries by stage name, number of input PDFs)"""
+    # Configure the app before it is imported: fake Ollama node(s), no result reuse across requests
+    if args.ollama_url:
+        os.environ["OLLAMA_URLS"] = args.ollama_url
+    else:
+        ports = range(args.fake_port, args.fake_port + args.nodes)
+        for port in ports:
+            serve_in_thread(port, latency=args.latency, tokens_per_second=args.tokens_per_second,
+                            parallel=args.parallel)
+        os.environ["OLLAMA_URLS"] = ",".join(f"http://127.0.0.1:{port}" for port in ports)
+    os.environ["NEAR_DUP_MODE"] = "off"
+    os.environ.pop("SKILLS_CACHE_DB", None)
+
+    from utils.extract_text import pdf_to_markdown
+    from utils.extract_skills_ollama import extract_all_skills, skills_cache
+
+    pdfs = load_inputs(args.resumes, args.synthetic, args.seed)
+    print(f"[DEBUG] {len(pdfs)} input PDFs", file=sys.stderr)
+    stages = {}
+
+    texts = [pdf_to_markdown(data) for _, data in pdfs]
+    if "to_markdown" in args.stages:
+        stages["to_markdown"], _ = time_calls(pdf_to_markdown, [data for _, data in pdfs], args.repeat)
+
+    profiles = []
+    if "extract_all_skills" in args.stages or "recommend_skills" in args.stages:
+        def extract(text):
+            skills_cache.clear()
+            return extract_all_skills(text)
+        summary, results = time_calls(extract, texts)
+        profiles = [flatten_skills(skills) for skills in results]
+        if "extract_all_skills" in args.stages:
+            stages["extract_all_skills"] = summary
+
+    if "extract_skills_logic" in args.stages:
+        try:
+            from utils.extract_skills import extract_skills_logic
+            extract_skills_logic(texts[0])
+            stages["extract_skills_logic"], _ = time_calls(extract_skills_logic, texts)
+        except Exception as e:
+            stages["extract_skills_logic"] = {"skipped": f"NER model unavailable ({e})"}
+
+    if "recommend_skills" in args.stages:
+        try:
+            from utils.match_skills import load_skill_db, recommend_skills
+            skill_db = load_skill_db()
+            recommend_skills(profiles[0], [], skill_db)
+            stages["recommend_skills"], _ = time_calls(lambda cv: recommend_skills(cv, [], skill_db), profiles)
+        except Exception as e:
+            stages["recommend_skills"] = {"skipped": f"embedder unavailable ({e})"}
+
+    if "e2e" in args.stages:
+        import main as app_module
+        server = serve_app(app_module.app, args.app_port)
+        # Unique synthetic PDFs so the result cache cannot short-circuit the load test
+        rng = np.random.default_rng(args.seed + 1)
+        load_pdfs = [(f"load-{i}.pdf", synthetic_resume_pdf(rng, 10000 + i)) for i in range(args.requests)]
+        stages["e2e"] = asyncio.run(load_test(f"http://127.0.0.1:{args.app_port}", load_pdfs,
+                                              args.requests, args.concurrency))
+        server.should_exit = True
+
+    return stages, len(pdfs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--resumes", default="Resumes", help="Folder of real PDF resumes")
+    parser.add_argument("--synthetic", type=int, default=24, help="Generated resumes added to the inputs")
+    parser.add_argument("--repeat", type=int, default=2, help="Passes over the inputs for to_markdown")
+    parser.add_argument("--ollama-url", help="Benchmark real Ollama endpoint(s) (comma-separated) instead of the fake one")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake Ollama prompt evaluation time (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Fake Ollama generation speed")
+    parser.add_argument("--parallel", type=int, default=4, help="Fake Ollama concurrent generations")
+    parser.add_argument("--nodes", type=int, default=1, help="Fake Ollama nodes (ports from --fake-port up)")
+    parser.add_argument("--fake-port", type=int, default=11500)
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=64, help="End-to-end requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="End-to-end requests in flight")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="Allowed p95 growth before a stage counts as a regression")
+    args = parser.parse_args()
+
+    # The pipeline's debug output goes to stderr so the report stays readable
+    with contextlib.redirect_stdout(sys.stderr):
+        stages, inputs = run_stages(args)
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    settings["inputs"] = inputs
+    report = build_report(stages, settings)
+    print_report(report)
+
+    if args.output:
+        save_report(report, args.output)
+    if args.compare:
+        regressions = compare_reports(report, load_report(args.compare), args.tolerance)
+        if regressions:
+            print(f"❌ p95 regressed for: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
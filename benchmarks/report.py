@@ -0,0 +1,92 @@
+"""Latency summaries, peak RSS and JSON reports shared by the benchmark scripts."""
+import sys
+import json
+import time
+import platform
+import resource
+import subprocess
+import numpy as np
+from typing import Dict, List, Optional
+
+# A stage regresses when its p95 grows by more than this fraction against the baseline
+REGRESSION_TOLERANCE = 0.10
+
+def summarize(latencies: List[float], wall_seconds: Optional[float] = None) -> dict:
+    """p50/p95/p99/mean in milliseconds, plus throughput over wall_seconds (or the summed latencies)"""
+    if not latencies:
+        return {"count": 0}
+    values = np.asarray(latencies, dtype=np.float64)
+    wall = wall_seconds if wall_seconds is not None else float(values.sum())
+    return {
+        "count": len(values),
+        "p50_ms": round(float(np.percentile(values, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(values, 95)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(values, 99)) * 1000, 3),
+        "mean_ms": round(float(values.mean()) * 1000, 3),
+        "throughput_per_s": round(len(values) / wall, 3) if wall > 0 else None,
+    }
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and its finished children, in MB"""
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return round(max(own, children) / (1024 * 1024), 1)
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+def build_report(stages: Dict[str, dict], settings: dict) -> dict:
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": settings,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+    }
+
+def print_report(report: dict):
+    print(f"{'stage':>22} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'per s':>9}")
+    for name, stage in report["stages"].items():
+        if "skipped" in stage:
+            print(f"{name:>22} skipped: {stage['skipped']}")
+            continue
+        if not stage.get("count"):
+            print(f"{name:>22} {0:>6}")
+            continue
+        print(f"{name:>22} {stage['count']:>6} {stage['p50_ms']:>10.1f} {stage['p95_ms']:>10.1f} "
+              f"{stage['p99_ms']:>10.1f} {stage['throughput_per_s'] or 0:>9.2f}")
+    print(f"peak RSS: {report['peak_rss_mb']} MB")
+
+def compare_reports(report: dict, baseline: dict, tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """Prints p95 and throughput deltas per stage and returns the stages that regressed"""
+    regressions = []
+    print(f"\ncompared with {baseline.get('revision') or 'baseline'} ({baseline.get('created')})")
+    print(f"{'stage':>22} {'p95 ms':>10} {'base':>10} {'delta':>8} {'per s':>9} {'base':>9}")
+    for name, stage in report["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or not stage.get("count") or not base.get("count"):
+            continue
+        delta = stage["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        flag = "  ❌" if delta > tolerance else ""
+        print(f"{name:>22} {stage['p95_ms']:>10.1f} {base['p95_ms']:>10.1f} {delta:>+8.1%} "
+              f"{stage['throughput_per_s'] or 0:>9.2f} {base['throughput_per_s'] or 0:>9.2f}{flag}")
+        if delta > tolerance:
+            regressions.append(name)
+    rss_delta = report["peak_rss_mb"] - baseline.get("peak_rss_mb", report["peak_rss_mb"])
+    print(f"peak RSS: {report['peak_rss_mb']} MB ({rss_delta:+.1f} MB)")
+    return regressions
+
+def save_report(report: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+def load_report(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -1,21 +1,174 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as StarletteUploadFile
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from pydantic import BaseModel
-from typing import List
-from utils.extract_skills_ollama import extract_all_skills
-import pymupdf4llm
+from typing import List, Optional
+from contextlib import asynccontextmanager
+from itertools import chain
+from functools import partial
+from pathlib import Path
+from utils.extract_skills_ollama import extract_all_skills_async, stream_skill_categories, ollama, skills_cache, skills_cache_key
+from utils.batch_extract import extract_batch, iter_zip_sources, shutdown_parse_pool
+from utils.extract_text import pdf_to_markdown
+from utils.model_registry import warmup_in_background, model_status
+from utils.jobs import job_queue, check_webhook, InvalidWebhook, QueueFull
+from utils.singleflight import SingleFlight
+from utils.near_duplicates import get_near_duplicate_index, NEAR_DUP_MODE
+from utils.metrics import IN_FLIGHT, counter, gauge, histogram, render_metrics, stage_timer
+import time
+import logging
 import tempfile
+import hashlib
+import asyncio
+import shutil
+import json
 import os
 
-# Enable debug logs
-DEBUG = True
+# LOG_LEVEL=DEBUG logs prompt previews and raw model output; keep INFO or higher in production
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("main")
+# httpx logs every Ollama call at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# How often (seconds) to check whether the client is still connected
+DISCONNECT_POLL_INTERVAL = 1.0
+
+# Comma-separated models to load in the background at startup, e.g. "embedder,ner".
+# Empty by default so processes that only serve the Ollama path never load them.
+MODEL_WARMUP = [name for name in os.getenv("MODEL_WARMUP", "").split(",") if name.strip()]
+
+# Load the Ollama model at startup so the first requests don't pay for a cold load
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") != "0"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MODEL_WARMUP:
+        warmup_in_background(MODEL_WARMUP)
+    # In the background, so startup is not blocked while Ollama loads (or is down)
+    ollama_warmup = asyncio.create_task(ollama.warmup()) if OLLAMA_WARMUP else None
+    ollama.start_health_checks()
+    job_queue.start()
+    yield
+    await job_queue.stop()
+    if ollama_warmup is not None:
+        ollama_warmup.cancel()
+    # Release the pooled Ollama connections and PDF workers on shutdown
+    await ollama.aclose()
+    shutdown_parse_pool()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="AI Skill Extractor",
     description="Extract job skills from PDF resumes or plain text using Ollama + FastAPI",
-    version="1.1"
+    version="1.1",
+    lifespan=lifespan
+)
+
+HTTP_REQUESTS = counter("skills_http_requests_total", "HTTP requests by route and status")
+HTTP_SECONDS = histogram("skills_http_request_seconds", "HTTP request latency by route")
+
+class RequestMetricsMiddleware:
+    """
+    Counts requests and their latency per route template (not per raw path). Plain
+    ASGI rather than @app.middleware("http"), whose call_next returns once the headers
+    are ready: streamed responses are timed and tracked in flight until the last body
+    chunk has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            with IN_FLIGHT.track(kind="http"):
+                await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the shared scope
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            HTTP_REQUESTS.inc(method=scope["method"], route=path, status=status)
+            HTTP_SECONDS.observe(time.perf_counter() - started, route=path)
+
+app.add_middleware(RequestMetricsMiddleware)
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before the result is ready"""
+
+async def run_until_disconnect(request: Request, coro):
+    """
+    Awaits coro, cancelling it if the client disconnects first so that
+    abandoned requests stop consuming Ollama capacity.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+# Identical requests that arrive while one is already being processed share its parse and LLM run
+extraction_flights = SingleFlight()
+gauge("skills_coalesced_in_flight", "Distinct extractions currently shared by coalesced requests").set_function(
+    lambda: len(extraction_flights.flights)
 )
+gauge("skills_coalesced_requests", "Requests served by joining an identical in-flight extraction").set_function(
+    lambda: extraction_flights.coalesced
+)
+
+async def parse_pdf_shared(file_bytes: bytes) -> str:
+    """pdf_to_markdown off the event loop, coalesced with concurrent uploads of the same file"""
+    key = "pdf:" + hashlib.sha256(file_bytes).hexdigest()
+    return await extraction_flights.do(key, partial(parse_pdf_timed, file_bytes))
+
+async def parse_pdf_timed(file_bytes: bytes) -> str:
+    with stage_timer("pdf_parse"):
+        return await run_in_threadpool(pdf_to_markdown, file_bytes)
+
+async def extract_skills_shared(text: str):
+    """extract_all_skills_async, coalesced with concurrent requests for the same text"""
+    return await extraction_flights.do("text:" + skills_cache_key(text), partial(extract_all_skills_async, text))
+
+async def extract_skills_checked(text: str, name: Optional[str] = None):
+    """
+    Extraction behind the near-duplicate index: returns (skills, match). Only with
+    NEAR_DUP_MODE "reuse" are the skills of an earlier, practically identical resume reused.
+    """
+    if NEAR_DUP_MODE == "off":
+        return await extract_skills_shared(text), None
+    return await get_near_duplicate_index().resolve(text, name, extract_skills_shared)
+
+def skills_json_response(skills: dict, match) -> JSONResponse:
+    """
+    Skills response, with X-Near-Duplicate-Of / X-Near-Duplicate-Similarity headers for
+    near-duplicates. The match is identified by its index id only: the stored filename
+    may belong to another uploader.
+    """
+    headers = {}
+    if match is not None:
+        headers["X-Near-Duplicate-Of"] = str(match.doc_id)
+        headers["X-Near-Duplicate-Similarity"] = str(match.similarity)
+    return JSONResponse(content=skills, headers=headers)
 
 # Models for detailed skills structure
 class TechnicalSkills(BaseModel):
@@ -38,25 +191,38 @@ class SkillsResponse(BaseModel):
 class TextInput(BaseModel):
     text: str
 
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    filename: Optional[str]
+    priority: int
+    status: str
+    result: Optional[SkillsResponse]
+    error: Optional[str]
+    created: float
+    started: Optional[float]
+    finished: Optional[float]
+
 # Extract skills from raw plain text
 @app.post("/extract-skills/text/", response_model=SkillsResponse, summary="Extract skills from plain text")
-async def extract_skills_from_text(data: TextInput):
+async def extract_skills_from_text(data: TextInput, request: Request):
     """
     Accepts raw text and returns extracted skills using Ollama.
     """
     try:
-        skills = extract_all_skills(data.text)
-        if DEBUG:
-            print(f"[DEBUG] Skills extracted successfully: {skills}")
-        return skills
+        skills, match = await run_until_disconnect(request, extract_skills_checked(data.text))
+        logger.debug("Skills extracted successfully: %s", skills)
+        return skills_json_response(skills, match)
+    except ClientDisconnected:
+        logger.info("Client disconnected, extraction cancelled")
+        return JSONResponse(status_code=499, content={"error": "Client disconnected."})
     except Exception as e:
-        if DEBUG:
-            print(f"[ERROR] /extract-skills/text/ failed: {e}")
+        logger.error("/extract-skills/text/ failed: %s", e)
         return JSONResponse(status_code=500, content={"error": f"Ollama failed on text input: {str(e)}"})
 
 # Extract skills from a PDF resume
 @app.post("/extract-skills/pdf/", response_model=SkillsResponse, summary="Extract skills from resume (PDF upload)")
-async def extract_skills_from_pdf(file: UploadFile = File(...)):
+async def extract_skills_from_pdf(request: Request, file: UploadFile = File(...)):
     """
     Accepts a PDF file, extracts text using pymupdf4llm, feeds it to Ollama, and returns extracted skills.
     """
@@ -64,45 +230,277 @@ async def extract_skills_from_pdf(file: UploadFile = File(...)):
         return JSONResponse(status_code=400, content={"error": "Only PDF files are supported."})
 
     try:
-        if DEBUG:
-            print(f"\n[DEBUG] File received: {file.filename}")
+        logger.debug("File received: %s", file.filename)
 
         # Step 1: Read file bytes
-        file_bytes = await file.read()
-
-        # Step 2: Save to temp file for pymupdf4llm
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
-            temp_pdf.write(file_bytes)
-            temp_pdf.flush()
-            temp_path = temp_pdf.name
+        with stage_timer("upload_read"):
+            file_bytes = await file.read()
 
-        if DEBUG:
-            print(f"[DEBUG] Temp file saved at: {temp_path}")
+        # Step 2: Extract text in memory, off the event loop (falls back to plain get_text())
+        plain_text = await parse_pdf_shared(file_bytes)
+        del file_bytes
 
-        # Step 3: Extract plain text from PDF
-        plain_text = pymupdf4llm.to_markdown(temp_path)
+        logger.debug("Extracted text preview: %.500s", plain_text)
 
         if not plain_text.strip():
-            if DEBUG:
-                print("[DEBUG] No text found using to_markdown(); trying fallback...")
-            plain_text = pymupdf4llm.to_markdown(temp_path)
+            return JSONResponse(status_code=422, content={"error": "No text could be extracted from the PDF."})
 
-        if DEBUG:
-            print(f"\n[DEBUG] Extracted Text Preview:\n{plain_text[:500]}\n")
+        # Step 3: Extract skills with Ollama
+        skills, match = await run_until_disconnect(request, extract_skills_checked(plain_text, file.filename))
 
-        # Step 4: Extract skills with Ollama
-        skills = extract_all_skills(plain_text)
+        logger.debug("Skills extracted successfully: %s", skills)
+        return skills_json_response(skills, match)
+
+    except ClientDisconnected:
+        logger.info("Client disconnected, extraction cancelled")
+        return JSONResponse(status_code=499, content={"error": "Client disconnected."})
+    except Exception as e:
+        logger.error("/extract-skills/pdf/ failed: %s", e)
+        return JSONResponse(status_code=500, content={"error": f"PDF processing failed: {str(e)}"})
 
-        # Step 5: Clean up temp file
-        os.remove(temp_path)
-        if DEBUG:
-            print("[DEBUG] Temp file deleted.")
+def format_stream_event(event: dict, sse: bool) -> str:
+    """One streamed event as an SSE message or an NDJSON line"""
+    if sse:
+        name = "result" if "result" in event else "category"
+        return f"event: {name}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
 
-        if DEBUG:
-            print(f"[DEBUG] Skills extracted successfully: {skills}")
-        return skills
+def stream_skills_response(request: Request, text: str) -> StreamingResponse:
+    """
+    Streams each skill category as soon as the model closes it, followed by the full result.
+    Clients sending Accept: text/event-stream get SSE, everyone else NDJSON.
+    """
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def events():
+        async for event in stream_skill_categories(text):
+            yield format_stream_event(event, sse)
+
+    return StreamingResponse(events(), media_type="text/event-stream" if sse else "application/x-ndjson")
+
+# Stream skills from raw plain text
+@app.post("/extract-skills/text/stream/", summary="Stream skills from plain text as each category completes")
+async def stream_skills_from_text(data: TextInput, request: Request):
+    """
+    Same as /extract-skills/text/, but streams {"category", "skills"} events as the
+    model generates them and ends with {"result", "complete"}.
+    """
+    return stream_skills_response(request, data.text)
+
+# Stream skills from a PDF resume
+@app.post("/extract-skills/pdf/stream/", summary="Stream skills from resume (PDF upload) as each category completes")
+async def stream_skills_from_pdf(request: Request, file: UploadFile = File(...)):
+    """
+    Same as /extract-skills/pdf/, but streams {"category", "skills"} events as the
+    model generates them and ends with {"result", "complete"}.
+    """
+    if not file.filename.endswith(".pdf"):
+        return JSONResponse(status_code=400, content={"error": "Only PDF files are supported."})
 
+    try:
+        with stage_timer("upload_read"):
+            file_bytes = await file.read()
+        plain_text = await parse_pdf_shared(file_bytes)
+        del file_bytes
     except Exception as e:
-        if DEBUG:
-            print(f"[ERROR] /extract-skills/pdf/ failed: {e}")
+        logger.error("/extract-skills/pdf/stream/ failed: %s", e)
         return JSONResponse(status_code=500, content={"error": f"PDF processing failed: {str(e)}"})
+
+    if not plain_text.strip():
+        return JSONResponse(status_code=422, content={"error": "No text could be extracted from the PDF."})
+
+    return stream_skills_response(request, plain_text)
+
+def stage_upload(upload: UploadFile, path: Path):
+    """Copies an upload to our own staging file so it outlives the request body"""
+    with open(path, "wb") as out:
+        shutil.copyfileobj(upload.file, out)
+
+# Most parts one batch upload may carry (Starlette's own default is 1000). Larger intakes
+# should be sent as zip archives, which hold any number of PDFs in one part.
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "10000"))
+
+BATCH_REQUEST_BODY = {
+    "required": True,
+    "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "required": ["files"],
+        "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+    }}},
+}
+
+# Extract skills from many PDF resumes, streamed back as NDJSON
+@app.post("/extract-skills/batch/", summary="Extract skills from many resumes (PDF uploads or a zip archive)",
+          openapi_extra={"requestBody": BATCH_REQUEST_BODY})
+async def extract_skills_batch(request: Request):
+    """
+    Accepts up to BATCH_MAX_FILES (default 10000) PDF files and/or zip archives of PDFs
+    as "files" parts; send larger intakes as zip archives. PDFs are parsed in a process
+    pool and fed to Ollama with bounded concurrency. Each resume's result is streamed
+    back as one NDJSON line ({"filename", "skills"} or {"filename", "error"}) as soon
+    as it is ready.
+    """
+    try:
+        form = await request.form(max_files=BATCH_MAX_FILES, max_fields=BATCH_MAX_FILES)
+    except StarletteHTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={
+            "error": f"{str(e.detail).rstrip('.')}. Send at most {BATCH_MAX_FILES} files per request, or zip archives for larger intakes."
+        })
+    files = [item for item in form.getlist("files") if isinstance(item, StarletteUploadFile)]
+    if not files:
+        await form.close()
+        return JSONResponse(status_code=400, content={"error": "Send at least one file as \"files\"."})
+
+    staging = Path(tempfile.mkdtemp(prefix="skills-batch-"))
+    pdf_sources = []
+    zip_paths = []
+    rejected = []
+
+    try:
+        for i, upload in enumerate(files):
+            name = upload.filename or f"upload-{i}"
+            lowered = name.lower()
+            if lowered.endswith(".pdf"):
+                path = staging / f"{i}.pdf"
+                await run_in_threadpool(stage_upload, upload, path)
+                pdf_sources.append((name, partial(str, path)))
+            elif lowered.endswith(".zip"):
+                path = staging / f"{i}.zip"
+                await run_in_threadpool(stage_upload, upload, path)
+                zip_paths.append(path)
+            else:
+                rejected.append({"filename": name, "error": "Only PDF files and zip archives are supported."})
+    except Exception as e:
+        shutil.rmtree(staging, ignore_errors=True)
+        logger.error("/extract-skills/batch/ failed: %s", e)
+        return JSONResponse(status_code=500, content={"error": f"Batch upload failed: {str(e)}"})
+    finally:
+        # The uploads are staged; release their spooled temporary files now
+        await form.close()
+
+    logger.info("Batch received: %d PDFs, %d zip archives", len(pdf_sources), len(zip_paths))
+
+    async def stream_results():
+        try:
+            for result in rejected:
+                yield json.dumps(result) + "\n"
+            sources = chain(pdf_sources, *(iter_zip_sources(path) for path in zip_paths))
+            near_duplicates = get_near_duplicate_index() if NEAR_DUP_MODE != "off" else None
+            async for result in extract_batch(sources, near_duplicates=near_duplicates):
+                yield json.dumps(result) + "\n"
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+# Longest a GET /jobs/{id} may wait for the job to finish
+JOB_MAX_WAIT = 30
+
+# Submit a long-running extraction as a background job
+@app.post("/jobs", response_model=JobStatus, status_code=202, summary="Queue a skill extraction job (PDF upload or text)")
+async def submit_job(
+    file: Optional[UploadFile] = File(None),
+    text: Optional[str] = Form(None),
+    priority: int = Form(0),
+    webhook: Optional[str] = Form(None)
+):
+    """
+    Queues the extraction and returns the job right away; poll GET /jobs/{id} or pass a
+    webhook URL to receive the finished job. Higher priority jobs run first. Submitting
+    the same input while it is still queued or running returns the existing job.
+    Responds 400 for a webhook on a non-public host, and 429 when the queue is full.
+    """
+    if (file is None) == (text is None):
+        return JSONResponse(status_code=400, content={"error": "Send exactly one of file or text."})
+    if webhook:
+        try:
+            await check_webhook(webhook)
+        except InvalidWebhook as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+
+    if file is not None:
+        if not file.filename.endswith(".pdf"):
+            return JSONResponse(status_code=400, content={"error": "Only PDF files are supported."})
+        kind, payload, filename = "pdf", await file.read(), file.filename
+    else:
+        kind, payload, filename = "text", text, None
+
+    try:
+        job = job_queue.submit(kind, payload, priority=priority, webhook=webhook, filename=filename)
+    except QueueFull as e:
+        logger.warning("Job rejected, queue full: %s", e)
+        return JSONResponse(status_code=429, content={"error": "Job queue is full, retry later."},
+                            headers={"Retry-After": "5"})
+
+    logger.debug("Job %s %s (%s, priority %d)", job.id, job.status, kind, job.priority)
+    return JSONResponse(status_code=202, content=job.to_dict(), headers={"Location": f"/jobs/{job.id}"})
+
+# Poll a job
+@app.get("/jobs/{job_id}", response_model=JobStatus, summary="Get a skill extraction job")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Returns the job's status and, once done, its skills. With wait=N the request
+    is held up to N seconds (max 30) until the job finishes.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job."})
+    if wait > 0 and not job.done.is_set():
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout=min(wait, JOB_MAX_WAIT))
+        except asyncio.TimeoutError:
+            pass
+    return job.to_dict()
+
+# Job queue statistics
+@app.get("/jobs", summary="Job queue statistics")
+async def jobs_stats():
+    """
+    Returns job counts by status, queue depth and backend limits.
+    """
+    return job_queue.stats()
+
+# Result cache statistics
+@app.get("/cache/stats", summary="Skill extraction cache statistics")
+async def cache_stats():
+    """
+    Returns hit/miss counters for the extraction cache and the LLM time saved by hits,
+    plus how many requests were coalesced onto an identical in-flight one.
+    """
+    return {**skills_cache.stats(), "coalescing": extraction_flights.stats()}
+
+# Near-duplicate index statistics
+@app.get("/near-duplicates/stats", summary="Near-duplicate resume index statistics")
+async def near_duplicate_stats():
+    """
+    Returns how many resumes are indexed and how many lookups matched or reused an earlier result.
+    """
+    if NEAR_DUP_MODE == "off":
+        return {"mode": "off"}
+    return get_near_duplicate_index().stats()
+
+# Ollama endpoint pool
+@app.get("/ollama/backends", summary="Ollama endpoint pool status")
+async def ollama_backends():
+    """
+    Reports each Ollama endpoint's health, in-flight requests and smoothed latency,
+    plus how many requests were retried on another endpoint or hedged.
+    """
+    return ollama.status()
+
+# Prometheus metrics
+@app.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Per-stage latency histograms, Ollama token rates, request counters and
+    queue / in-flight gauges in the Prometheus text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Local model status
+@app.get("/models", summary="Local model load status")
+async def models():
+    """
+    Reports which local models are loaded, where they were loaded from and how long it took.
+    """
+    return model_status()
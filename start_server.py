@@ -1,14 +1,39 @@
+"""
+Launches the API.
+
+  python start_server.py                 # dev: one uvicorn process with --reload, opens Swagger UI
+  python start_server.py --prod -w 4     # production: pre-forked workers sharing preloaded models
+
+In production mode the parent loads the embedder, the NER model and the skill
+index once, freezes the garbage collector and forks the workers, so the model
+weights and the memory-mapped index are shared copy-on-write instead of
+loaded once per worker. Workers accept on one shared socket, each with its
+own torch thread budget. SIGTERM / Ctrl+C drains in-flight requests for up
+to --drain-timeout seconds before stragglers are killed, and the parent
+prints every worker's RSS / PSS / USS periodically and on demand (SIGUSR1).
+"""
+import os
 import sys
+import gc
+import time
+import signal
+import socket
+import argparse
 import subprocess
 import webbrowser
-import time
 
 API_FILE = "main"
 PORT = "8001"
 URL = f"http://127.0.0.1:{PORT}/docs#/default/extract_skills_extract_skills__post"
 RELOAD = True
 
-def main():
+# Production defaults
+PRELOAD = ("embedder", "ner", "index")
+DRAIN_TIMEOUT = 30
+MEMORY_REPORT_INTERVAL = 300
+LISTEN_BACKLOG = 2048
+
+def run_dev():
     try:
         uvicorn_cmd = [
             sys.executable, "-m", "uvicorn",
@@ -42,5 +67,209 @@ def main():
     except Exception as e:
         print(f"❌ Failed to start FastAPI server: {e}")
 
+def limit_threads(threads: int):
+    """
+    Caps the BLAS / OpenMP / torch thread pools. Must run before torch is
+    imported, so every worker starts with the same small intra-op pool.
+    """
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "INFERENCE_TORCH_THREADS"):
+        os.environ[name] = str(threads)
+    # The tokenizers' Rust thread pool is not fork-safe once it has been used
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+def preload(names):
+    """Loads models and the skill index in the parent so forked workers share them"""
+    from utils.model_registry import warmup
+    started = time.perf_counter()
+    models = [name for name in names if name in ("embedder", "ner")]
+    if models:
+        warmup(models)
+    if "index" in names:
+        from utils.match_skills import get_skill_index, load_skill_db
+        try:
+            get_skill_index(load_skill_db())
+        except Exception as e:
+            print(f"❌ Could not preload the skill index: {e}")
+    print(f"[DEBUG] Preloaded {', '.join(names) or 'nothing'} in {time.perf_counter() - started:.1f}s")
+
+def memory_usage(pid: int) -> dict:
+    """RSS, PSS (shared pages split between sharers) and USS (private pages) of a process, in MB"""
+    import psutil
+    info = psutil.Process(pid).memory_full_info()
+    mb = 1024 * 1024
+    return {
+        "rss": info.rss / mb,
+        "pss": getattr(info, "pss", float("nan")) / mb,
+        "uss": getattr(info, "uss", float("nan")) / mb,
+    }
+
+def print_memory_report(parent: int, workers: dict):
+    print(f"{'process':>16} {'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'USS MB':>9}")
+    total_pss = 0.0
+    for label, pid in [("parent", parent)] + [(f"worker {slot}", pid) for pid, slot in sorted(workers.items(), key=lambda item: item[1])]:
+        try:
+            usage = memory_usage(pid)
+        except Exception as e:
+            print(f"{label:>16} {pid:>8} unavailable ({e})")
+            continue
+        total_pss += usage["pss"]
+        print(f"{label:>16} {pid:>8} {usage['rss']:>9.1f} {usage['pss']:>9.1f} {usage['uss']:>9.1f}")
+    print(f"{'total PSS':>16} {'':>8} {'':>9} {total_pss:>9.1f}")
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(LISTEN_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(app, sock: socket.socket, args):
+    """Child process: fresh per-process state, then uvicorn on the shared socket until told to stop"""
+    import uvicorn
+    from utils.inference_scheduler import configure_torch_threads
+    from utils.extract_skills_ollama import skills_cache
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1):
+        signal.signal(signum, signal.SIG_DFL)
+    gc.enable()
+    configure_torch_threads(args.torch_threads)
+    skills_cache.reopen()
+
+    config = uvicorn.Config(
+        app,
+        log_level=args.log_level,
+        timeout_graceful_shutdown=args.drain_timeout,
+        access_log=False,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+def spawn(app, sock: socket.socket, args, slot: int) -> int:
+    # Otherwise buffered output would be printed by the parent and the child
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(app, sock, args)
+        except BaseException as e:
+            print(f"❌ Worker {slot} crashed: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
+    print(f"[DEBUG] Started worker {slot} (pid {pid})")
+    return pid
+
+def run_prod(args):
+    if not hasattr(os, "fork"):
+        # No fork (Windows): uvicorn's spawn-based workers, each loading its own models
+        import uvicorn
+        print("⚠️ os.fork is unavailable; starting uvicorn workers without shared model memory")
+        uvicorn.run(f"{API_FILE}:app", host=args.host, port=args.port, workers=args.workers,
+                    log_level=args.log_level, timeout_graceful_shutdown=args.drain_timeout)
+        return
+
+    limit_threads(args.torch_threads)
+    # Collections during import and preload would only churn pages that are about to be frozen
+    gc.disable()
+    app = __import__(API_FILE).app
+    preload(args.preload)
+    # Move everything allocated so far out of the collector's reach: children's collections
+    # then never write to these objects' headers, so their pages stay shared
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    print(f"\n✅ Serving {API_FILE}:app on http://{args.host}:{args.port} with {args.workers} workers "
+          f"({args.torch_threads} torch threads each)")
+
+    workers = {spawn(app, sock, args, slot): slot for slot in range(args.workers)}
+    state = {"stopping": False, "report": False}
+
+    def stop(signum, frame):
+        state["stopping"] = True
+
+    def report(signum, frame):
+        state["report"] = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, report)
+
+    next_report = time.monotonic() + 10
+    while not state["stopping"]:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid and pid in workers:
+            slot = workers.pop(pid)
+            print(f"⚠️ Worker {slot} (pid {pid}) exited with status {status}; restarting")
+            time.sleep(1)
+            if not state["stopping"]:
+                workers[spawn(app, sock, args, slot)] = slot
+            continue
+        if state["report"] or (args.memory_report_interval and time.monotonic() >= next_report):
+            state["report"] = False
+            print_memory_report(os.getpid(), workers)
+            next_report = time.monotonic() + args.memory_report_interval
+        time.sleep(0.2)
+
+    shutdown(workers, args.drain_timeout)
+    sock.close()
+
+def shutdown(workers: dict, drain_timeout: float):
+    """Asks every worker to drain (SIGTERM), then kills whatever is left after the timeout"""
+    print(f"\n⛔ Draining {len(workers)} workers (up to {drain_timeout:.0f}s)...")
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + drain_timeout + 5
+    while workers and time.monotonic() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            workers.pop(pid, None)
+        else:
+            time.sleep(0.1)
+    for pid in workers:
+        print(f"⚠️ Worker pid {pid} did not drain in time; killing it")
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+    print("✅ Server stopped cleanly.")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prod", action="store_true", help="Pre-forked production workers instead of the dev server")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(PORT))
+    parser.add_argument("--torch-threads", type=int, help="Intra-op threads per worker (default: cores / workers)")
+    parser.add_argument("--preload", default=",".join(PRELOAD),
+                        help="Comma-separated subset of embedder,ner,index to load before forking")
+    parser.add_argument("--drain-timeout", type=float, default=DRAIN_TIMEOUT,
+                        help="Seconds in-flight requests get to finish on shutdown")
+    parser.add_argument("--memory-report-interval", type=float, default=MEMORY_REPORT_INTERVAL,
+                        help="Seconds between per-worker memory reports (0 disables; SIGUSR1 prints one)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if not args.prod:
+        run_dev()
+        return
+
+    args.workers = max(1, args.workers)
+    args.torch_threads = args.torch_threads or max(1, (os.cpu_count() or 1) // args.workers)
+    args.preload = [name.strip() for name in args.preload.split(",") if name.strip()]
+    run_prod(args)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,44 @@
+import importlib.util
+import pytest
+
+# The torch outputs are the reference, so without torch nothing can be compared
+pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("transformers")
+
+from benchmarks.backends import (
+    MIN_EMBEDDING_COSINE, MIN_ENTITY_OVERLAP, embed, embedding_cosine, entities, entity_overlap,
+)
+from utils.model_registry import BACKENDS
+
+REQUIRES = {"onnx": "optimum.onnxruntime", "openvino": "optimum.intel"}
+
+def installed(module: str) -> bool:
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+def run(fn, backend):
+    # Missing weights (no local export and no hub access) skip; anything else is a failure
+    try:
+        return fn(backend)
+    except OSError as exc:
+        pytest.skip(f"{backend} models unavailable: {exc}")
+
+@pytest.fixture(scope="module")
+def reference():
+    return run(embed, "torch"), run(entities, "torch")
+
+@pytest.fixture(params=[backend for backend in BACKENDS if backend != "torch"])
+def backend(request):
+    module = REQUIRES[request.param.split("-")[0]]
+    if not installed(module):
+        pytest.skip(f"{module} is not installed")
+    return request.param
+
+def test_embeddings_match_torch(backend, reference):
+    assert embedding_cosine(run(embed, backend), reference[0]) >= MIN_EMBEDDING_COSINE
+
+def test_entities_match_torch(backend, reference):
+    assert entity_overlap(run(entities, backend), reference[1]) >= MIN_ENTITY_OVERLAP
@@ -0,0 +1,14 @@
+import asyncio
+import pytest
+from utils import extract_skills_ollama
+from utils.extract_skills_ollama import empty_skills_template, extract_all_skills, extract_all_skills_async
+
+@pytest.fixture
+def no_cache(monkeypatch):
+    monkeypatch.setattr(extract_skills_ollama.skills_cache, "get", lambda key: None)
+
+# Text that leaves no chunks never reaches Ollama: no skills, and no extraction error
+@pytest.mark.parametrize("text", ["", "   \n", "## References\nAvailable on request."])
+def test_text_without_chunks_has_no_skills(no_cache, text):
+    assert extract_all_skills(text) == empty_skills_template()
+    assert asyncio.run(extract_all_skills_async(text)) == empty_skills_template()
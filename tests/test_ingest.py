@@ -0,0 +1,113 @@
+import asyncio
+import os
+from pathlib import Path
+import pytest
+from utils import ingest
+from utils.ingest import FolderIngester
+
+async def fake_extract_batch(sources, **options):
+    """Stands in for the PDF + Ollama pipeline: a file's bytes become its one skill"""
+    for name, path in sources:
+        content = Path(path()).read_text()
+        if content.startswith("fail"):
+            yield {"filename": name, "error": "Ollama unreachable"}
+        else:
+            yield {"filename": name, "skills": {"soft_skills": [content]}}
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "extract_batch", fake_extract_batch)
+    folder = tmp_path / "resumes"
+    folder.mkdir()
+    return folder
+
+def write(folder: Path, name: str, content: str, age: int = 60):
+    path = folder / name
+    path.write_text(content)
+    # Older than the settle window, and a different mtime from any previous version
+    stamp = path.stat().st_mtime - age
+    os.utime(path, (stamp, stamp))
+
+def crash(*args):
+    raise KeyboardInterrupt()
+
+def ingester(folder: Path) -> FolderIngester:
+    root = folder.parent
+    return FolderIngester(str(folder), output_dir=str(root / "out"), manifest_path=str(root / "manifest.db"),
+                          near_dup_mode="off", settle=0)
+
+def run(ingester: FolderIngester) -> dict:
+    return asyncio.run(ingester.run_once())
+
+def test_only_new_or_changed_files_are_extracted(folder):
+    write(folder, "a.pdf", "alpha")
+    write(folder, "b.pdf", "beta")
+    first = ingester(folder)
+    assert run(first)["extracted"] == 2
+    assert run(first)["extracted"] == 0
+
+    write(folder, "b.pdf", "beta v2", age=30)
+    write(folder, "c.pdf", "alpha")  # byte-identical copy of a.pdf
+    counts = run(first)
+    assert (counts["extracted"], counts["duplicates"], counts["unchanged"]) == (1, 1, 1)
+    assert first.manifest.stats() == {"done": 2, "duplicate": 1}
+
+def test_failed_files_are_not_marked_done(folder):
+    write(folder, "a.pdf", "fail once")
+    first = ingester(folder)
+    assert run(first)["failed"] == 1
+    assert not first.writer.existing()
+    assert run(first)["extracted"] == 0
+    first.retry_failed = True
+    assert run(first)["failed"] == 1
+    assert first.manifest.stats() == {"failed": 1}
+
+@pytest.mark.parametrize("moment", ["before_shard", "after_shard", "mid_shard"])
+def test_crash_recovery(folder, monkeypatch, moment):
+    for name in ("a.pdf", "b.pdf"):
+        write(folder, name, name)
+    first = ingester(folder)
+    if moment == "before_shard":
+        # Results extracted and buffered, process dies before the shard is written
+        monkeypatch.setattr(first.writer, "flush", crash)
+    elif moment == "after_shard":
+        # Shard renamed into place, process dies before the manifest records it
+        monkeypatch.setattr(first.manifest, "mark_done", crash)
+    else:
+        # Process dies while the shard is still a temporary file
+        def partial_write():
+            (first.writer.output_dir / "part-crashed.jsonl.tmp").write_text('{"path": "a.pdf"')
+            crash()
+        monkeypatch.setattr(first.writer, "flush", partial_write)
+    with pytest.raises(KeyboardInterrupt):
+        run(first)
+    first.close()
+    monkeypatch.undo()
+    monkeypatch.setattr(ingest, "extract_batch", fake_extract_batch)
+
+    second = ingester(folder)
+    assert not list(second.writer.output_dir.glob("*.tmp"))
+    counts = run(second)
+    if moment == "after_shard":
+        # The written shard is adopted, nothing is extracted twice
+        assert counts["extracted"] == 0
+        assert len(second.writer.existing()) == 1
+    else:
+        assert counts["extracted"] == 2
+    assert second.manifest.stats() == {"done": 2}
+    assert sorted(row["path"] for row in second.current_rows()) == ["a.pdf", "b.pdf"]
+
+def test_changed_file_supersedes_its_older_row(folder):
+    write(folder, "a.pdf", "version 1")
+    write(folder, "b.pdf", "unchanged")
+    ingest_pass = ingester(folder)
+    run(ingest_pass)
+    write(folder, "a.pdf", "version 2", age=30)
+    run(ingest_pass)
+
+    shards = ingest_pass.writer.existing()
+    every_row = [row for name in shards for row in ingest_pass.writer.read_rows(name)]
+    assert len(shards) == 2 and len(every_row) == 3
+    # Older shards still hold version 1; current_rows only yields each file's latest row
+    current = {row["path"]: row["soft_skills"] for row in ingest_pass.current_rows()}
+    assert current == {"a.pdf": ["version 2"], "b.pdf": ["unchanged"]}
@@ -0,0 +1,74 @@
+import asyncio
+import socket
+import httpx
+import pytest
+from utils import jobs
+from utils.jobs import InvalidWebhook, PinnedWebhookTransport, check_webhook
+
+def resolver(*answers):
+    """Fake getaddrinfo returning the next address on each lookup (the last one repeats)"""
+    answers = list(answers)
+
+    async def getaddrinfo(host, port, **kwargs):
+        address = answers.pop(0) if len(answers) > 1 else answers[0]
+        family = socket.AF_INET6 if ":" in address else socket.AF_INET
+        return [(family, socket.SOCK_STREAM, 6, "", (address, port))]
+    return getaddrinfo
+
+def deliver(url, *answers, allowed=()):
+    """Checks url, then POSTs to it through the pinned transport; returns the requests sent"""
+    sent = []
+
+    async def run():
+        asyncio.get_running_loop().getaddrinfo = resolver(*answers)
+        await check_webhook(url)
+        transport = PinnedWebhookTransport()
+        transport.transport = httpx.MockTransport(lambda request: sent.append(request) or httpx.Response(200))
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.post(url, json={})
+
+    original = jobs.WEBHOOK_ALLOWED_HOSTS
+    jobs.WEBHOOK_ALLOWED_HOSTS = set(allowed)
+    try:
+        asyncio.run(run())
+    finally:
+        jobs.WEBHOOK_ALLOWED_HOSTS = original
+    return sent
+
+@pytest.mark.parametrize("url, address, pinned", [
+    ("http://hooks.example.com/done", "93.184.216.34", "http://93.184.216.34/done"),
+    ("https://hooks.example.com:8443/done?x=1", "2606:4700::1111", "https://[2606:4700::1111]:8443/done?x=1"),
+])
+def test_delivery_connects_to_checked_address(url, address, pinned):
+    [request] = deliver(url, address)
+    assert str(request.url) == pinned
+    assert request.headers["host"] == httpx.URL(url).netloc.decode()
+    assert request.extensions.get("sni_hostname") == ("hooks.example.com" if url.startswith("https") else None)
+
+@pytest.mark.parametrize("answers", [
+    ("127.0.0.1",),
+    ("169.254.169.254",),
+    ("10.0.0.5",),
+    ("::1",),
+    # Public when submitted, rebound to loopback by delivery time
+    ("93.184.216.34", "127.0.0.1"),
+])
+def test_non_public_addresses_are_never_contacted(answers):
+    with pytest.raises(InvalidWebhook):
+        deliver("http://hooks.example.com/done", *answers)
+
+@pytest.mark.parametrize("url, allowed, delivered", [
+    ("http://hooks.internal/done", {"hooks.internal"}, True),
+    ("http://hooks.example.com/done", {"hooks.internal"}, False),
+])
+def test_allow_list(url, allowed, delivered):
+    if delivered:
+        assert len(deliver(url, "10.0.0.5", allowed=allowed)) == 1
+    else:
+        with pytest.raises(InvalidWebhook):
+            deliver(url, "93.184.216.34", allowed=allowed)
+
+@pytest.mark.parametrize("url", ["ftp://example.com/", "not a url", "http://[bad/", "http:///path"])
+def test_malformed_webhooks(url):
+    with pytest.raises(InvalidWebhook):
+        asyncio.run(check_webhook(url))
@@ -0,0 +1,69 @@
+import json
+import pytest
+from utils.extract_skills_ollama import empty_skills_template, parse_skills_response, skill_categories
+from utils.json_stream import repair_json
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": [1, 2]}', {"a": [1, 2]}),
+    # Prose and code fences around the object
+    ('Sure! ```json\n{"a": ["x"]}\n``` done', {"a": ["x"]}),
+    # Trailing commas
+    ('{"a": ["x", "y",], }', {"a": ["x", "y"]}),
+    # Missing commas between values and between members
+    ('{"a": ["x" "y"] "b": []}', {"a": ["x", "y"], "b": []}),
+    # A mismatched closer only closes the innermost container
+    ('{"a": {"b": ["x"}, "c": ["y"]}', {"a": {"b": ["x"], "c": ["y"]}}),
+    # Truncated mid-string: the half-written item is dropped
+    ('{"a": ["x", "unfini', {"a": ["x"]}),
+    ('{"t": {"lang": ["Python", "Go"], "fw": ["Dja', {"t": {"lang": ["Python", "Go"], "fw": []}}),
+    # Truncated after a key
+    ('{"a": ["x"], "b":', {"a": ["x"]}),
+    ('{"a": ["x"], "b"', {"a": ["x"]}),
+    # Raw control characters and escapes inside strings
+    ('{"a": "line\nbreak"}', {"a": "line\nbreak"}),
+    ('{"a": "esc \\" quote", "b": ["x\\\\"]}', {"a": 'esc " quote', "b": ["x\\"]}),
+    # Nothing object-like to recover
+    ("no json here", None),
+    ("[1, 2]", None),
+])
+def test_repair_json(text, expected):
+    assert repair_json(text) == expected
+
+def skills(**categories):
+    result = empty_skills_template()
+    for name, items in categories.items():
+        if name in result["technical_skills"]:
+            result["technical_skills"][name] = items
+        else:
+            result[name] = items
+    return result
+
+ALL = skill_categories()
+LANGUAGES = ("technical_skills", "programming_languages")
+FRAMEWORKS = ("technical_skills", "frameworks")
+
+@pytest.mark.parametrize("raw, expected, missing", [
+    # Valid output: validated (duplicates dropped), nothing missing
+    (json.dumps(skills(programming_languages=["Python", "python"], soft_skills=["Teamwork"])),
+     skills(programming_languages=["Python"], soft_skills=["Teamwork"]), []),
+    # Truncated: closed lists are kept, the cut-off and absent ones are missing
+    ('```json\n{"technical_skills": {"programming_languages": ["Go"], "frameworks": ["Dja',
+     skills(programming_languages=["Go"]), [path for path in ALL if path != LANGUAGES]),
+    # Nothing recoverable
+    ("I cannot help with that.", None, ALL),
+])
+def test_parse_skills_response(raw, expected, missing):
+    assert parse_skills_response(raw) == (expected, missing)
+
+def test_parse_skills_response_repairs_missing_commas():
+    raw = ('{"technical_skills": {"programming_languages": ["Go"] "frameworks": ["React"]}, '
+           '"soft_skills": ["Teamwork"],}')
+    parsed, missing = parse_skills_response(raw)
+    assert parsed == skills(programming_languages=["Go"], frameworks=["React"], soft_skills=["Teamwork"])
+    # Only lists that closed cleanly count as complete
+    assert LANGUAGES not in missing and ("soft_skills",) not in missing
+    assert ("platforms",) in missing
+
+@pytest.mark.parametrize("paths", [[LANGUAGES], [FRAMEWORKS, ("platforms",)]])
+def test_parse_skills_response_reports_only_requested_paths(paths):
+    assert parse_skills_response("not json", paths) == (None, paths)
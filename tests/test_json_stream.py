@@ -0,0 +1,34 @@
+import pytest
+from utils.json_stream import CategoryStreamParser
+
+DOCUMENT = (
+    '{"technical_skills": {"languages": ["Python", "C\\"x"], "frameworks": ["React"]}, '
+    '"soft_skills": ["Teamwork", ["nested"]], "x": [{"y": ["z"]}]}'
+)
+DOCUMENT_ARRAYS = [
+    (("technical_skills", "languages"), ["Python", 'C"x']),
+    (("technical_skills", "frameworks"), ["React"]),
+    # Arrays nested in arrays are returned with their parent only
+    (("soft_skills",), ["Teamwork", ["nested"]]),
+    (("x",), [{"y": ["z"]}]),
+]
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, len(DOCUMENT)])
+def test_category_stream_parser_fragment_sizes(size):
+    parser = CategoryStreamParser()
+    completed = []
+    for i in range(0, len(DOCUMENT), size):
+        completed += parser.feed(DOCUMENT[i:i + size])
+    assert completed == DOCUMENT_ARRAYS
+
+@pytest.mark.parametrize("fragments, expected", [
+    # Each array is returned by the feed that closes it
+    (['{"a": ["x"', '], "b": [', '"y"]}'], [[], [(("a",), ["x"])], [(("b",), ["y"])]]),
+    # A key split across fragments
+    (['{"tech', 'nical": {"lan', 'gs": ["Go"]}}'], [[], [], [(("technical", "langs"), ["Go"])]]),
+    # An escape split across fragments, with brackets inside strings
+    (['{"a": ["x\\', '"]", "[y"]}'], [[], [(("a",), ['x"]', "[y"])]]),
+])
+def test_category_stream_parser_boundaries(fragments, expected):
+    parser = CategoryStreamParser()
+    assert [parser.feed(fragment) for fragment in fragments] == expected
@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from utils.near_duplicates import NearDuplicateIndex
+
+WORDS = ("python sql docker kubernetes airflow spark kafka terraform aws gcp react django flask "
+         "pandas numpy pytorch tableau excel jira git linux bash postgres redis mongodb").split()
+CV = " ".join(f"{WORDS[i % len(WORDS)]} project{i}" for i in range(120))
+# One skill swapped: still the same CV, but not an identical copy
+EDITED = CV.replace("tableau", "looker")
+OTHER = " ".join(f"{word} course{i}" for i, word in enumerate(reversed(WORDS * 4)))
+
+class Extractor:
+    def __init__(self, result=None):
+        self.result = {"skills": ["Python"]} if result is None else result
+        self.calls = []
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        await asyncio.sleep(0.01)
+        return self.result
+
+def resolve_all(index, texts, extract, concurrent=False):
+    async def run():
+        if concurrent:
+            return await asyncio.gather(*(index.resolve(text, str(i), extract) for i, text in enumerate(texts)))
+        return [await index.resolve(text, str(i), extract) for i, text in enumerate(texts)]
+    return asyncio.run(run())
+
+def test_edited_copy_is_similar_but_not_identical():
+    index = NearDuplicateIndex(":memory:")
+    similarity = float((index.signature(CV) == index.signature(EDITED)).mean())
+    assert index.threshold < similarity < index.reuse_threshold
+
+@pytest.mark.parametrize("mode, second, reused", [
+    # "flag" reports every near-duplicate but always extracts
+    ("flag", CV, False),
+    ("flag", EDITED, False),
+    # "reuse" skips extraction only for practically identical copies
+    ("reuse", CV, True),
+    ("reuse", EDITED, False),
+])
+def test_modes(mode, second, reused):
+    index, extract = NearDuplicateIndex(":memory:", mode=mode), Extractor()
+    (_, first_match), (skills, match) = resolve_all(index, [CV, second], extract)
+    assert first_match is None
+    assert match is not None and match.name == "0"
+    assert match.similarity >= (index.reuse_threshold if reused else index.threshold)
+    assert skills == {"skills": ["Python"]}
+    assert len(extract.calls) == (1 if reused else 2)
+    assert index.stats()["reused"] == int(reused)
+
+def test_unrelated_documents_do_not_match():
+    index = NearDuplicateIndex(":memory:", mode="reuse")
+    results = resolve_all(index, [CV, OTHER], Extractor())
+    assert [match for _, match in results] == [None, None]
+    assert index.stats()["documents"] == 2
+
+@pytest.mark.parametrize("reuse_threshold, effective, reused", [
+    (0.97, 0.97, False),
+    # A lower reuse threshold lets the edited copy reuse the stored skills
+    (0.6, 0.6, True),
+    # Never below the match threshold itself
+    (0.1, 0.5, True),
+])
+def test_reuse_threshold(reuse_threshold, effective, reused):
+    index, extract = NearDuplicateIndex(":memory:", mode="reuse", reuse_threshold=reuse_threshold), Extractor()
+    assert index.reuse_threshold == effective
+    resolve_all(index, [CV, EDITED], extract)
+    assert len(extract.calls) == (1 if reused else 2)
+
+def test_concurrent_identical_copy_awaits_the_running_extraction():
+    index, extract = NearDuplicateIndex(":memory:", mode="reuse"), Extractor()
+    results = resolve_all(index, [CV, CV], extract, concurrent=True)
+    assert len(extract.calls) == 1
+    assert [skills for skills, _ in results] == [{"skills": ["Python"]}] * 2
+
+def test_failed_extraction_is_replaced_by_the_next_copy():
+    index = NearDuplicateIndex(":memory:", mode="reuse")
+    resolve_all(index, [CV], Extractor(result={"skills": []}))
+    extract = Extractor()
+    # Nothing stored to reuse, so the copy is extracted and its result kept for the original
+    [(_, match)] = resolve_all(index, [CV], extract)
+    assert match.result is None and len(extract.calls) == 1
+    [(skills, match)] = resolve_all(index, [CV], extract)
+    assert match.result == skills == {"skills": ["Python"]} and len(extract.calls) == 1
+    assert index.stats()["documents"] == 1
+
+@pytest.mark.parametrize("mode", ["flag", "reuse"])
+def test_texts_without_words_are_never_matched(mode):
+    index, extract = NearDuplicateIndex(":memory:", mode=mode), Extractor()
+    results = resolve_all(index, ["", "   \n\t", "--- • ---", ""], extract)
+    assert [match for _, match in results] == [None] * 4
+    assert len(extract.calls) == 4
+    assert index.stats()["documents"] == 0
+    assert index.signature("") is None and index.query("") is None and index.add("") is None
+
+def test_off_mode_only_extracts():
+    index, extract = NearDuplicateIndex(":memory:", mode="off"), Extractor()
+    results = resolve_all(index, [CV, CV], extract)
+    assert [match for _, match in results] == [None, None]
+    assert len(extract.calls) == 2
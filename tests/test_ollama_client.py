@@ -0,0 +1,180 @@
+import asyncio
+import time
+import httpx
+import pytest
+from utils import extract_skills_ollama
+from utils.extract_skills_ollama import OLLAMA_EJECT_AFTER, OLLAMA_EJECT_SECONDS, OllamaClient
+
+MESSAGES = [{"role": "user", "content": "resume"}]
+
+class FakeOllama:
+    """
+    Stand-in endpoints behind one httpx.MockTransport, keyed by host. Each host is
+    "ok", "error" (503), "bad_request" (400), "down" (connection refused) or "stall"
+    (never answers until cancelled); every request is recorded.
+    """
+
+    def __init__(self, **behaviours):
+        self.behaviours = behaviours
+        self.calls = []
+        self.cancelled = []
+        self.transport = httpx.MockTransport(self.handle)
+
+    def client(self, hosts, **options) -> OllamaClient:
+        return OllamaClient([f"http://{host}" for host in hosts], transport=self.transport, **options)
+
+    def attempts(self, host: str, path: str = "/api/chat") -> int:
+        return self.calls.count((host, path))
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.calls.append((host, request.url.path))
+        behaviour = self.behaviours[host]
+        if behaviour == "down":
+            raise httpx.ConnectError("connection refused", request=request)
+        if behaviour == "stall":
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                self.cancelled.append(host)
+                raise
+        if behaviour == "error":
+            return httpx.Response(503, json={"error": "overloaded"})
+        if behaviour == "bad_request":
+            return httpx.Response(400, json={"error": "bad request"})
+        return httpx.Response(200, json={"message": {"content": f'{{"served_by": "{host}"}}'}, "done": True})
+
+@pytest.fixture(autouse=True)
+def quick_hedges(monkeypatch):
+    monkeypatch.setattr(extract_skills_ollama, "OLLAMA_HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(extract_skills_ollama, "OLLAMA_HEDGE_FACTOR", 0.0)
+
+def chat(client):
+    async def run():
+        try:
+            return await client.chat_async(MESSAGES, timeout=5)
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("first", ["error", "down"])
+def test_failed_request_is_retried_on_another_endpoint(first):
+    fake = FakeOllama(a=first, b="ok")
+    client = fake.client(["a", "b"], hedge=False)
+    assert chat(client) == '{"served_by": "b"}'
+    assert (fake.attempts("a"), fake.attempts("b")) == (1, 1)
+    assert client.retries == 1
+    assert client.backends[0].failures == 1 and client.backends[1].failures == 0
+
+@pytest.mark.parametrize("retries, attempts", [(0, 1), (1, 2), (2, 3), (5, 3)])
+def test_retry_budget(monkeypatch, retries, attempts):
+    monkeypatch.setattr(extract_skills_ollama, "OLLAMA_RETRIES", retries)
+    fake = FakeOllama(a="error", b="error", c="error")
+    client = fake.client(["a", "b", "c"], hedge=False)
+    with pytest.raises(httpx.HTTPStatusError):
+        chat(client)
+    # Never more attempts than endpoints, and each endpoint is tried at most once
+    assert len(fake.calls) == attempts
+    assert len(set(fake.calls)) == attempts
+
+def test_client_errors_are_not_retried():
+    fake = FakeOllama(a="bad_request", b="ok")
+    client = fake.client(["a", "b"], hedge=False)
+    with pytest.raises(httpx.HTTPStatusError):
+        chat(client)
+    assert fake.calls == [("a", "/api/chat")]
+    # A 4xx says nothing about the endpoint's health
+    assert client.backends[0].failures == 0
+
+def test_failing_endpoint_is_ejected_with_backoff():
+    fake = FakeOllama(a="down", b="ok")
+    client = fake.client(["a", "b"], hedge=False)
+    a, b = client.backends
+    # Keep b the more loaded endpoint, so a is picked first for as long as it is healthy
+    for _ in range(10):
+        b.acquire()
+
+    async def run():
+        for _ in range(OLLAMA_EJECT_AFTER):
+            assert await client.chat_async(MESSAGES, timeout=5) == '{"served_by": "b"}'
+        assert not a.healthy
+        assert a.ejected_until - time.monotonic() == pytest.approx(OLLAMA_EJECT_SECONDS, abs=1)
+
+        # While ejected, requests skip it entirely
+        await client.chat_async(MESSAGES, timeout=5)
+        assert fake.attempts("a") == OLLAMA_EJECT_AFTER
+
+        # Each further failure doubles the ejection
+        a.failed("still down")
+        assert a.ejected_until - time.monotonic() == pytest.approx(2 * OLLAMA_EJECT_SECONDS, abs=1)
+        await client.aclose()
+    asyncio.run(run())
+
+def test_health_check_ejects_and_readmits():
+    fake = FakeOllama(a="down", b="ok")
+    client = fake.client(["a", "b"], hedge=False)
+    a, b = client.backends
+    for _ in range(10):
+        b.acquire()
+
+    async def run():
+        assert await client.check_health() == {"http://a": False, "http://b": True}
+        assert not a.healthy
+        assert await client.chat_async(MESSAGES, timeout=5) == '{"served_by": "b"}'
+
+        fake.behaviours["a"] = "ok"
+        assert await client.check_health() == {"http://a": True, "http://b": True}
+        assert a.healthy and a.failures == 0
+        # Back in rotation, and the less loaded endpoint again
+        assert await client.chat_async(MESSAGES, timeout=5) == '{"served_by": "a"}'
+        await client.aclose()
+    asyncio.run(run())
+    assert fake.attempts("a", "/api/tags") == 2
+
+def test_every_endpoint_ejected_still_tries_the_one_due_back_first():
+    fake = FakeOllama(a="ok", b="ok")
+    client = fake.client(["a", "b"], hedge=False)
+    client.backends[0].ejected_until = time.monotonic() + 60
+    client.backends[1].ejected_until = time.monotonic() + 30
+    assert chat(client) == '{"served_by": "b"}'
+    assert client.backends[1].healthy
+
+def test_slow_request_is_hedged_and_the_loser_cancelled():
+    fake = FakeOllama(a="stall", b="ok")
+    client = fake.client(["a", "b"], hedge=True)
+    a = client.backends[0]
+
+    async def run():
+        reply = await client.chat_async(MESSAGES, timeout=5)
+        # Let the cancelled request unwind
+        for _ in range(5):
+            await asyncio.sleep(0)
+        await client.aclose()
+        return reply
+
+    assert asyncio.run(run()) == '{"served_by": "b"}'
+    assert fake.calls == [("a", "/api/chat"), ("b", "/api/chat")]
+    assert fake.cancelled == ["a"]
+    assert (client.hedges, client.hedge_wins, client.retries) == (1, 1, 0)
+    # The loser is released, not marked failed
+    assert a.in_flight == 0 and a.failures == 0
+
+def test_fast_request_is_not_hedged():
+    fake = FakeOllama(a="ok", b="ok")
+    client = fake.client(["a", "b"], hedge=True)
+    assert chat(client) == '{"served_by": "a"}'
+    assert fake.calls == [("a", "/api/chat")]
+    assert client.hedges == 0
+
+def test_no_hedge_without_an_idle_endpoint():
+    fake = FakeOllama(a="stall", b="ok")
+    client = fake.client(["a", "b"], hedge=True)
+    client.backends[1].acquire()
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.chat_async(MESSAGES, timeout=5), 0.3)
+        await client.aclose()
+    asyncio.run(run())
+    assert fake.calls == [("a", "/api/chat")]
+    assert client.hedges == 0
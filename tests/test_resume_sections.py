@@ -0,0 +1,48 @@
+import pytest
+from utils.resume_sections import chunk_resume
+
+RESUME = """Jane Doe
+jane@example.com
+
+## Personal Details
+Languages: English, German
+
+## Skills
+Python, SQL, Docker
+
+**Experience**
+Data engineer at Acme, built Airflow pipelines.
+
+REFERENCES
+Available on request.
+
+## Declaration
+I hereby declare that the above is true.
+"""
+
+@pytest.mark.parametrize("text, max_chars, expected", [
+    ("", 100, []),
+    ("Python, SQL", 100, ["Python, SQL"]),
+    # Reference and declaration sections are dropped, contact and personal details kept
+    ("## Skills\nPython\n\n## References\nBob", 100, ["## Skills\nPython"]),
+    ("## Contact\nSpeaks French\n\n## Declaration\nTrue", 100, ["## Contact\nSpeaks French"]),
+    ("## 📞 References\nBob\n## Skills\nGo", 100, ["## Skills\nGo"]),
+    # Sections are packed in order until the next one would overflow
+    ("## A\naaaa\n## B\nbbbb\n## C\ncccc", 20, ["## A\naaaa\n\n## B\nbbbb", "## C\ncccc"]),
+    # An oversized section is split on line boundaries
+    ("## A\n" + "x" * 8 + "\n" + "y" * 8, 10, ["## A\n", "x" * 8 + "\n", "y" * 8]),
+    # A single huge line is hard-cut
+    ("z" * 25, 10, ["z" * 10, "z" * 10, "z" * 5]),
+])
+def test_chunk_resume(text, max_chars, expected):
+    assert chunk_resume(text, max_chars) == expected
+
+@pytest.mark.parametrize("max_chars", [40, 60, 100, 6000])
+def test_chunk_resume_keeps_skill_sections(max_chars):
+    chunks = chunk_resume(RESUME, max_chars)
+    assert all(len(chunk) <= max_chars for chunk in chunks)
+    text = "\n".join(chunks)
+    for kept in ("jane@example.com", "English, German", "Python, SQL, Docker", "Airflow"):
+        assert kept in text
+    for dropped in ("Available on request", "hereby declare"):
+        assert dropped not in text
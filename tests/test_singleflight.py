@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from utils.singleflight import SingleFlight
+
+class Work:
+    """A factory whose calls block until released, recording starts and cancellations"""
+
+    def __init__(self, result="done", error=None):
+        self.result = result
+        self.error = error
+        self.started = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+@pytest.mark.parametrize("callers", [1, 2, 10])
+def test_concurrent_callers_share_one_call(callers):
+    async def run():
+        flights, work = SingleFlight(), Work()
+        waiters = [asyncio.create_task(flights.do("key", work)) for _ in range(callers)]
+        await settle()
+        work.release.set()
+        results = await asyncio.gather(*waiters)
+        return flights, work, results
+
+    flights, work, results = asyncio.run(run())
+    assert results == ["done"] * callers
+    assert work.started == 1
+    assert flights.stats() == {"calls": callers, "executions": 1, "coalesced": callers - 1, "in_flight": 0}
+
+def test_different_keys_do_not_share():
+    async def run():
+        flights, first, second = SingleFlight(), Work("a"), Work("b")
+        waiters = [asyncio.create_task(flights.do("a", first)), asyncio.create_task(flights.do("b", second))]
+        await settle()
+        first.release.set()
+        second.release.set()
+        return await asyncio.gather(*waiters)
+    assert asyncio.run(run()) == ["a", "b"]
+
+def test_exception_reaches_every_waiter():
+    async def run():
+        flights, work = SingleFlight(), Work(error=ValueError("boom"))
+        waiters = [asyncio.create_task(flights.do("key", work)) for _ in range(3)]
+        await settle()
+        work.release.set()
+        return flights, work, await asyncio.gather(*waiters, return_exceptions=True)
+
+    flights, work, results = asyncio.run(run())
+    assert [type(result) for result in results] == [ValueError] * 3
+    assert work.started == 1 and not flights.flights
+
+def test_cancelled_waiter_leaves_the_shared_call_running():
+    async def run():
+        flights, work = SingleFlight(), Work()
+        leaving, staying = (asyncio.create_task(flights.do("key", work)) for _ in range(2))
+        await settle()
+        leaving.cancel()
+        await settle()
+        assert leaving.cancelled() and work.cancelled == 0
+        work.release.set()
+        return await staying
+
+    assert asyncio.run(run()) == "done"
+
+def test_last_waiter_leaving_cancels_the_shared_call():
+    async def run():
+        flights, work = SingleFlight(), Work()
+        waiters = [asyncio.create_task(flights.do("key", work)) for _ in range(2)]
+        await settle()
+        for waiter in waiters:
+            waiter.cancel()
+            await settle()
+        assert work.cancelled == 1
+        assert not flights.flights
+
+        # The next caller starts afresh rather than joining the cancelled call
+        waiter = asyncio.create_task(flights.do("key", work))
+        await settle()
+        work.release.set()
+        return work, await waiter
+
+    work, result = asyncio.run(run())
+    assert result == "done" and work.started == 2
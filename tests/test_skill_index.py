@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from utils.skill_index import top_k
+
+@pytest.mark.parametrize("scores, k, expected", [
+    ([0.1, 0.9, 0.5, 0.7], 2, [1, 3]),
+    ([0.1, 0.9, 0.5, 0.7], 1, [1]),
+    # k at or beyond the number of scores returns everything, best first
+    ([0.1, 0.9, 0.5, 0.7], 4, [1, 3, 2, 0]),
+    ([0.1, 0.9, 0.5, 0.7], 10, [1, 3, 2, 0]),
+    ([0.1, 0.9], 0, []),
+    ([], 3, []),
+    # Ties keep their original order
+    ([0.5, 0.5, 0.5], 3, [0, 1, 2]),
+    # One row per query
+    ([[0.1, 0.9, 0.5], [0.8, 0.2, 0.6]], 2, [[1, 2], [0, 2]]),
+])
+def test_top_k(scores, k, expected):
+    result = top_k(np.asarray(scores, dtype=np.float32), k)
+    assert result.tolist() == expected
+
+def test_top_k_matches_full_sort():
+    scores = np.random.default_rng(0).random((5, 1000), dtype=np.float32)
+    assert np.array_equal(top_k(scores, 25), np.argsort(-scores, axis=-1)[:, :25])
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from utils.skill_index import SkillIndex
+from utils.skill_search import ExactSearch, IVFPQSearch
+
+def make_index(model_name="embedder-a", n=600, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return SkillIndex([f"skill {i}" for i in range(n)], vectors, model_name)
+
+@pytest.fixture(scope="module")
+def trained():
+    index = make_index()
+    return index, IVFPQSearch.train(index, nlist=8, subquantizers=4)
+
+@pytest.mark.parametrize("other, expected", [
+    # Same skills and embedder: codes are reused
+    (dict(), "codes"),
+    # Different skill list: only the quantizers are reusable
+    (dict(n=650), "quantizers"),
+    # Different embedder or backend: nothing is reusable
+    (dict(model_name="embedder-b"), None),
+])
+def test_ivfpq_load_matches_index(tmp_path, trained, other, expected):
+    index, searcher = trained
+    searcher.save(tmp_path)
+    loaded = IVFPQSearch.load(make_index(**other), tmp_path)
+    if expected is None:
+        assert loaded is None
+    else:
+        assert (loaded.codes is not None) == (expected == "codes")
+    assert not list(tmp_path.glob("*.tmp"))
+
+def test_ivfpq_finds_exact_neighbours(trained):
+    index, searcher = trained
+    queries = np.asarray(index.embeddings[:5])
+    exact_ids, _ = ExactSearch(index).search(queries, 1, [[]] * 5)
+    ids, _ = searcher.search(queries, 1, [[]] * 5, nprobe=8)
+    assert ids.tolist() == exact_ids.tolist()
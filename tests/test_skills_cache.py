@@ -0,0 +1,108 @@
+import os
+import pytest
+from utils import skills_cache
+from utils.skills_cache import SkillsCache, make_cache_key
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(skills_cache.time, "time", clock)
+    return clock
+
+def hits(cache):
+    stats = cache.stats()
+    return stats["memory_hits"], stats["disk_hits"], stats["misses"]
+
+@pytest.mark.parametrize("with_db", [False, True])
+@pytest.mark.parametrize("age, fresh", [(0, True), (59, True), (61, False)])
+def test_ttl_expiry(tmp_path, clock, with_db, age, fresh):
+    cache = SkillsCache(db_path=str(tmp_path / "cache.db") if with_db else None, ttl_seconds=60)
+    cache.set("key", {"skills": ["Python"]})
+    clock.now += age
+    assert cache.get("key") == ({"skills": ["Python"]} if fresh else None)
+    if not fresh:
+        # Expired entries are dropped from both tiers
+        assert cache.stats()["memory_entries"] == 0
+        assert cache.stats().get("disk_entries", 0) == 0
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = SkillsCache(max_entries=2)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}  # "b" is now the least recently used
+    cache.set("c", {"n": 3})
+    assert [cache.get(key) for key in "abc"] == [{"n": 1}, None, {"n": 3}]
+    assert cache.stats()["evictions"] == 1
+
+def test_get_returns_a_copy(clock):
+    cache = SkillsCache()
+    cache.set("key", {"skills": ["Python"]})
+    cache.get("key")["skills"].append("mutated")
+    assert cache.get("key") == {"skills": ["Python"]}
+
+def test_disk_hit_is_promoted_to_memory(tmp_path, clock):
+    db_path = str(tmp_path / "cache.db")
+    SkillsCache(db_path=db_path).set("key", {"skills": ["Go"]}, cost=2.5)
+
+    cache = SkillsCache(db_path=db_path, max_entries=1)
+    assert cache.get("key") == {"skills": ["Go"]}
+    assert cache.get("key") == {"skills": ["Go"]}
+    assert hits(cache) == (1, 1, 0)
+    assert cache.stats()["saved_seconds"] == 5.0
+
+    # Promotion respects the memory bound; the evicted entry is still on disk
+    SkillsCache(db_path=db_path).set("other", {"skills": ["Rust"]})
+    assert cache.get("other") == {"skills": ["Rust"]}
+    assert cache.stats()["memory_entries"] == 1
+    assert cache.get("key") == {"skills": ["Go"]}
+    assert hits(cache) == (1, 3, 0)
+
+def test_disk_tier_evicts_least_recently_used_past_its_size(tmp_path, clock):
+    value = {"skills": ["x" * 100]}
+    size = len(skills_cache.json.dumps(value))
+    cache = SkillsCache(db_path=str(tmp_path / "cache.db"), max_entries=1, max_db_bytes=2 * size)
+    for key in "ab":
+        clock.now += 1
+        cache.set(key, value)
+    clock.now += 1
+    cache.get("a")
+    clock.now += 1
+    cache.set("c", value)
+    assert cache.stats()["disk_entries"] == 2
+    cache._memory.clear()
+    assert [cache.get(key) is not None for key in "abc"] == [True, False, True]
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_reopen_after_fork(tmp_path, clock):
+    cache = SkillsCache(db_path=str(tmp_path / "cache.db"))
+    cache.set("parent", {"from": "parent"})
+    inherited = cache._db
+
+    pid = os.fork()
+    if pid == 0:
+        # Child: use a fresh connection, then write through it
+        try:
+            cache.reopen()
+            ok = cache._db is not inherited and cache.get("parent") == {"from": "parent"}
+            cache.set("child", {"from": "child"})
+        except BaseException:
+            ok = False
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert cache.get("child") == {"from": "child"}
+
+@pytest.mark.parametrize("a, b, same", [
+    ("Python  developer\n", "Python developer", True),
+    ("ﬁnance", "finance", True),
+    ("Python developer", "Java developer", False),
+])
+def test_cache_key_normalizes_text(a, b, same):
+    assert (make_cache_key(a, "m", 1, {}) == make_cache_key(b, "m", 1, {})) == same
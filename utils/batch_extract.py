@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterable, Iterator, Optional, Tuple
+from utils.extract_text import pdf_to_markdown
+from utils.extract_skills_ollama import extract_all_skills_async
+from utils.near_duplicates import NearDuplicateIndex
+from utils.metrics import IN_FLIGHT, stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Worker processes running pymupdf4llm (CPU bound)
+PARSE_WORKERS = os.cpu_count() or 1
+
+# Concurrent Ollama generations per batch
+LLM_CONCURRENCY = 4
+
+# A source is a display name plus a loader returning a PDF path or the PDF bytes.
+# Loaders are only called once a document is admitted, so a batch never holds
+# more than max_in_flight documents in memory.
+Source = Tuple[str, Callable[[], object]]
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_workers = 0
+
+def get_parse_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Returns the shared PDF parsing process pool, creating it on first use"""
+    global _parse_pool, _parse_pool_workers
+    max_workers = max_workers or PARSE_WORKERS
+    if _parse_pool is None or _parse_pool_workers != max_workers:
+        shutdown_parse_pool()
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        _parse_pool_workers = max_workers
+    return _parse_pool
+
+def shutdown_parse_pool():
+    """Stops the parsing workers (called on app shutdown)"""
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
+def iter_folder_sources(folder: Path) -> Iterator[Source]:
+    """Yields every PDF in a folder; workers read the files themselves"""
+    for pdf_file in sorted(Path(folder).glob("*.pdf")):
+        yield pdf_file.name, partial(str, pdf_file)
+
+def iter_zip_sources(zip_path: Path) -> Iterator[Source]:
+    """
+    Yields every PDF inside a zip archive; members are read on admission.
+    The archive stays open for as long as any loader still references it.
+    """
+    archive = zipfile.ZipFile(zip_path)
+    for info in archive.infolist():
+        name = info.filename
+        if info.is_dir() or not name.lower().endswith(".pdf") or name.startswith("__MACOSX/"):
+            continue
+        yield name, partial(archive.read, info)
+
+async def extract_batch(sources: Iterable[Source], parse_workers: Optional[int] = None,
+                        llm_concurrency: int = LLM_CONCURRENCY,
+                        max_in_flight: Optional[int] = None,
+                        near_duplicates: Optional[NearDuplicateIndex] = None) -> AsyncIterator[dict]:
+    """
+    Parses PDFs in a process pool and extracts skills with bounded Ollama
+    concurrency. Yields {"filename", "skills"} (or {"filename", "error"})
+    for each document as soon as it finishes, in completion order.
+    With a near-duplicate index, results for documents matching an earlier
+    one also carry "near_duplicate_of" (the earlier one's index id) and "similarity".
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_parse_pool(parse_workers)
+    max_in_flight = max_in_flight or ((parse_workers or PARSE_WORKERS) * 2 + llm_concurrency)
+    window = asyncio.Semaphore(max_in_flight)
+    llm_slots = asyncio.Semaphore(llm_concurrency)
+    results: asyncio.Queue = asyncio.Queue()
+    tasks = set()
+    done_marker = object()
+
+    async def extract(text: str) -> dict:
+        async with llm_slots:
+            return await extract_all_skills_async(text)
+
+    async def process(name: str, load: Callable[[], object]):
+        IN_FLIGHT.inc(kind="batch_document")
+        try:
+            source = await loop.run_in_executor(None, load)
+            with stage_timer("pdf_parse"):
+                text = await loop.run_in_executor(pool, pdf_to_markdown, source)
+            del source
+            if not text.strip():
+                raise ValueError("No text could be extracted from PDF")
+            if near_duplicates is None:
+                skills, match = await extract(text), None
+            else:
+                skills, match = await near_duplicates.resolve(text, name, extract)
+            result = {"filename": name, "skills": skills}
+            if match is not None:
+                result["near_duplicate_of"] = match.doc_id
+                result["similarity"] = match.similarity
+            await results.put(result)
+        except Exception as e:
+            logger.error("Error processing %s: %s", name, e)
+            await results.put({"filename": name, "error": str(e)})
+        finally:
+            IN_FLIGHT.dec(kind="batch_document")
+            window.release()
+
+    async def feed():
+        try:
+            for name, load in sources:
+                await window.acquire()
+                task = asyncio.create_task(process(name, load))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            await results.put(done_marker)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            result = await results.get()
+            if result is done_marker:
+                break
+            yield result
+        await feeder
+    finally:
+        # Stop admitting and abort outstanding work if the consumer goes away early
+        feeder.cancel()
+        for task in list(tasks):
+            task.cancel()
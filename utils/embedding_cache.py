@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import asyncio
+import logging
+import threading
+import unicodedata
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.inference_scheduler import InferenceScheduler, inference_setting
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# In-memory LRU tier (rows of one preallocated matrix) and the on-disk tier; EMBEDDING_CACHE_DIR="" disables disk
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/embedding_cache")
+
+# Cache misses from concurrent callers are encoded together: up to this many strings per
+# forward pass, waiting at most this long (seconds) for more to arrive.
+# EMBEDDER_MAX_BATCH / EMBEDDER_MAX_WAIT (or INFERENCE_MAX_BATCH / INFERENCE_MAX_WAIT) override them.
+EMBED_BATCH_MAX = inference_setting("EMBEDDER", "MAX_BATCH", 256)
+EMBED_BATCH_WAIT = inference_setting("EMBEDDER", "MAX_WAIT", 0.005)
+
+VECTORS_FILE = "vectors.f32"
+KEYS_FILE = "keys.tsv"
+META_FILE = "meta.json"
+
+def normalize_skill(skill: str) -> str:
+    """
+    Cache key for a skill string. The embedder's tokenizer is uncased, so
+    case and whitespace variants embed identically and share one entry.
+    """
+    return " ".join(unicodedata.normalize("NFKC", skill).lower().split())
+
+class DiskVectors:
+    """
+    Append-only store of normalized vectors: a raw float32 file that is
+    memory-mapped for reads, plus a key -> row list. Vectors are written
+    before their keys, so a crash never leaves a key pointing at a missing row.
+    """
+
+    def __init__(self, directory: str, signature: str, dim: int):
+        self.directory = Path(directory)
+        self.dim = dim
+        self.rows: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path = self.directory / META_FILE
+        meta = {"signature": signature, "dim": dim}
+        if meta_path.exists() and json.loads(meta_path.read_text(encoding="utf-8")) != meta:
+            logger.warning("Embedding cache at %s is for another model, starting over", self.directory)
+            for name in (VECTORS_FILE, KEYS_FILE):
+                (self.directory / name).unlink(missing_ok=True)
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+        self._load_keys()
+
+    def _available_rows(self) -> int:
+        path = self.directory / VECTORS_FILE
+        return path.stat().st_size // (4 * self.dim) if path.exists() else 0
+
+    def _load_keys(self):
+        path = self.directory / KEYS_FILE
+        available = self._available_rows()
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    row, _, key = line.rstrip("\n").partition("\t")
+                    if row.isdigit() and int(row) < available:
+                        self.rows[key] = int(row)
+
+    def _mapped(self, row: int) -> np.ndarray:
+        """The memory map, remapped when rows were appended since it was opened"""
+        if self._matrix is None or row >= self._matrix.shape[0]:
+            self._matrix = np.memmap(self.directory / VECTORS_FILE, dtype=np.float32, mode="r",
+                                     shape=(self._available_rows(), self.dim))
+        return self._matrix
+
+    def get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            found = {key: self.rows[key] for key in keys if key in self.rows}
+            if not found:
+                return {}
+            matrix = self._mapped(max(found.values()))
+            return {key: np.array(matrix[row]) for key, row in found.items()}
+
+    def put(self, keys: List[str], vectors: np.ndarray):
+        with self._lock, open(self.directory / KEYS_FILE, "a", encoding="utf-8") as keys_file:
+            if fcntl is not None:
+                fcntl.flock(keys_file, fcntl.LOCK_EX)
+            try:
+                with open(self.directory / VECTORS_FILE, "ab") as f:
+                    first = f.tell() // (4 * self.dim)
+                    f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                keys_file.write("".join(f"{first + i}\t{key}\n" for i, key in enumerate(keys)))
+                keys_file.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(keys_file, fcntl.LOCK_UN)
+            for i, key in enumerate(keys):
+                self.rows[key] = first + i
+
+class EmbeddingCache:
+    """
+    String -> vector cache in front of the skill embedder. Tier 1 is an LRU
+    over the rows of one preallocated matrix, tier 2 an optional memory-mapped
+    file shared across restarts and worker processes. Misses from concurrent
+    callers are batched by the embedder's InferenceScheduler, and a string
+    already being encoded is never submitted twice.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], signature: str,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES, directory: Optional[str] = EMBEDDING_CACHE_DIR,
+                 batch_max: int = EMBED_BATCH_MAX, batch_wait: float = EMBED_BATCH_WAIT):
+        self.encode_batch = encode
+        self.signature = signature
+        self.max_entries = max_entries
+        self.directory = directory
+        self.batch_max = batch_max
+        self.batch_wait = batch_wait
+        self.dim: Optional[int] = None
+        self.disk: Optional[DiskVectors] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self.scheduler = InferenceScheduler("embedder", self._encode_and_store, max_batch=batch_max, max_wait=batch_wait)
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "encoded": 0}
+        # Reopen a disk tier written earlier, so hits do not wait for the first encode
+        meta_path = Path(self._disk_directory(), META_FILE) if directory else None
+        if meta_path is not None and meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("signature") == signature:
+                self._init_storage(meta["dim"])
+
+    def _disk_directory(self) -> str:
+        return os.path.join(self.directory, re.sub(r"[^\w.-]+", "_", self.signature))
+
+    def _init_storage(self, dim: int):
+        self.dim = dim
+        self._matrix = np.zeros((self.max_entries, dim), dtype=np.float32)
+        if self.directory:
+            self.disk = DiskVectors(self._disk_directory(), self.signature, dim)
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Stores a vector in the LRU tier, reusing the least recently used row when full (lock held)"""
+        slot = self._slots.get(key)
+        if slot is None:
+            if len(self._slots) < self.max_entries:
+                slot = len(self._slots)
+            else:
+                _, slot = self._slots.popitem(last=False)
+            self._slots[key] = slot
+        else:
+            self._slots.move_to_end(key)
+        self._matrix[slot] = vector
+
+    def encode(self, skills: List[str]) -> np.ndarray:
+        """Normalized float32 vectors for skills, one row per input string"""
+        keys = [normalize_skill(skill) for skill in skills]
+        vectors, futures = self._resolve(keys)
+        vectors.update({key: future.result() for key, future in futures.items()})
+        return self._stack(keys, vectors)
+
+    async def encode_async(self, skills: List[str]) -> np.ndarray:
+        """Awaitable version of encode; cache misses are awaited instead of blocking the loop"""
+        keys = [normalize_skill(skill) for skill in skills]
+        vectors, futures = self._resolve(keys)
+        if futures:
+            results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures.values()))
+            vectors.update(zip(futures, results))
+        return self._stack(keys, vectors)
+
+    def _resolve(self, keys: List[str]) -> Tuple[Dict[str, np.ndarray], Dict[str, Future]]:
+        """Cached vectors for keys, plus futures for the ones that have to be encoded"""
+        unique = list(dict.fromkeys(keys))
+        vectors = self.lookup(unique)
+        missing = [key for key in unique if key not in vectors]
+        return vectors, self._submit(missing) if missing else {}
+
+    def _stack(self, keys: List[str], vectors: Dict[str, np.ndarray]) -> np.ndarray:
+        if not keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    def lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for normalized keys, from memory or disk"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                slot = self._slots.get(key)
+                if slot is not None:
+                    self._slots.move_to_end(key)
+                    found[key] = self._matrix[slot].copy()
+            self._stats["memory_hits"] += len(found)
+        rest = [key for key in keys if key not in found]
+        if rest and self.disk is not None:
+            from_disk = self.disk.get(rest)
+            with self._lock:
+                for key, vector in from_disk.items():
+                    self._remember(key, vector)
+                self._stats["disk_hits"] += len(from_disk)
+            found.update(from_disk)
+        return found
+
+    def _submit(self, keys: List[str]) -> Dict[str, Future]:
+        """Sends keys to the embedder's scheduler, joining any that are already being encoded"""
+        futures = {}
+        with self._lock:
+            self._stats["misses"] += len(keys)
+            new = []
+            for key in keys:
+                future = self._pending.get(key)
+                if future is None:
+                    new.append(key)
+                else:
+                    futures[key] = future
+            for key, future in zip(new, self.scheduler.submit_many(new)):
+                self._pending[key] = futures[key] = future
+                future.add_done_callback(lambda _, key=key: self._pending.pop(key, None))
+        return futures
+
+    def _encode_and_store(self, keys: List[str]) -> List[np.ndarray]:
+        """Scheduler batch: encodes keys and stores the vectors in both tiers"""
+        vectors = np.asarray(self.encode_batch(keys), dtype=np.float32)
+        with self._lock:
+            if self._matrix is None:
+                self._init_storage(vectors.shape[1])
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            self._stats["encoded"] += len(keys)
+        if self.disk is not None:
+            try:
+                self.disk.put(keys, vectors)
+            except OSError as e:
+                logger.warning("Could not write embeddings to %s: %s", self.disk.directory, e)
+        return list(vectors)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._slots)
+        stats["disk_entries"] = len(self.disk.rows) if self.disk is not None else 0
+        stats["batches"] = self.scheduler.stats()["batches"]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else None
+        return stats
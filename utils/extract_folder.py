@@ -1,40 +1,118 @@
 import os
-import pymupdf4llm
+import sys
+import json
+import logging
+import asyncio
+import argparse
+import contextlib
 from pathlib import Path
+from utils.extract_text import pdf_to_markdown
+from utils.batch_extract import (
+    extract_batch, iter_folder_sources, iter_zip_sources, shutdown_parse_pool,
+    PARSE_WORKERS, LLM_CONCURRENCY
+)
+from utils.near_duplicates import get_near_duplicate_index, NEAR_DUP_MODE
+from utils.ingest import ingest_folder, INGEST_OUTPUT_DIR, INGEST_MANIFEST, INGEST_FORMAT, POLL_INTERVAL
 
-def process_pdfs_in_folder(pdf_folder_path):
+logger = logging.getLogger(__name__)
+
+def process_pdfs_in_folder(pdf_folder_path, extract_skills=False, output_path=None,
+                           parse_workers=PARSE_WORKERS, llm_concurrency=LLM_CONCURRENCY,
+                           near_dup_mode=NEAR_DUP_MODE):
+    """
+    Previews every PDF in a folder, or with extract_skills=True runs the batch
+    pipeline and writes one NDJSON line per resume to output_path (stdout if None).
+    pdf_folder_path may also point at a zip archive of PDFs. Near-duplicates of
+    resumes seen before are flagged (near_dup_mode "flag"), also reuse the stored
+    skills when practically identical ("reuse"), or are not checked ("off").
+    """
     try:
         pdf_folder = Path(pdf_folder_path)
-        
-        print(f"[DEBUG] Checking folder at: {pdf_folder_path}")
+
+        logger.debug("Checking folder at: %s", pdf_folder_path)
         if not pdf_folder.exists():
-            print(f"❌ Error: Folder not found at '{pdf_folder_path}'")
+            logger.error("Folder not found at '%s'", pdf_folder_path)
             return
-        
+
+        if extract_skills:
+            asyncio.run(extract_folder_skills(pdf_folder, output_path, parse_workers, llm_concurrency, near_dup_mode))
+            return
+
         pdf_files = list(pdf_folder.glob("*.pdf"))
-        print(f"[DEBUG] Number of PDF files found: {len(pdf_files)}")
-        
+        logger.info("Number of PDF files found: %d", len(pdf_files))
+
         if not pdf_files:
-            print(f"⚠️ No PDF files found in '{pdf_folder}'")
+            logger.warning("No PDF files found in '%s'", pdf_folder)
             return
-        
+
         for pdf_file in pdf_files:
-            print(f"\n[DEBUG] Processing file: {pdf_file.name}")
+            print(f"\nProcessing file: {pdf_file.name}")
             print("-" * 50)
 
             try:
-                md_text = pymupdf4llm.to_markdown(str(pdf_file))
-                print(f"[DEBUG] Extracted markdown preview (first 500 chars):\n{md_text[:500]}")
+                md_text = pdf_to_markdown(str(pdf_file))
+                print(f"Extracted markdown preview (first 500 chars):\n{md_text[:500]}")
 
             except Exception as e:
-                print(f"❌ Error processing {pdf_file.name}: {str(e)}")
+                logger.error("Error processing %s: %s", pdf_file.name, e)
 
             print("-" * 50)
             print("\n")
 
     except Exception as e:
-        print(f"❌ Unexpected error: {str(e)}")
+        logger.exception("Unexpected error: %s", e)
+
+async def extract_folder_skills(pdf_folder, output_path, parse_workers, llm_concurrency, near_dup_mode=NEAR_DUP_MODE):
+    """Streams skills for every PDF in a folder (or zip archive) to NDJSON"""
+    if pdf_folder.is_file() and pdf_folder.suffix.lower() == ".zip":
+        sources = iter_zip_sources(pdf_folder)
+    else:
+        sources = iter_folder_sources(pdf_folder)
+
+    out = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    count = 0
+    # Keep stray library prints off stdout so it stays valid NDJSON
+    with contextlib.redirect_stdout(sys.stderr):
+        near_duplicates = get_near_duplicate_index(near_dup_mode) if near_dup_mode != "off" else None
+        try:
+            async for result in extract_batch(sources, parse_workers=parse_workers, llm_concurrency=llm_concurrency,
+                                              near_duplicates=near_duplicates):
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                count += 1
+        finally:
+            if output_path:
+                out.close()
+            shutdown_parse_pool()
+    logger.info("Extracted skills for %d resumes", count)
 
 if __name__ == "__main__":
-    pdf_folder_path = r"./Resumes"
-    process_pdfs_in_folder(pdf_folder_path)
+    parser = argparse.ArgumentParser(description="Preview or batch-extract skills from a folder of PDF resumes")
+    parser.add_argument("folder", nargs="?", default=r"./Resumes", help="Folder of PDFs or a zip archive")
+    parser.add_argument("--extract", action="store_true", help="Extract skills with Ollama and emit NDJSON")
+    parser.add_argument("--output", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=PARSE_WORKERS, help="PDF parsing processes")
+    parser.add_argument("--llm-concurrency", type=int, default=LLM_CONCURRENCY, help="Concurrent Ollama requests")
+    parser.add_argument("--near-dup", choices=["reuse", "flag", "off"], default=NEAR_DUP_MODE,
+                        help="Flag, reuse (only near-identical copies) or ignore near-duplicates of resumes seen before")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Extract only PDFs that are new or changed since the last run, into shards")
+    parser.add_argument("--watch", action="store_true", help="Like --incremental, then keep polling the folder")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help="Seconds between scans with --watch")
+    parser.add_argument("--ingest-dir", default=INGEST_OUTPUT_DIR, help="Shard directory for --incremental / --watch")
+    parser.add_argument("--manifest", default=INGEST_MANIFEST, help="Manifest of already ingested files")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default=INGEST_FORMAT, help="Shard format")
+    parser.add_argument("--retry-failed", action="store_true", help="Retry files that failed before even if unchanged")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "INFO"), help="Logging level (logs go to stderr)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.incremental or args.watch:
+        stats = ingest_folder(args.folder, watch=args.watch, poll_interval=args.poll_interval,
+                              output_dir=args.ingest_dir, manifest_path=args.manifest, fmt=args.format,
+                              parse_workers=args.workers, llm_concurrency=args.llm_concurrency,
+                              near_dup_mode=args.near_dup, retry_failed=args.retry_failed)
+        logger.info("Manifest: %s", stats)
+    else:
+        process_pdfs_in_folder(args.folder, args.extract, args.output, args.workers, args.llm_concurrency,
+                               args.near_dup)
@@ -1,11 +1,21 @@
-from transformers import pipeline
+from typing import List, Union
+from utils.model_registry import get_ner_pipeline
+from utils.inference_scheduler import InferenceScheduler, inference_setting
 
-# Load the BERT NER pipeline once
-ner_pipeline = pipeline("token-classification", model="dslim/bert-base-NER", aggregation_strategy="simple")
+# Long resumes are split into 512-token windows that overlap by this many tokens,
+# so entities on a window boundary are seen whole; overlapping hits are merged
+NER_STRIDE = 128
 
-def extract_skills_logic(text: str):
-    entities = ner_pipeline(text)
+# Windows per forward pass, batched across chunks and across documents
+NER_BATCH_SIZE = 16
 
+# Documents gathered from concurrent callers into one scheduled pipeline call, and how long
+# (seconds) to wait for them. NER_MAX_BATCH / NER_MAX_WAIT (or INFERENCE_MAX_BATCH /
+# INFERENCE_MAX_WAIT) override them.
+NER_MAX_DOCUMENTS = inference_setting("NER", "MAX_BATCH", 8)
+NER_MAX_WAIT = inference_setting("NER", "MAX_WAIT", 0.005)
+
+def _clean_entities(entities) -> List[str]:
     # Step 1: Filter labels
     relevant = [e for e in entities if e['entity_group'] in ["ORG", "MISC", "PER"]]
 
@@ -21,3 +31,41 @@ def extract_skills_logic(text: str):
 
     # Step 3: Return unique results
     return list(set(cleaned))
+
+def _run_ner(texts: List[str]) -> List[List[str]]:
+    # The BERT NER pipeline is loaded once, on first use
+    entities = get_ner_pipeline()(texts, stride=NER_STRIDE, batch_size=NER_BATCH_SIZE)
+    return [_clean_entities(found) for found in entities]
+
+# Batches documents from concurrent requests; similar lengths are padded together
+ner_scheduler = InferenceScheduler("ner", _run_ner, max_batch=NER_MAX_DOCUMENTS, max_wait=NER_MAX_WAIT, length=len)
+
+def extract_skills_logic(text: Union[str, List[str]]):
+    """
+    Extracts entity-based skills from one resume, or from a list of resumes.
+    Whole documents are covered via overlapping token windows, and windows
+    from all documents (and from concurrent callers) are run through the
+    model in batches.
+    Returns a list of skills for a str, or one list per text for a list.
+    """
+    texts = [text] if isinstance(text, str) else list(text)
+    skills = [[] for _ in texts]
+
+    positions = [i for i, t in enumerate(texts) if t and t.strip()]
+    if positions:
+        for i, found in zip(positions, ner_scheduler.run([texts[i] for i in positions])):
+            skills[i] = found
+
+    return skills[0] if isinstance(text, str) else skills
+
+async def extract_skills_logic_async(text: Union[str, List[str]]):
+    """Async version of extract_skills_logic; the event loop stays free while the model runs"""
+    texts = [text] if isinstance(text, str) else list(text)
+    skills = [[] for _ in texts]
+
+    positions = [i for i, t in enumerate(texts) if t and t.strip()]
+    if positions:
+        for i, found in zip(positions, await ner_scheduler.run_async([texts[i] for i in positions])):
+            skills[i] = found
+
+    return skills[0] if isinstance(text, str) else skills
@@ -1,28 +1,98 @@
 import requests
+import httpx
+import asyncio
 import json
-from typing import Dict, List, Union
+import logging
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+from utils.skills_cache import SkillsCache, make_cache_key
+from utils.json_stream import CategoryStreamParser, repair_json
+from utils.resume_sections import chunk_resume
+from utils.skill_profile import SKILL_CATEGORIES
+from utils.metrics import IN_FLIGHT, counter, gauge, observe_ollama, stage_timer
 
-def extract_all_skills(markdown_text: str) -> Dict[str, Union[Dict[str, List[str]], List[str]]]:
-    """
-    Extracts ALL professional skills from resume text with maximum completeness.
-    Returns structured JSON with both hard and soft skills.
-    """
-    prompt = f"""Extract ALL professional skills from this resume with maximum completeness. Return STRICT JSON format:
-{{
-    "technical_skills": {{
+logger = logging.getLogger(__name__)
+
+# Ollama connection settings; the model, context size and options can be overridden from the environment
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+# Comma-separated Ollama endpoints to spread requests across; defaults to OLLAMA_URL alone
+OLLAMA_URLS = [url.strip().rstrip("/") for url in os.getenv("OLLAMA_URLS", OLLAMA_URL).split(",") if url.strip()]
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
+# Room for the instructions, one resume chunk and the JSON answer.
+# Changing num_ctx makes Ollama reload the model, so every request sends the same value.
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "4096"))
+OLLAMA_OPTIONS = {"temperature": 0.1, "num_ctx": OLLAMA_NUM_CTX, **json.loads(os.getenv("OLLAMA_OPTIONS", "{}"))}
+# How long Ollama keeps the model loaded after a request ("30m", "-1" for forever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_TIMEOUT = 1000
+OLLAMA_CONNECT_TIMEOUT = 10
+OLLAMA_MAX_CONNECTIONS = 32
+
+# Backend pool: failed requests are retried on another endpoint up to this many times
+OLLAMA_RETRIES = int(os.getenv("OLLAMA_RETRIES", "2"))
+# Consecutive failures before an endpoint is ejected, and for how long (doubling per further failure, capped)
+OLLAMA_EJECT_AFTER = 3
+OLLAMA_EJECT_SECONDS = 15
+OLLAMA_MAX_EJECT_SECONDS = 300
+# Active health checks against /api/tags (seconds between rounds, per-check timeout)
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10"))
+OLLAMA_HEALTH_TIMEOUT = 5
+# Latency estimate for an endpoint with no history, and the EWMA weight of each new observation
+OLLAMA_INITIAL_LATENCY = 1.0
+OLLAMA_LATENCY_ALPHA = 0.2
+# A request still running after OLLAMA_HEDGE_FACTOR x its endpoint's usual latency (at least
+# OLLAMA_HEDGE_MIN_DELAY seconds) is duplicated on an idle endpoint; the first answer wins.
+OLLAMA_HEDGE = os.getenv("OLLAMA_HEDGE", "1") == "1"
+OLLAMA_HEDGE_FACTOR = 3.0
+OLLAMA_HEDGE_MIN_DELAY = float(os.getenv("OLLAMA_HEDGE_MIN_DELAY", "5"))
+
+# Bump whenever the prompt or the chunking changes so cached results are not reused
+PROMPT_VERSION = 5
+
+# Send the response's JSON schema as Ollama's structured output format (Ollama >= 0.5), so decoding
+# is constrained to it; "0" falls back to plain JSON mode for older servers
+OLLAMA_STRUCTURED_OUTPUT = os.getenv("OLLAMA_STRUCTURED_OUTPUT", "1") == "1"
+
+# Categories missing from a malformed or truncated answer are asked for once more, with a short follow-up
+OLLAMA_CATEGORY_RETRY = os.getenv("OLLAMA_CATEGORY_RETRY", "1") == "1"
+
+# Resume chunks of one resume extracted concurrently
+CHUNK_CONCURRENCY = 4
+
+# Result cache: in-memory LRU, plus an on-disk SQLite tier when SKILLS_CACHE_DB is set
+SKILLS_CACHE_MAX_ENTRIES = 1024
+SKILLS_CACHE_DB = os.getenv("SKILLS_CACHE_DB")
+SKILLS_CACHE_MAX_DB_BYTES = 256 * 1024 * 1024
+SKILLS_CACHE_TTL = 7 * 24 * 3600
+
+skills_cache = SkillsCache(
+    max_entries=SKILLS_CACHE_MAX_ENTRIES,
+    db_path=SKILLS_CACHE_DB,
+    max_db_bytes=SKILLS_CACHE_MAX_DB_BYTES,
+    ttl_seconds=SKILLS_CACHE_TTL
+)
+
+# Static extraction instructions. Sent as the system message so every request
+# starts with the same prefix, which Ollama can reuse from its prompt cache.
+SYSTEM_PROMPT = """Extract ALL professional skills from the resume the user sends with maximum completeness. Return STRICT JSON format:
+{
+    "technical_skills": {
         "programming_languages": [],
         "frameworks": [],
         "databases": [],
         "devops_tools": [],
         "data_science_tools": [],
         "design_tools": []
-    }},
+    },
     "platforms": [],
     "soft_skills": [],
     "certifications": [],
     "languages": [],
     "domain_skills": []
-}}
+}
 
 RULES:
 1. Include EVERY mentioned skill/tool (even if mentioned once)
@@ -41,70 +111,829 @@ SKILL EXAMPLES TO INCLUDE:
 - Data: SQL, Pandas, Spark
 - Design: Photoshop, Figma
 - Soft: Leadership, Communication
-- Domain: Financial Modeling, UX Research
+- Domain: Financial Modeling, UX Research"""
 
-RESUME TEXT:
-{markdown_text[:15000]}"""
+def build_messages(markdown_text: str) -> List[Dict[str, str]]:
+    """Chat messages for one resume (chunk): the fixed instructions, then the resume text"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"RESUME TEXT:\n{markdown_text}"}
+    ]
 
-    try:
-        print("[DEBUG] Sending prompt to Ollama API (preview first 1000 chars):")
-        print(prompt[:1000])
-
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "llama3.2:3b",
-                "prompt": prompt,
-                "format": "json",
-                "stream": False,
-                "options": {"temperature": 0.1}
-            },
-            timeout=1000
-        )
-        response.raise_for_status()
-
-        print(f"[DEBUG] Raw Ollama API response:\n{response.text}")
-
-        raw_output = response.json().get("response", "{}")
-        
+# Follow-up for categories an answer left out. It is appended to the original messages, so
+# Ollama can reuse the evaluated prompt and only the instruction and the short answer are new.
+RETRY_PROMPT = """Your answer was incomplete. Return STRICT JSON with only these categories, listing every matching skill in the resume:
+{template}"""
+
+def build_retry_messages(markdown_text: str, paths: List[tuple]) -> List[Dict[str, str]]:
+    template = json.dumps(category_template(paths), indent=4)
+    return build_messages(markdown_text) + [{"role": "user", "content": RETRY_PROMPT.format(template=template)}]
+
+def category_template(paths) -> dict:
+    """Skills structure holding an empty list for each category path"""
+    template = {}
+    for path in paths:
+        node = template
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = []
+    return template
+
+def skills_schema(paths=SKILL_CATEGORIES) -> dict:
+    """JSON schema of the SkillsResponse structure (or the given categories of it) for Ollama's format"""
+    schema = {"type": "object", "properties": {}, "required": []}
+    for path in paths:
+        node = schema
+        for key in path[:-1]:
+            if key not in node["properties"]:
+                node["properties"][key] = {"type": "object", "properties": {}, "required": []}
+                node["required"].append(key)
+            node = node["properties"][key]
+        node["properties"][path[-1]] = {"type": "array", "items": {"type": "string"}}
+        node["required"].append(path[-1])
+    return schema
+
+class OllamaUnavailable(Exception):
+    """Raised when no Ollama endpoint is configured"""
+
+class ExtractionFailed(Exception):
+    """Raised when no part of a resume could be extracted (Ollama unreachable, timeouts, unusable output)"""
+
+def is_retryable(error: Exception) -> bool:
+    """Connection errors, timeouts and 5xx answers are the endpoint's fault; a 4xx would fail anywhere"""
+    if isinstance(error, (httpx.HTTPStatusError, requests.HTTPError)):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, requests.ConnectionError, requests.Timeout))
+
+class OllamaBackend:
+    """One Ollama endpoint: its connection pool, current load, observed latency and health"""
+
+    def __init__(self, url: str, max_connections: int = OLLAMA_MAX_CONNECTIONS,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.url = url.rstrip("/")
+        self.max_connections = max_connections
+        self.transport = transport
+        self.in_flight = 0
+        self.latency = OLLAMA_INITIAL_LATENCY
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Async client for this endpoint, created lazily so every request reuses the same connection pool"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.url,
+                transport=self.transport,
+                timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def score(self) -> float:
+        """Expected wait for one more request: the requests already running here (plus it) times the usual latency"""
+        return (self.in_flight + 1) * self.latency
+
+    def acquire(self):
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe(self, seconds: float):
+        self.latency += OLLAMA_LATENCY_ALPHA * (seconds - self.latency)
+
+    def succeeded(self, seconds: float):
+        self.observe(seconds)
+        if self.failures or not self.healthy:
+            logger.info("Ollama endpoint %s is healthy again", self.url)
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def cancelled(self, seconds: float):
+        """A cancelled request (e.g. a losing hedge) still shows this endpoint is at least this slow"""
+        if seconds > self.latency:
+            self.observe(seconds)
+
+    def failed(self, reason: str):
+        self.errors += 1
+        self.failures += 1
+        if self.failures >= OLLAMA_EJECT_AFTER:
+            self.eject(reason)
+
+    def eject(self, reason: str):
+        """Takes the endpoint out of rotation, for longer the more consecutive failures it has"""
+        seconds = min(OLLAMA_EJECT_SECONDS * 2 ** max(0, self.failures - OLLAMA_EJECT_AFTER), OLLAMA_MAX_EJECT_SECONDS)
+        if self.healthy:
+            logger.warning("Ejecting Ollama endpoint %s for %ds: %s", self.url, seconds, reason)
+        self.ejected_until = time.monotonic() + seconds
+
+    async def check(self) -> bool:
+        """Active health check: the endpoint must answer /api/tags"""
         try:
+            response = await self.client.get("/api/tags", timeout=OLLAMA_HEALTH_TIMEOUT)
+            response.raise_for_status()
+        except Exception as e:
+            self.failures = max(self.failures + 1, OLLAMA_EJECT_AFTER)
+            self.eject(f"health check failed: {e!r}")
+            return False
+        if self.failures or not self.healthy:
+            logger.info("Ollama endpoint %s is healthy again", self.url)
+        self.failures = 0
+        self.ejected_until = 0.0
+        return True
+
+    def status(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "latency_ms": round(self.latency * 1000, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "consecutive_failures": self.failures,
+            "ejected_for_s": round(max(0.0, self.ejected_until - time.monotonic()), 1),
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class OllamaClient:
+    """
+    Keeps one Ollama model resident on every endpoint and the connections to
+    them pooled. Every request goes through /api/chat with the same model,
+    options and keep_alive, so the model is never reloaded between bursts
+    and the system prompt prefix stays cached.
+
+    With several endpoints each request goes to the least-loaded healthy one
+    (in-flight requests times observed latency). Failing endpoints are
+    ejected, failed requests are retried on another endpoint, and slow
+    non-streaming requests are hedged on an idle one.
+    """
+
+    def __init__(self, urls: Union[str, List[str], None] = None, model: str = OLLAMA_MODEL,
+                 options: Optional[dict] = None, keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 max_connections: int = OLLAMA_MAX_CONNECTIONS, hedge: bool = OLLAMA_HEDGE,
+                 structured: bool = OLLAMA_STRUCTURED_OUTPUT, transport: Optional[httpx.AsyncBaseTransport] = None):
+        if isinstance(urls, str):
+            urls = [urls]
+        self.backends = [OllamaBackend(url, max_connections, transport) for url in (urls or OLLAMA_URLS)]
+        if not self.backends:
+            raise OllamaUnavailable("No Ollama endpoint configured")
+        self.model = model
+        self.options = OLLAMA_OPTIONS if options is None else options
+        self.keep_alive = keep_alive
+        self.hedge = hedge
+        self.structured = structured
+        self.output_format = skills_schema() if structured else "json"
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._session: Optional[requests.Session] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+    def payload(self, messages: List[Dict[str, str]], stream: bool = False,
+                output_format: Union[str, dict, None] = None) -> dict:
+        """Builds the /api/chat request body; output_format overrides the skills schema when structured"""
+        return {
+            "model": self.model,
+            "messages": messages,
+            "format": output_format if output_format is not None and self.structured else self.output_format,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": self.options
+        }
+
+    @property
+    def session(self) -> requests.Session:
+        """Pooled session for the synchronous path"""
+        if self._session is None:
+            self._session = requests.Session()
+        return self._session
+
+    def pick(self, exclude=(), idle_only: bool = False) -> Optional[OllamaBackend]:
+        """
+        Least-loaded healthy endpoint not in exclude. When every candidate is
+        ejected, the one due back soonest is tried rather than failing outright.
+        """
+        candidates = [backend for backend in self.backends if backend not in exclude]
+        healthy = [backend for backend in candidates if backend.healthy]
+        if idle_only:
+            healthy = [backend for backend in healthy if backend.in_flight == 0]
+            candidates = healthy
+        if healthy:
+            return min(healthy, key=OllamaBackend.score)
+        if candidates:
+            return min(candidates, key=lambda backend: backend.ejected_until)
+        return None
+
+    def hedge_delay(self, backend: OllamaBackend) -> Optional[float]:
+        """Seconds to wait on backend before hedging, or None when hedging is off"""
+        if not self.hedge or len(self.backends) < 2:
+            return None
+        return max(OLLAMA_HEDGE_MIN_DELAY, OLLAMA_HEDGE_FACTOR * backend.latency)
+
+    def _failed(self, backend: OllamaBackend, error: Exception):
+        if is_retryable(error):
+            backend.failed(repr(error))
+
+    def _retry(self, error: Exception, tried: List[OllamaBackend]) -> bool:
+        """Whether a failed request should be sent to another endpoint"""
+        if not is_retryable(error) or len(tried) > OLLAMA_RETRIES or self.pick(tried) is None:
+            return False
+        self.retries += 1
+        OLLAMA_RETRIES_TOTAL.inc()
+        logger.warning("Ollama request to %s failed (%r); retrying on another endpoint", tried[-1].url, error)
+        return True
+
+    def chat(self, messages: List[Dict[str, str]], timeout: float = OLLAMA_TIMEOUT,
+             output_format: Union[str, dict, None] = None) -> str:
+        """Runs one chat completion and returns the assistant's content"""
+        body = self.payload(messages, output_format=output_format)
+        tried = []
+        while True:
+            backend = self.pick(tried)
+            tried.append(backend)
+            backend.acquire()
+            started = time.perf_counter()
+            try:
+                with IN_FLIGHT.track(kind="ollama"), stage_timer("ollama_request", backend=backend.url):
+                    response = self.session.post(f"{backend.url}/api/chat", json=body, timeout=timeout)
+                    response.raise_for_status()
+                    reply = response.json()
+            except Exception as e:
+                self._failed(backend, e)
+                if not self._retry(e, tried):
+                    raise
+                continue
+            finally:
+                backend.release()
+            backend.succeeded(time.perf_counter() - started)
+            return self._content(reply)
+
+    async def chat_async(self, messages: List[Dict[str, str]], timeout: float = OLLAMA_TIMEOUT,
+                         output_format: Union[str, dict, None] = None) -> str:
+        """Async version of chat, with hedging of slow requests"""
+        body = self.payload(messages, output_format=output_format)
+        tried = []
+        while True:
+            backend = self.pick(tried)
+            tried.append(backend)
+            try:
+                reply = await self._hedged(backend, body, timeout, tried)
+            except Exception as e:
+                if not self._retry(e, tried):
+                    raise
+                continue
+            return self._content(reply)
+
+    async def _hedged(self, backend: OllamaBackend, body: dict, timeout: float, tried: List[OllamaBackend]) -> dict:
+        """
+        Sends the request to backend. If it is still running after the hedge
+        delay, a copy goes to an idle endpoint and the first answer wins; the
+        other request is cancelled, which makes Ollama stop generating.
+        """
+        tasks = [self._start(backend, body, timeout)]
+        try:
+            delay = self.hedge_delay(backend)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                alternate = None if done else self.pick(tried, idle_only=True)
+                if alternate is not None:
+                    logger.info("Hedging Ollama request to %s on %s after %.1fs", backend.url, alternate.url, delay)
+                    tried.append(alternate)
+                    self.hedges += 1
+                    OLLAMA_HEDGES_TOTAL.inc()
+                    tasks.append(self._start(alternate, body, timeout))
+
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self.hedge_wins += 1
+                            OLLAMA_HEDGE_WINS_TOTAL.inc()
+                        return task.result()
+                if not pending:
+                    raise done.pop().exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _start(self, backend: OllamaBackend, body: dict, timeout: float) -> asyncio.Task:
+        # Counted as in flight from now, so concurrent picks already see the load
+        backend.acquire()
+        task = asyncio.create_task(self._post(backend, body, timeout))
+        task.add_done_callback(lambda _: backend.release())
+        return task
+
+    async def _post(self, backend: OllamaBackend, body: dict, timeout: float) -> dict:
+        started = time.perf_counter()
+        try:
+            with IN_FLIGHT.track(kind="ollama"), stage_timer("ollama_request", backend=backend.url):
+                response = await backend.client.post(
+                    "/api/chat",
+                    json=body,
+                    timeout=httpx.Timeout(timeout, connect=OLLAMA_CONNECT_TIMEOUT)
+                )
+                response.raise_for_status()
+                reply = response.json()
+        except asyncio.CancelledError:
+            backend.cancelled(time.perf_counter() - started)
+            raise
+        except Exception as e:
+            self._failed(backend, e)
+            raise
+        backend.succeeded(time.perf_counter() - started)
+        return reply
+
+    @staticmethod
+    def _content(reply: dict) -> str:
+        """Assistant content of a finished /api/chat reply; records Ollama's own timings"""
+        observe_ollama(reply)
+        content = reply.get("message", {}).get("content", "{}")
+        logger.debug("Raw Ollama API response: %s", content)
+        return content
+
+    async def stream_chat(self, messages: List[Dict[str, str]], timeout: float = OLLAMA_TIMEOUT) -> AsyncIterator[str]:
+        """
+        Yields the assistant's content fragments as Ollama generates them.
+        A request that fails before its first fragment is retried on another
+        endpoint; streams are never hedged.
+        """
+        body = self.payload(messages, stream=True)
+        tried = []
+        while True:
+            backend = self.pick(tried)
+            tried.append(backend)
+            backend.acquire()
+            started = time.perf_counter()
+            yielded = False
+            try:
+                with IN_FLIGHT.track(kind="ollama"), stage_timer("ollama_request", backend=backend.url):
+                    async with backend.client.stream(
+                        "POST",
+                        "/api/chat",
+                        json=body,
+                        timeout=httpx.Timeout(timeout, connect=OLLAMA_CONNECT_TIMEOUT)
+                    ) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.strip():
+                                continue
+                            message = json.loads(line)
+                            yielded = True
+                            yield message.get("message", {}).get("content", "")
+                            if message.get("done"):
+                                observe_ollama(message)
+                                break
+            except Exception as e:
+                self._failed(backend, e)
+                if yielded or not self._retry(e, tried):
+                    raise
+                continue
+            finally:
+                backend.release()
+            backend.succeeded(time.perf_counter() - started)
+            return
+
+    async def warmup(self) -> bool:
+        """
+        Loads the model and evaluates the system prompt once on every endpoint,
+        so the first real request neither waits for a cold load nor for the
+        shared prefix. Returns whether every endpoint warmed up.
+        """
+        body = self.payload([{"role": "system", "content": SYSTEM_PROMPT}])
+        body["options"] = {**self.options, "num_predict": 1}
+
+        async def warm(backend: OllamaBackend) -> bool:
+            try:
+                started = time.perf_counter()
+                response = await backend.client.post("/api/chat", json=body)
+                response.raise_for_status()
+                logger.info("Warmed up Ollama model %s on %s in %.2fs", self.model, backend.url,
+                            time.perf_counter() - started)
+                return True
+            except Exception as e:
+                logger.warning("Failed to warm up Ollama model %s on %s: %s", self.model, backend.url, e)
+                return False
+
+        return all(await asyncio.gather(*(warm(backend) for backend in self.backends)))
+
+    async def check_health(self) -> Dict[str, bool]:
+        """Runs one round of health checks; ejected endpoints come back once they answer"""
+        results = await asyncio.gather(*(backend.check() for backend in self.backends))
+        return {backend.url: ok for backend, ok in zip(self.backends, results)}
+
+    async def health_check_loop(self, interval: float = OLLAMA_HEALTH_INTERVAL):
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    def start_health_checks(self):
+        """Starts the background health checks on the running loop (called from the app lifespan)"""
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self.health_check_loop())
+
+    def status(self) -> dict:
+        return {
+            "model": self.model,
+            "backends": [backend.status() for backend in self.backends],
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+    async def aclose(self):
+        """Stops the health checks and closes the pooled connections, e.g. on app shutdown"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        for backend in self.backends:
+            await backend.aclose()
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+OLLAMA_RETRIES_TOTAL = counter("skills_ollama_retries_total", "Ollama requests retried on another endpoint")
+OLLAMA_HEDGES_TOTAL = counter("skills_ollama_hedges_total", "Slow Ollama requests duplicated on another endpoint")
+OLLAMA_HEDGE_WINS_TOTAL = counter("skills_ollama_hedge_wins_total", "Hedged Ollama requests answered by the duplicate")
+OLLAMA_BACKEND_IN_FLIGHT = gauge("skills_ollama_backend_in_flight", "Requests running on each Ollama endpoint")
+OLLAMA_BACKEND_HEALTHY = gauge("skills_ollama_backend_healthy", "1 while an Ollama endpoint is in rotation")
+JSON_REPAIRS_TOTAL = counter("skills_json_repairs_total", "Malformed model answers, by whether anything was salvaged")
+CATEGORY_RETRIES_TOTAL = counter("skills_category_retries_total", "Follow-up requests for categories a malformed answer left out")
+OLLAMA_BACKEND_LATENCY = gauge("skills_ollama_backend_latency_seconds", "Smoothed request latency per Ollama endpoint")
+
+ollama = OllamaClient()
+
+for _backend in ollama.backends:
+    OLLAMA_BACKEND_IN_FLIGHT.set_function(lambda backend=_backend: backend.in_flight, backend=_backend.url)
+    OLLAMA_BACKEND_HEALTHY.set_function(lambda backend=_backend: int(backend.healthy), backend=_backend.url)
+    OLLAMA_BACKEND_LATENCY.set_function(lambda backend=_backend: backend.latency, backend=_backend.url)
+
+def parse_skills_response(raw_output: str, paths=SKILL_CATEGORIES) -> Tuple[Optional[Dict[str, Union[Dict[str, List[str]], List[str]]]], List[tuple]]:
+    """
+    Parses the raw model output into the validated skills structure. Malformed
+    or truncated JSON is repaired rather than thrown away. Returns the skills
+    (None if nothing could be recovered) and the categories among paths that
+    did not come back complete.
+    """
+    try:
+        with stage_timer("json_parse"):
             parsed_skills = json.loads(raw_output)
-            print("[DEBUG] Parsed skills JSON successfully")
-        except json.JSONDecodeError as json_err:
-            print(f"❌ JSON parsing error: {json_err}")
-            print(f"[DEBUG] Raw output was:\n{raw_output}")
-            return empty_skills_template()
+        missing = []
+    except json.JSONDecodeError as json_err:
+        logger.warning("JSON parsing error, repairing: %s", json_err)
+        logger.debug("Raw output was: %s", raw_output)
+        with stage_timer("json_repair"):
+            parsed_skills, missing = repair_skills(raw_output, paths)
+        JSON_REPAIRS_TOTAL.inc(outcome="failed" if parsed_skills is None else "salvaged")
+        if parsed_skills is None:
+            return None, list(paths)
 
-        return validate_skills(parsed_skills)
+    with stage_timer("validate"):
+        return validate_skills(parsed_skills), missing
+
+def repair_skills(raw_output: str, paths) -> Tuple[Optional[dict], List[tuple]]:
+    """
+    Salvages malformed output: the repaired JSON, or failing that every list
+    that closed, plus the categories among paths whose list never closed
+    (absent, or cut off and only partly recovered).
+    """
+    known = set(SKILL_CATEGORIES)
+    closed = {path: items for path, items in CategoryStreamParser().feed(raw_output) if path in known}
+    repaired = repair_json(raw_output)
+    if not isinstance(repaired, dict):
+        repaired = completed_categories(closed) if closed else None
+    return repaired, [path for path in paths if path not in closed]
+
+def fill_categories(skills: Optional[dict], retried: dict, paths: List[tuple]) -> dict:
+    """Adds a follow-up answer's skills to the given categories of skills"""
+    skills = skills if skills is not None else empty_skills_template()
+    for path in paths:
+        set_category(skills, path, clean_skill_list(get_category(skills, path) + get_category(retried, path)))
+    return skills
+
+def retry_missing(chunk: str, skills: Optional[dict], missing: List[tuple],
+                  timeout: float = OLLAMA_TIMEOUT) -> Tuple[Optional[dict], List[tuple]]:
+    """
+    Asks once more for just the categories a malformed answer left out.
+    Returns the merged skills and the categories still missing.
+    """
+    if not missing or not OLLAMA_CATEGORY_RETRY:
+        return skills, missing
+    CATEGORY_RETRIES_TOTAL.inc()
+    logger.info("Asking again for %d incomplete categories", len(missing))
+    try:
+        raw_output = ollama.chat(build_retry_messages(chunk, missing), timeout, output_format=skills_schema(missing))
+    except Exception as e:
+        logger.error("Error retrying categories: %s", e)
+        return skills, missing
+    retried, still_missing = parse_skills_response(raw_output, missing)
+    if retried is None:
+        return skills, missing
+    return fill_categories(skills, retried, missing), still_missing
 
+async def retry_missing_async(chunk: str, skills: Optional[dict], missing: List[tuple],
+                              timeout: float = OLLAMA_TIMEOUT) -> Tuple[Optional[dict], List[tuple]]:
+    """Async version of retry_missing"""
+    if not missing or not OLLAMA_CATEGORY_RETRY:
+        return skills, missing
+    CATEGORY_RETRIES_TOTAL.inc()
+    logger.info("Asking again for %d incomplete categories", len(missing))
+    try:
+        raw_output = await ollama.chat_async(build_retry_messages(chunk, missing), timeout,
+                                             output_format=skills_schema(missing))
     except Exception as e:
-        print(f"❌ Error processing skills: {e}")
+        logger.error("Error retrying categories: %s", e)
+        return skills, missing
+    retried, still_missing = parse_skills_response(raw_output, missing)
+    if retried is None:
+        return skills, missing
+    return fill_categories(skills, retried, missing), still_missing
+
+def skills_cache_key(markdown_text: str) -> str:
+    """Cache key for a resume under the current model, prompt and options"""
+    return make_cache_key(markdown_text, ollama.model, PROMPT_VERSION, ollama.options)
+
+def extract_all_skills(markdown_text: str) -> Dict[str, Union[Dict[str, List[str]], List[str]]]:
+    """
+    Extracts ALL professional skills from resume text with maximum completeness.
+    Returns structured JSON with both hard and soft skills.
+    Long resumes are split into section-aware chunks that are extracted in
+    parallel and merged.
+    """
+    cache_key = skills_cache_key(markdown_text)
+    cached = skills_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("Skills cache hit")
+        return cached
+
+    chunks = chunk_resume(markdown_text)
+    started = time.perf_counter()
+    if len(chunks) <= 1:
+        results = [extract_chunk(chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=min(CHUNK_CONCURRENCY, len(chunks))) as pool:
+            results = list(pool.map(extract_chunk, chunks))
+
+    return reduce_chunk_results(cache_key, results, started)
+
+def extract_chunk(chunk: str) -> Tuple[Optional[Dict[str, Union[Dict[str, List[str]], List[str]]]], bool]:
+    """
+    One Ollama call for one resume chunk, plus a short follow-up for any
+    categories a malformed answer left out. Returns the skills (None if the
+    call failed or nothing was recovered) and whether every category came back.
+    """
+    try:
+        logger.debug("Sending %d-char resume chunk to Ollama API: %.1000s", len(chunk), chunk)
+        with stage_timer("prompt_build"):
+            messages = build_messages(chunk)
+        skills, missing = parse_skills_response(ollama.chat(messages))
+        skills, missing = retry_missing(chunk, skills, missing)
+        return skills, not missing
+
+    except Exception as e:
+        logger.error("Error processing skills: %s", e)
+        return None, False
+
+def reduce_chunk_results(cache_key: str, results: List[Tuple[Optional[dict], bool]], started: float) -> Dict[str, Union[Dict[str, List[str]], List[str]]]:
+    """
+    Merges per-chunk (skills, complete) results; only a fully successful extraction
+    is cached. Text that left no chunks (blank, or only boilerplate sections) never
+    reached Ollama and has no skills. Raises ExtractionFailed when there were chunks
+    but none produced anything, so callers report an error rather than an empty
+    skill set.
+    """
+    if not results:
         return empty_skills_template()
 
+    succeeded = [skills for skills, _ in results if skills is not None]
+    if not succeeded:
+        raise ExtractionFailed(f"Skill extraction failed for all {len(results)} resume chunks")
+
+    skills = merge_skills(succeeded)
+    if all(complete for _, complete in results):
+        skills_cache.set(cache_key, skills, cost=time.perf_counter() - started)
+    return skills
+
+def merge_skills(results: List[dict]) -> Dict[str, Union[Dict[str, List[str]], List[str]]]:
+    """Concatenates every category across results; validate_skills drops duplicates"""
+    merged = empty_skills_template()
+    for path in skill_categories():
+        items = []
+        for result in results:
+            items.extend(get_category(result, path))
+        set_category(merged, path, items)
+    return validate_skills(merged)
+
+async def extract_all_skills_async(markdown_text: str, timeout: float = OLLAMA_TIMEOUT) -> Dict[str, Union[Dict[str, List[str]], List[str]]]:
+    """
+    Async version of extract_all_skills that does not block the event loop.
+    Uses the shared connection pool and a per-request timeout. Cancelling the
+    awaiting task aborts the in-flight Ollama requests.
+    """
+    cache_key = skills_cache_key(markdown_text)
+    cached = skills_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("Skills cache hit")
+        return cached
+
+    chunks = chunk_resume(markdown_text)
+    slots = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+    async def extract(chunk):
+        async with slots:
+            return await extract_chunk_async(chunk, timeout)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(extract(chunk) for chunk in chunks))
+    return reduce_chunk_results(cache_key, list(results), started)
+
+async def extract_chunk_async(chunk: str, timeout: float = OLLAMA_TIMEOUT) -> Tuple[Optional[Dict[str, Union[Dict[str, List[str]], List[str]]]], bool]:
+    """Async version of extract_chunk"""
+    try:
+        logger.debug("Sending %d-char resume chunk to Ollama API: %.1000s", len(chunk), chunk)
+        with stage_timer("prompt_build"):
+            messages = build_messages(chunk)
+        skills, missing = parse_skills_response(await ollama.chat_async(messages, timeout))
+        skills, missing = await retry_missing_async(chunk, skills, missing, timeout)
+        return skills, not missing
+
+    except Exception as e:
+        logger.error("Error processing skills: %s", e)
+        return None, False
+
+async def stream_skill_categories(markdown_text: str, timeout: float = OLLAMA_TIMEOUT) -> AsyncIterator[dict]:
+    """
+    Streaming version of extract_all_skills_async. Consumes Ollama's token
+    streams and yields {"category": "technical_skills.frameworks", "skills": [...]}
+    as soon as a category's list closes, then a final {"result": {...}, "complete": bool}.
+    For chunked resumes a category can be yielded again as later chunks add to it;
+    "skills" always holds everything found so far. If the tail of a generation is
+    malformed, it is repaired and the categories it left out are asked for again
+    (and yielded once they arrive); "complete" is false if some never came back.
+    If nothing could be extracted, the final event also carries an "error".
+    """
+    cache_key = skills_cache_key(markdown_text)
+    cached = skills_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("Skills cache hit")
+        for category in skill_categories():
+            yield {"category": ".".join(category), "skills": get_category(cached, category)}
+        yield {"result": cached, "complete": True}
+        return
+
+    chunks = chunk_resume(markdown_text)
+    slots = asyncio.Semaphore(CHUNK_CONCURRENCY)
+    events: asyncio.Queue = asyncio.Queue()
+    chunk_done = object()
+
+    async def stream(chunk):
+        try:
+            async with slots:
+                return await stream_chunk(chunk, timeout, events)
+        finally:
+            await events.put(chunk_done)
+
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(stream(chunk)) for chunk in chunks]
+    found = {path: [] for path in skill_categories()}
+    try:
+        finished = 0
+        while finished < len(tasks):
+            event = await events.get()
+            if event is chunk_done:
+                finished += 1
+                continue
+            path, items = event
+            merged = clean_skill_list(found[path] + items)
+            if merged != found[path] or not found[path]:
+                found[path] = merged
+                yield {"category": ".".join(path), "skills": merged}
+
+        results = [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    complete = bool(results) and all(chunk_complete for _, chunk_complete in results)
+    try:
+        final = {"result": reduce_chunk_results(cache_key, results, started), "complete": complete}
+    except ExtractionFailed as e:
+        final = {"result": empty_skills_template(), "complete": False, "error": str(e)}
+    yield final
+
+async def stream_chunk(chunk: str, timeout: float, events: asyncio.Queue):
+    """
+    Streams one chunk's generation, putting (path, skills) on events as each
+    category closes, then for the categories a follow-up had to fill in.
+    Returns (skills or None, whether every category came back).
+    """
+    known = set(skill_categories())
+    completed = {}
+    raw_parts = []
+    parser = CategoryStreamParser()
+
+    try:
+        logger.debug("Streaming %d-char resume chunk to Ollama API: %.1000s", len(chunk), chunk)
+
+        with stage_timer("prompt_build"):
+            messages = build_messages(chunk)
+        async for fragment in ollama.stream_chat(messages, timeout):
+            raw_parts.append(fragment)
+            for path, value in parser.feed(fragment):
+                if path not in known or path in completed:
+                    continue
+                completed[path] = clean_skill_list(value)
+                await events.put((path, completed[path]))
+
+        skills, missing = parse_skills_response("".join(raw_parts))
+        if missing:
+            requested = missing
+            skills, missing = await retry_missing_async(chunk, skills, missing, timeout)
+            for path in requested:
+                if skills is not None and get_category(skills, path):
+                    await events.put((path, get_category(skills, path)))
+        return skills, not missing
+
+    except Exception as e:
+        logger.error("Error streaming skills: %s", e)
+        return (completed_categories(completed) if completed else None), False
+
+def completed_categories(completed: dict) -> Dict[str, Union[Dict[str, List[str]], List[str]]]:
+    """Skills structure holding only the categories that finished streaming"""
+    partial = empty_skills_template()
+    for path, items in completed.items():
+        set_category(partial, path, items)
+    return partial
+
+def skill_categories() -> List[tuple]:
+    """Key paths of every skill list in the schema, e.g. ("technical_skills", "frameworks")"""
+    return list(SKILL_CATEGORIES)
+
+def get_category(skills: dict, path: tuple) -> List[str]:
+    for key in path:
+        skills = skills[key]
+    return skills
+
+def set_category(skills: dict, path: tuple, items: List[str]):
+    for key in path[:-1]:
+        skills = skills[key]
+    skills[path[-1]] = items
+
+TOP_LEVEL_CATEGORIES = tuple(path[0] for path in SKILL_CATEGORIES if len(path) == 1)
+
+def clean_skill_list(items) -> List[str]:
+    """Keeps the non-blank strings of a model-produced list, dropping case-insensitive duplicates"""
+    if not isinstance(items, list):
+        return []
+    seen = set()
+    cleaned = []
+    for item in items:
+        if isinstance(item, str):
+            key = item.strip().casefold()
+            if key and key not in seen:
+                seen.add(key)
+                cleaned.append(item)
+    return cleaned
+
 def validate_skills(raw_data: dict) -> Dict[str, Union[Dict[str, List[str]], List[str]]]:
     """Ensures output matches our schema with all required categories"""
     template = empty_skills_template()
 
     if not isinstance(raw_data, dict):
-        print("[DEBUG] Raw data not dict, returning empty template")
+        logger.debug("Raw data not dict, returning empty template")
         return template
 
     # Validate technical_skills subcategories
-    if "technical_skills" in raw_data and isinstance(raw_data["technical_skills"], dict):
-        for tech_category in template["technical_skills"]:
-            if tech_category in raw_data["technical_skills"]:
-                template["technical_skills"][tech_category] = [
-                    skill for skill in raw_data["technical_skills"][tech_category]
-                    if isinstance(skill, str) and skill.strip()
-                ]
+    technical = raw_data.get("technical_skills")
+    if isinstance(technical, dict):
+        tech_template = template["technical_skills"]
+        for tech_category in tech_template:
+            tech_template[tech_category] = clean_skill_list(technical.get(tech_category))
 
     # Validate top-level categories
-    for category in ["platforms", "soft_skills", "certifications", "languages", "domain_skills"]:
-        if category in raw_data and isinstance(raw_data[category], list):
-            template[category] = [
-                item for item in raw_data[category]
-                if isinstance(item, str) and item.strip()
-            ]
+    for category in TOP_LEVEL_CATEGORIES:
+        template[category] = clean_skill_list(raw_data.get(category))
 
     return template
 
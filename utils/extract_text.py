@@ -1,5 +1,48 @@
-import io
+import logging
+import pymupdf
 import pymupdf4llm
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on pages parsed per resume; anything past this is not a CV
+MAX_PDF_PAGES = 50
+
+def _page_range(doc, max_pages: Optional[int]):
+    if max_pages is None or doc.page_count <= max_pages:
+        return None
+    return list(range(max_pages))
+
+def pdf_to_markdown(source, max_pages: Optional[int] = MAX_PDF_PAGES) -> str:
+    """
+    Converts a PDF to markdown with pymupdf4llm, falling back to plain
+    page.get_text() when the markdown conversion fails or comes back empty.
+    Top-level and side-effect free so it can run in a worker process.
+
+    Args:
+        source (str | bytes): Path to a PDF file, or the PDF content in bytes
+        max_pages (int | None): Only parse the first max_pages pages
+
+    Returns:
+        str: Extracted text
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        doc = pymupdf.open(stream=source, filetype="pdf")
+    else:
+        doc = pymupdf.open(source)
+
+    with doc:
+        pages = _page_range(doc, max_pages)
+        try:
+            md_text = pymupdf4llm.to_markdown(doc, pages=pages)
+            if md_text.strip():
+                return md_text
+            logger.debug("No text found using to_markdown(); falling back to get_text()")
+        except Exception as e:
+            logger.debug("to_markdown() failed (%s); falling back to get_text()", e)
+
+        page_numbers = pages if pages is not None else range(doc.page_count)
+        return "\n\n".join(doc[number].get_text() for number in page_numbers)
 
 def extract_text_from_pdf(file_bytes: bytes) -> str:
     """
@@ -13,16 +56,16 @@ def extract_text_from_pdf(file_bytes: bytes) -> str:
         str: Extracted plain text
     """
     try:
-        print("[DEBUG] Starting text extraction from PDF bytes")
-        md_text = pymupdf4llm.to_markdown(io.BytesIO(file_bytes))
-        print(f"[DEBUG] Extracted markdown preview (first 500 chars):\n{md_text[:500]}")
+        logger.debug("Starting text extraction from PDF bytes")
+        md_text = pdf_to_markdown(file_bytes)
+        logger.debug("Extracted markdown preview: %.500s", md_text)
 
         # Optional: strip markdown to plain text
         plain_text = md_text.replace("#", "").replace("*", "").strip()
-        print(f"[DEBUG] Plain text preview (first 500 chars):\n{plain_text[:500]}")
+        logger.debug("Plain text preview: %.500s", plain_text)
 
         return plain_text
 
     except Exception as e:
-        print(f"❌ Error extracting text from PDF: {e}")
+        logger.error("Error extracting text from PDF: %s", e)
         return ""
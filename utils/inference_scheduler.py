@@ -0,0 +1,150 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Union
+from utils.metrics import histogram, stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Defaults for every model's scheduler: requests per forward pass, and how long (seconds)
+# the worker waits for more requests once the first one arrives. Set in the environment,
+# they also override each model's own default (see inference_setting).
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "32"))
+INFERENCE_MAX_WAIT = float(os.getenv("INFERENCE_MAX_WAIT", "0.005"))
+
+# torch intra-op threads (process-wide). Forward passes only run on the scheduler workers,
+# one per model, so this bounds the CPU threads inference uses; 0 keeps torch's default.
+INFERENCE_TORCH_THREADS = int(os.getenv("INFERENCE_TORCH_THREADS", "0"))
+
+BATCH_SIZES = histogram(
+    "skills_inference_batch_size", "Requests per model forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+
+_torch_threads_set = False
+
+def inference_setting(model: str, name: str, default: Union[int, float]) -> Union[int, float]:
+    """
+    A scheduler knob for one model: <MODEL>_<NAME> from the environment (e.g.
+    NER_MAX_BATCH), else INFERENCE_<NAME>, else the model's own default.
+    """
+    value = os.getenv(f"{model}_{name}", os.getenv(f"INFERENCE_{name}"))
+    return type(default)(value) if value is not None else default
+
+def configure_torch_threads(threads: int = INFERENCE_TORCH_THREADS):
+    """Sets torch's intra-op thread count once per process (no-op for 0 or without torch)"""
+    global _torch_threads_set
+    if _torch_threads_set or threads <= 0:
+        return
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        _torch_threads_set = True
+    except ImportError:
+        pass
+
+class InferenceScheduler:
+    """
+    Dynamic micro-batching for one model. Callers submit single requests from
+    any thread or coroutine; one worker thread gathers them for up to max_wait
+    seconds or max_batch requests, runs them through run_batch in one call,
+    and hands each caller its own result. Under load batches fill up instead
+    of every request paying for its own forward pass.
+
+    run_batch takes a list of requests and returns one result per request.
+    With length set, each batch is sorted by it so similar-length inputs are
+    padded together.
+    """
+
+    def __init__(self, name: str, run_batch: Callable[[List], List], max_batch: int = INFERENCE_MAX_BATCH,
+                 max_wait: float = INFERENCE_MAX_WAIT, torch_threads: int = INFERENCE_TORCH_THREADS,
+                 length: Optional[Callable] = None):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.torch_threads = torch_threads
+        self.length = length
+        self._stats = {"requests": 0, "batches": 0, "errors": 0}
+        self._reset()
+
+    def _reset(self):
+        # Threads do not survive fork, so a forked worker process starts its own
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._queue: List[tuple] = []
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, request) -> Future:
+        return self.submit_many([request])[0]
+
+    def submit_many(self, requests: List) -> List[Future]:
+        """Queues requests and returns one Future per request"""
+        if self._pid != os.getpid():
+            self._reset()
+        futures = [Future() for _ in requests]
+        with self._lock:
+            self._queue.extend(zip(requests, futures))
+            self._stats["requests"] += len(requests)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f"{self.name}-inference", daemon=True)
+                self._worker.start()
+            self._wakeup.notify()
+        return futures
+
+    def run(self, requests: List) -> List:
+        """Blocking: results for requests, batched with whatever else is in flight"""
+        return [future.result() for future in self.submit_many(requests)]
+
+    async def run_async(self, requests: List) -> List:
+        """Awaitable version of run; the event loop is free while the batch runs"""
+        return list(await asyncio.gather(*(asyncio.wrap_future(future) for future in self.submit_many(requests))))
+
+    def _next_batch(self) -> List[tuple]:
+        with self._lock:
+            while not self._queue:
+                self._wakeup.wait()
+            deadline = time.monotonic() + self.max_wait
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._wakeup.wait(remaining)
+            batch = self._queue[:self.max_batch]
+            del self._queue[:self.max_batch]
+            return batch
+
+    def _run(self):
+        configure_torch_threads(self.torch_threads)
+        while True:
+            batch = self._next_batch()
+            if self.length is not None:
+                batch.sort(key=lambda entry: self.length(entry[0]))
+            requests = [request for request, _ in batch]
+            BATCH_SIZES.observe(len(batch), model=self.name)
+            try:
+                with stage_timer(f"{self.name}_inference"):
+                    results = self.run_batch(requests)
+            except Exception as e:
+                logger.error("%s inference failed for a batch of %d: %s", self.name, len(batch), e)
+                self._stats["errors"] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self._stats["batches"] += 1
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "queued": len(self._queue),
+            "mean_batch": round(self._stats["requests"] / batches, 2) if batches else None,
+            "max_batch": self.max_batch,
+            "max_wait": self.max_wait,
+        }
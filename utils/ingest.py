@@ -0,0 +1,415 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import contextlib
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from utils.batch_extract import extract_batch, shutdown_parse_pool, PARSE_WORKERS, LLM_CONCURRENCY
+from utils.near_duplicates import get_near_duplicate_index, NEAR_DUP_MODE
+from utils.skill_profile import SKILL_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+# Record of every file already ingested, and where the result shards go
+INGEST_MANIFEST = os.getenv("INGEST_MANIFEST", "data/ingest_manifest.db")
+INGEST_OUTPUT_DIR = os.getenv("INGEST_OUTPUT_DIR", "data/ingest")
+
+# "jsonl" or "parquet" (needs pyarrow)
+INGEST_FORMAT = os.getenv("INGEST_FORMAT", "jsonl")
+
+# A shard is closed after this many resumes or seconds, whichever comes first. Results
+# still buffered in an open shard are redone after a crash, so this bounds the lost work.
+SHARD_MAX_RECORDS = 1000
+SHARD_MAX_SECONDS = 60
+
+# Seconds between folder scans in watch mode
+POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "30"))
+
+# Files modified more recently than this are probably still being copied; they wait for the next scan
+SETTLE_SECONDS = 5
+
+HASH_CHUNK = 1 << 20
+
+# Flat output columns: file identity, then one list column per skill category
+CATEGORY_COLUMNS = [path[-1] for path in SKILL_CATEGORIES]
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class FileEntry:
+    """A file picked up by a scan: its path relative to the watched folder and what identifies its content"""
+
+    __slots__ = ("name", "path", "size", "mtime_ns", "sha256")
+
+    def __init__(self, name: str, path: Path, size: int, mtime_ns: int, sha256: str):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.sha256 = sha256
+
+class IngestManifest:
+    """
+    SQLite record of every file seen in a watched folder: size, mtime and
+    content hash, plus whether it was ingested (and into which shard), failed,
+    or is a byte-identical copy of a file already ingested. A file is only
+    hashed when its size or mtime changed, and only re-extracted when its
+    content did.
+    """
+
+    def __init__(self, db_path: str = INGEST_MANIFEST):
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                status TEXT NOT NULL,
+                shard TEXT,
+                error TEXT,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256, status);
+            CREATE TABLE IF NOT EXISTS shards (
+                name TEXT PRIMARY KEY,
+                records INTEGER NOT NULL,
+                written REAL NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def scan(self, folder: Path, settle: float = SETTLE_SECONDS,
+             retry_failed: bool = False) -> Tuple[List[FileEntry], Dict[str, int]]:
+        """
+        New or changed PDFs under folder (recursively), in path order, plus
+        counts of what was skipped. Touched-but-identical files and copies of
+        ingested content are recorded here and not returned.
+        """
+        folder = Path(folder)
+        counts = {"seen": 0, "unchanged": 0, "settling": 0, "duplicates": 0, "changed": 0}
+        with self._lock:
+            known = {row[0]: row[1:] for row in self._db.execute(
+                "SELECT path, size, mtime_ns, sha256, status FROM files")}
+        todo = []
+        now_ns = time.time_ns()
+        for path in sorted(folder.rglob("*.pdf")):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Deleted between the listing and the stat
+            if not path.is_file():
+                continue
+            counts["seen"] += 1
+            name = path.relative_to(folder).as_posix()
+            previous = known.get(name)
+            if previous is not None and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                if previous[3] != "failed" or not retry_failed:
+                    counts["unchanged"] += 1
+                    continue
+            if now_ns - stat.st_mtime_ns < settle * 1e9:
+                counts["settling"] += 1
+                continue
+            try:
+                sha256 = file_sha256(path)
+            except OSError as e:
+                logger.warning("Could not read %s: %s", path, e)
+                continue
+            entry = FileEntry(name, path, stat.st_size, stat.st_mtime_ns, sha256)
+            if previous is not None and previous[2] == sha256 and previous[3] != "failed":
+                # Touched or copied over with the same bytes
+                self._upsert(entry, previous[3])
+                counts["unchanged"] += 1
+                continue
+            original = self.ingested(sha256)
+            if original is not None and original != name:
+                self._upsert(entry, "duplicate", error=f"same content as {original}")
+                counts["duplicates"] += 1
+                continue
+            todo.append(entry)
+        counts["changed"] = len(todo)
+        return todo, counts
+
+    def ingested(self, sha256: str) -> Optional[str]:
+        """Path of an ingested file with this content, if any"""
+        with self._lock:
+            row = self._db.execute("SELECT path FROM files WHERE sha256 = ? AND status = 'done' LIMIT 1",
+                                   (sha256,)).fetchone()
+        return row[0] if row else None
+
+    def _upsert(self, entry: FileEntry, status: str, shard: Optional[str] = None, error: Optional[str] = None):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256, status, shard, error, updated) "
+                "VALUES (?, ?, ?, ?, ?, COALESCE(?, (SELECT shard FROM files WHERE path = ?)), ?, ?)",
+                (entry.name, entry.size, entry.mtime_ns, entry.sha256, status, shard, entry.name, error, time.time())
+            )
+
+    def mark_failed(self, entry: FileEntry, error: str):
+        self._upsert(entry, "failed", error=error)
+
+    def mark_done(self, rows: List[dict], shard: str):
+        """Records the files of a shard as ingested, all in one transaction"""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256, status, shard, error, updated) "
+                "VALUES (?, ?, ?, ?, 'done', ?, NULL, ?)",
+                [(row["path"], row["size"], row["mtime_ns"], row["sha256"], shard, now) for row in rows]
+            )
+            self._db.execute("INSERT OR REPLACE INTO shards (name, records, written) VALUES (?, ?, ?)",
+                             (shard, len(rows), now))
+
+    def shards(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT name FROM shards")}
+
+    def current(self) -> Dict[str, Tuple[str, str]]:
+        """path -> (sha256, shard) of every file whose latest version is ingested"""
+        with self._lock:
+            return {row[0]: row[1:] for row in self._db.execute(
+                "SELECT path, sha256, shard FROM files WHERE status = 'done'")}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall())
+
+    def close(self):
+        self._db.close()
+
+class ShardWriter:
+    """
+    Buffers result rows and writes them out as numbered JSONL or Parquet
+    shards. A shard is written to a temporary file and renamed into place,
+    so a shard either exists completely or not at all. Shards are append-only:
+    when a file changes, its new row goes to a new shard and the old row stays
+    where it was (see FolderIngester.current_rows).
+    """
+
+    def __init__(self, output_dir: str = INGEST_OUTPUT_DIR, fmt: str = INGEST_FORMAT,
+                 max_records: int = SHARD_MAX_RECORDS, max_seconds: float = SHARD_MAX_SECONDS):
+        if fmt not in ("jsonl", "parquet"):
+            raise ValueError(f"Unknown shard format: {fmt}")
+        if fmt == "parquet":
+            # Fail before any work is done rather than at the first flush
+            import pyarrow  # noqa: F401
+        self.output_dir = Path(output_dir)
+        self.fmt = fmt
+        self.max_records = max_records
+        self.max_seconds = max_seconds
+        self.rows: List[dict] = []
+        self._opened = time.monotonic()
+        self._sequence = 0
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Leftovers of a shard that was being written when the process died
+        for leftover in self.output_dir.glob("*.tmp"):
+            leftover.unlink(missing_ok=True)
+
+    def add(self, row: dict):
+        if not self.rows:
+            self._opened = time.monotonic()
+        self.rows.append(row)
+
+    def due(self) -> bool:
+        return len(self.rows) >= self.max_records or (
+            bool(self.rows) and time.monotonic() - self._opened >= self.max_seconds)
+
+    def flush(self) -> Optional[str]:
+        """Writes the buffered rows as a new shard and returns its file name (None if empty)"""
+        if not self.rows:
+            return None
+        self._sequence += 1
+        name = f"part-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._sequence:05d}.{self.fmt}"
+        temporary = self.output_dir / f"{name}.tmp"
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(_arrow_table(self.rows), temporary)
+        else:
+            with open(temporary, "w", encoding="utf-8") as f:
+                for row in self.rows:
+                    f.write(json.dumps(row) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temporary, self.output_dir / name)
+        self.rows = []
+        return name
+
+    def existing(self) -> List[str]:
+        return sorted(path.name for path in self.output_dir.glob(f"part-*.{self.fmt}"))
+
+    def read_keys(self, name: str) -> List[dict]:
+        """path / size / mtime_ns / sha256 of every row in a shard"""
+        return self.read_rows(name, ["path", "size", "mtime_ns", "sha256"])
+
+    def read_rows(self, name: str, columns: Optional[List[str]] = None) -> List[dict]:
+        """Rows of a shard, optionally only the given columns"""
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            return pq.read_table(self.output_dir / name, columns=columns).to_pylist()
+        with open(self.output_dir / name, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        if columns is None:
+            return rows
+        return [{column: row[column] for column in columns} for row in rows]
+
+def _arrow_table(rows: List[dict]):
+    import pyarrow as pa
+    schema = pa.schema(
+        [("path", pa.string()), ("sha256", pa.string()), ("size", pa.int64()), ("mtime_ns", pa.int64()),
+         ("processed_at", pa.float64()), ("near_duplicate_of", pa.int64()), ("similarity", pa.float64())]
+        + [(column, pa.list_(pa.string())) for column in CATEGORY_COLUMNS]
+    )
+    return pa.Table.from_pylist(rows, schema=schema)
+
+def result_row(entry: FileEntry, result: dict) -> dict:
+    """One flat output row: the file's identity and one list per skill category"""
+    row = {
+        "path": entry.name,
+        "sha256": entry.sha256,
+        "size": entry.size,
+        "mtime_ns": entry.mtime_ns,
+        "processed_at": round(time.time(), 3),
+        "near_duplicate_of": result.get("near_duplicate_of"),
+        "similarity": result.get("similarity"),
+    }
+    skills = result["skills"]
+    for path, column in zip(SKILL_CATEGORIES, CATEGORY_COLUMNS):
+        items = skills
+        for key in path:
+            items = items.get(key) if isinstance(items, dict) else None
+        row[column] = items if isinstance(items, list) else []
+    return row
+
+class FolderIngester:
+    """
+    Incremental skill extraction for a folder that keeps receiving resumes.
+    Each pass scans the folder against the manifest, runs only new or changed
+    PDFs through the bounded batch pipeline and appends the results to
+    shards. Files are marked done only once their shard is on disk, so after
+    a crash the next pass redoes at most the shard that was still open.
+    Older shards keep the rows of files that have since changed; read results
+    through current_rows() to get only each file's latest version.
+    """
+
+    def __init__(self, folder: str, output_dir: str = INGEST_OUTPUT_DIR, manifest_path: str = INGEST_MANIFEST,
+                 fmt: str = INGEST_FORMAT, parse_workers: int = PARSE_WORKERS,
+                 llm_concurrency: int = LLM_CONCURRENCY, near_dup_mode: str = NEAR_DUP_MODE,
+                 settle: float = SETTLE_SECONDS, retry_failed: bool = False):
+        self.folder = Path(folder)
+        self.parse_workers = parse_workers
+        self.llm_concurrency = llm_concurrency
+        self.near_dup_mode = near_dup_mode
+        self.settle = settle
+        self.retry_failed = retry_failed
+        self.manifest = IngestManifest(manifest_path)
+        self.writer = ShardWriter(output_dir, fmt)
+        self._pending: List[dict] = []
+        self.reconcile()
+
+    def reconcile(self):
+        """Marks the files of shards written just before a crash (but not yet recorded) as done"""
+        recorded = self.manifest.shards()
+        for name in self.writer.existing():
+            if name not in recorded:
+                rows = self.writer.read_keys(name)
+                self.manifest.mark_done(rows, name)
+                logger.info("Recovered %d files from shard %s", len(rows), name)
+
+    def _commit(self):
+        shard = self.writer.flush()
+        if shard is not None:
+            self.manifest.mark_done(self._pending, shard)
+            logger.info("Wrote %d resumes to %s", len(self._pending), shard)
+        self._pending = []
+
+    async def run_once(self) -> Dict[str, int]:
+        """One incremental pass; returns what was scanned, extracted and skipped"""
+        loop = asyncio.get_running_loop()
+        todo, counts = await loop.run_in_executor(
+            None, partial(self.manifest.scan, self.folder, self.settle, self.retry_failed))
+        counts.update(extracted=0, failed=0)
+        if not todo:
+            return counts
+
+        logger.info("Ingesting %d new or changed PDFs (%d unchanged)", len(todo), counts["unchanged"])
+        entries = {entry.name: entry for entry in todo}
+        sources = ((entry.name, partial(str, entry.path)) for entry in todo)
+        near_duplicates = get_near_duplicate_index(self.near_dup_mode) if self.near_dup_mode != "off" else None
+        async for result in extract_batch(sources, parse_workers=self.parse_workers,
+                                          llm_concurrency=self.llm_concurrency, near_duplicates=near_duplicates):
+            entry = entries[result["filename"]]
+            if "error" in result:
+                self.manifest.mark_failed(entry, result["error"])
+                counts["failed"] += 1
+                continue
+            row = result_row(entry, result)
+            self.writer.add(row)
+            self._pending.append(row)
+            counts["extracted"] += 1
+            if self.writer.due():
+                await loop.run_in_executor(None, self._commit)
+        await loop.run_in_executor(None, self._commit)
+        return counts
+
+    async def watch(self, poll_interval: float = POLL_INTERVAL, stop: Optional[asyncio.Event] = None):
+        """Scans every poll_interval seconds until stop is set (or forever)"""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            started = time.monotonic()
+            counts = await self.run_once()
+            if counts["changed"] or counts["duplicates"]:
+                logger.info("Pass done: %s", counts)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), max(0.0, poll_interval - (time.monotonic() - started)))
+
+    def current_rows(self):
+        """
+        Yields the latest row of every ingested file, skipping rows superseded by a
+        newer version of the file in a later shard.
+        """
+        current = self.manifest.current()
+        for name in self.writer.existing():
+            for row in self.writer.read_rows(name):
+                if current.get(row["path"]) == (row["sha256"], name):
+                    yield row
+
+    def close(self):
+        self.manifest.close()
+
+def ingest_folder(folder: str, watch: bool = False, poll_interval: float = POLL_INTERVAL, **options) -> dict:
+    """
+    Runs one incremental pass over folder (or keeps watching it until
+    interrupted) and returns the manifest's file counts by status.
+    """
+    ingester = FolderIngester(folder, **options)
+    # Keep stray library prints off stdout, like the NDJSON batch mode
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if watch:
+                logger.info("Watching %s every %.0fs (Ctrl+C to stop)", folder, poll_interval)
+                asyncio.run(ingester.watch(poll_interval))
+            else:
+                logger.info("Pass done: %s", asyncio.run(ingester.run_once()))
+        except KeyboardInterrupt:
+            logger.info("Stopped; finished files are recorded in %s", ingester.manifest.db_path)
+        finally:
+            shutdown_parse_pool()
+            stats = ingester.manifest.stats()
+            ingester.close()
+    return stats
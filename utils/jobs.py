@@ -0,0 +1,315 @@
+import asyncio
+import ipaddress
+import logging
+import hashlib
+import itertools
+import os
+import socket
+import time
+import uuid
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+from utils.extract_text import pdf_to_markdown
+from utils.extract_skills_ollama import extract_all_skills_async, skills_cache_key
+from utils.batch_extract import get_parse_pool, PARSE_WORKERS, LLM_CONCURRENCY
+from utils.metrics import gauge, stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Jobs waiting to run before new submissions are rejected (HTTP 429)
+JOB_QUEUE_MAX = 256
+
+# Concurrent jobs per backend: PDF parsing (process pool) and Ollama generations
+JOB_BACKEND_LIMITS = {
+    "parse": PARSE_WORKERS,
+    "ollama": LLM_CONCURRENCY,
+}
+
+# Finished jobs are kept this long (seconds) for polling, and at most this many
+JOB_RESULT_TTL = 3600
+JOB_MAX_RETAINED = 10000
+
+# Webhook delivery
+WEBHOOK_TIMEOUT = 10
+WEBHOOK_ATTEMPTS = 3
+
+# Comma-separated webhook hosts to allow (private addresses included). When unset, any
+# host is allowed as long as it resolves to public addresses only.
+WEBHOOK_ALLOWED_HOSTS = {host.strip().lower() for host in os.getenv("WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()}
+WEBHOOK_SCHEMES = ("http", "https")
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while JOB_QUEUE_MAX jobs are already waiting"""
+
+class InvalidWebhook(ValueError):
+    """Raised when a webhook URL is malformed or points at a non-public address"""
+
+async def check_webhook(url: str) -> str:
+    """
+    Validates a client-supplied webhook URL so a job cannot make the server POST to
+    loopback, private or link-local services: http(s) only, and either the host is in
+    WEBHOOK_ALLOWED_HOSTS or (with no allow-list) every address it resolves to is public.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError as e:
+        raise InvalidWebhook(f"Malformed webhook URL: {e}")
+    if parts.scheme not in WEBHOOK_SCHEMES or not parts.hostname:
+        raise InvalidWebhook("Webhook must be an http(s) URL with a host.")
+    await resolve_webhook_host(parts.hostname, port)
+    return url
+
+async def resolve_webhook_host(host: str, port: int) -> str:
+    """
+    Resolves a webhook host and returns the address to connect to, raising
+    InvalidWebhook unless the host is allowed (see check_webhook).
+    """
+    host = host.lower()
+    allowed = host in WEBHOOK_ALLOWED_HOSTS
+    if WEBHOOK_ALLOWED_HOSTS and not allowed:
+        raise InvalidWebhook(f"Webhook host {host} is not allowed.")
+
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise InvalidWebhook(f"Webhook host {host} does not resolve: {e}")
+    addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+    if not addresses:
+        raise InvalidWebhook(f"Webhook host {host} does not resolve.")
+    if not allowed:
+        for address in addresses:
+            if not address.is_global:
+                raise InvalidWebhook(f"Webhook host {host} resolves to non-public address {address}.")
+    return str(addresses[0])
+
+class PinnedWebhookTransport(httpx.AsyncBaseTransport):
+    """
+    Connects each webhook request to the address resolve_webhook_host just checked,
+    so a host that resolves differently at connect time (DNS rebinding) cannot steer
+    delivery to an internal service. The Host header and, for https, the name used
+    for SNI and certificate checks stay those of the original URL.
+    """
+
+    def __init__(self, **kwargs):
+        # No keep-alive: a pooled connection is keyed by address, and one verified for
+        # one host name must not be reused for another name on the same address
+        self.transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_keepalive_connections=0), **kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        address = await resolve_webhook_host(host, request.url.port or (443 if request.url.scheme == "https" else 80))
+        request.url = request.url.copy_with(host=address)
+        if request.url.scheme == "https":
+            request.extensions = {**request.extensions, "sni_hostname": host}
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+class Job:
+    """One extraction request and, once it has run, its result"""
+
+    def __init__(self, kind: str, payload, key: str, priority: int = 0, webhook: Optional[str] = None,
+                 filename: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.key = key
+        self.priority = priority
+        self.webhooks = [webhook] if webhook else []
+        self.filename = filename
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "priority": self.priority,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+def job_key(kind: str, payload) -> str:
+    """Identical inputs share a key, so a duplicate submission joins the running job"""
+    if kind == "text":
+        return "text:" + skills_cache_key(payload)
+    return "pdf:" + hashlib.sha256(payload).hexdigest()
+
+class JobQueue:
+    """
+    In-process priority queue of extraction jobs. Workers pull the highest
+    priority job first (FIFO within a priority) and run it through per-backend
+    concurrency limits. Identical in-flight jobs are deduplicated, and a full
+    queue rejects new work instead of growing without bound.
+    """
+
+    def __init__(self, max_queued: int = JOB_QUEUE_MAX, backend_limits: Optional[Dict[str, int]] = None):
+        self.max_queued = max_queued
+        self.backend_limits = dict(backend_limits or JOB_BACKEND_LIMITS)
+        self.jobs: Dict[str, Job] = {}
+        self.in_flight: Dict[str, Job] = {}
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.slots: Dict[str, asyncio.Semaphore] = {}
+        self.workers = []
+        self.webhook_client: Optional[httpx.AsyncClient] = None
+        self.webhook_tasks = set()
+        self.order = itertools.count()
+        # Jobs still waiting to run; the queue itself may also hold stale re-prioritised entries
+        self.waiting = 0
+        self.deduplicated = 0
+        self.rejected = 0
+
+    def start(self):
+        """Starts the workers on the running event loop (called from the app lifespan)"""
+        self.queue = asyncio.PriorityQueue()
+        self.slots = {name: asyncio.Semaphore(limit) for name, limit in self.backend_limits.items()}
+        # Redirects are not followed, and every connection goes to a checked address
+        self.webhook_client = httpx.AsyncClient(timeout=WEBHOOK_TIMEOUT, follow_redirects=False,
+                                                transport=PinnedWebhookTransport())
+        # Enough workers to keep every backend busy at once
+        self.workers = [asyncio.create_task(self.work()) for _ in range(sum(self.backend_limits.values()))]
+
+    async def stop(self):
+        """Stops the workers; queued and running jobs are abandoned"""
+        for task in self.workers + list(self.webhook_tasks):
+            task.cancel()
+        await asyncio.gather(*self.workers, *self.webhook_tasks, return_exceptions=True)
+        self.workers = []
+        if self.webhook_client is not None:
+            await self.webhook_client.aclose()
+            self.webhook_client = None
+
+    def submit(self, kind: str, payload, priority: int = 0, webhook: Optional[str] = None,
+               filename: Optional[str] = None) -> Job:
+        """
+        Queues a "text" (str) or "pdf" (bytes) job and returns it. An identical job
+        that is still queued or running is returned instead of queueing a new one.
+        Raises QueueFull when the queue is at capacity.
+        """
+        key = job_key(kind, payload)
+        existing = self.in_flight.get(key)
+        if existing is not None:
+            self.deduplicated += 1
+            if webhook:
+                existing.webhooks.append(webhook)
+            if priority > existing.priority and existing.status == "queued":
+                # Re-queue at the higher priority; the stale entry is skipped by the workers
+                existing.priority = priority
+                self.queue.put_nowait((-priority, next(self.order), existing))
+            return existing
+
+        if self.waiting >= self.max_queued:
+            self.rejected += 1
+            raise QueueFull(f"{self.waiting} jobs already waiting")
+
+        self.prune()
+        job = Job(kind, payload, key, priority, webhook, filename)
+        self.jobs[job.id] = job
+        self.in_flight[key] = job
+        self.waiting += 1
+        self.queue.put_nowait((-priority, next(self.order), job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def prune(self):
+        """Forgets finished jobs past JOB_RESULT_TTL, and the oldest beyond JOB_MAX_RETAINED"""
+        cutoff = time.time() - JOB_RESULT_TTL
+        finished = [job for job in self.jobs.values() if job.finished is not None]
+        expired = [job for job in finished if job.finished < cutoff]
+        overflow = len(self.jobs) - len(expired) - JOB_MAX_RETAINED
+        if overflow > 0:
+            survivors = sorted((job for job in finished if job.finished >= cutoff), key=lambda job: job.finished)
+            expired.extend(survivors[:overflow])
+        for job in expired:
+            del self.jobs[job.id]
+
+    async def work(self):
+        while True:
+            _, _, job = await self.queue.get()
+            if job.status != "queued":
+                continue
+            self.waiting -= 1
+            await self.run(job)
+
+    async def run(self, job: Job):
+        job.status = "running"
+        job.started = time.time()
+        try:
+            text = job.payload
+            if job.kind == "pdf":
+                async with self.slots["parse"]:
+                    loop = asyncio.get_running_loop()
+                    with stage_timer("pdf_parse"):
+                        text = await loop.run_in_executor(get_parse_pool(), pdf_to_markdown, job.payload)
+                if not text.strip():
+                    raise ValueError("No text could be extracted from the PDF.")
+            async with self.slots["ollama"]:
+                job.result = await extract_all_skills_async(text)
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "Cancelled"
+            raise
+        except Exception as e:
+            logger.error("Job %s failed: %s", job.id, e)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+            job.payload = None
+            self.in_flight.pop(job.key, None)
+            job.done.set()
+            for url in job.webhooks:
+                task = asyncio.create_task(self.deliver(url, job))
+                self.webhook_tasks.add(task)
+                task.add_done_callback(self.webhook_tasks.discard)
+
+    async def deliver(self, url: str, job: Job):
+        """POSTs the finished job to a webhook, retrying with backoff"""
+        for attempt in range(WEBHOOK_ATTEMPTS):
+            try:
+                # The transport checks the host again and connects to the address it checked
+                response = await self.webhook_client.post(url, json=job.to_dict())
+                response.raise_for_status()
+                return
+            except InvalidWebhook as e:
+                logger.warning("Webhook for job %s dropped: %s", job.id, e)
+                return
+            except Exception as e:
+                logger.warning("Webhook %s for job %s failed (attempt %d): %s", url, job.id, attempt + 1, e)
+                await asyncio.sleep(2 ** attempt)
+
+    def stats(self) -> dict:
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return {
+            **counts,
+            "waiting": self.waiting,
+            "max_queued": self.max_queued,
+            "backend_limits": self.backend_limits,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+        }
+
+job_queue = JobQueue()
+
+JOB_QUEUE_DEPTH = gauge("skills_job_queue_depth", "Jobs waiting to run")
+JOB_QUEUE_DEPTH.set_function(lambda: job_queue.waiting)
+JOBS_RUNNING = gauge("skills_jobs_running", "Jobs currently running")
+JOBS_RUNNING.set_function(lambda: sum(job.status == "running" for job in list(job_queue.jobs.values())))
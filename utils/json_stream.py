@@ -0,0 +1,159 @@
+import re
+import json
+from typing import List, Tuple
+
+Path = Tuple[str, ...]
+
+class CategoryStreamParser:
+    """
+    Incremental JSON scanner for streamed LLM output.
+    Feed it text fragments as they arrive; it returns every array that
+    has just closed directly under a chain of object keys, e.g.
+    (("technical_skills", "frameworks"), ["React", "Rails"]).
+    Arrays nested inside other arrays are left to their parent.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.position = 0
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+
+    def feed(self, fragment: str) -> List[Tuple[Path, list]]:
+        """Consumes the next fragment and returns the arrays it completed"""
+        self.text += fragment
+        completed = []
+        text = self.text
+        for i in range(self.position, len(text)):
+            c = text[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    top = self.stack[-1] if self.stack else None
+                    if top is not None and top["type"] == "{" and top["awaiting_key"]:
+                        try:
+                            top["key"] = json.loads(text[self.string_start:i + 1])
+                        except json.JSONDecodeError:
+                            top["key"] = None
+                continue
+
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+            elif c == "{" or c == "[":
+                parent = self.stack[-1] if self.stack else None
+                self.stack.append({
+                    "type": c,
+                    "start": i,
+                    "key": None,
+                    "awaiting_key": c == "{",
+                    "path": self._child_path(parent),
+                })
+            elif c == "}" or c == "]":
+                if not self.stack:
+                    continue
+                closed = self.stack.pop()
+                if closed["type"] == "[" and closed["path"] is not None:
+                    try:
+                        completed.append((closed["path"], json.loads(text[closed["start"]:i + 1])))
+                    except json.JSONDecodeError:
+                        pass
+            elif c == ":":
+                if self.stack and self.stack[-1]["type"] == "{":
+                    self.stack[-1]["awaiting_key"] = False
+            elif c == ",":
+                if self.stack and self.stack[-1]["type"] == "{":
+                    self.stack[-1]["awaiting_key"] = True
+        self.position = len(text)
+        return completed
+
+    @staticmethod
+    def _child_path(parent):
+        """Key path of a container opened inside parent, or None if it sits in an array"""
+        if parent is None:
+            return ()
+        if parent["type"] != "{" or parent["path"] is None or parent["key"] is None:
+            return None
+        return parent["path"] + (parent["key"],)
+
+_CLOSERS = {"{": "}", "[": "]"}
+# A key with no value yet, or a key / value separator with nothing after it, at the end of an object
+_DANGLING_KEY = re.compile(r'(?<=[{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$')
+_TRAILING_COMMA = re.compile(r",\s*$")
+
+def repair_json(text: str):
+    """
+    Best-effort parse of LLM output that is almost JSON: text around the
+    object (code fences, prose), trailing commas, missing commas between
+    values, mismatched brackets and truncation. A truncated string is
+    dropped rather than kept half-written, and unclosed containers are
+    closed. Returns the parsed value, or None if no object could be recovered.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    escape = False
+    string_start = 0
+    for c in text[start:]:
+        if in_string:
+            out.append(c)
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+            continue
+
+        if c in '"{[' and _ends_value(out):
+            out.append(",")
+        if c == '"':
+            in_string = True
+            string_start = len(out)
+            out.append(c)
+        elif c in "{[":
+            stack.append(c)
+            out.append(c)
+        elif c in "}]":
+            # A mismatched bracket is taken as a typo for the one that closes the innermost container
+            _close(out, stack.pop())
+            if not stack:
+                break
+        elif not c.isspace() or stack:
+            out.append(c)
+
+    if in_string:
+        # Truncated mid-string: the half-written item is dropped
+        del out[string_start:]
+    while stack:
+        _close(out, stack.pop())
+    try:
+        return json.loads("".join(out), strict=False)
+    except json.JSONDecodeError:
+        return None
+
+def _ends_value(out: List[str]) -> bool:
+    """True if the output so far ends with a complete value, so the next one needs a comma"""
+    for c in reversed(out):
+        if not c.isspace():
+            return c in '"]}'
+    return False
+
+def _close(out: List[str], opener: str):
+    """Appends the closer for opener after dropping a trailing comma or dangling key"""
+    tail = "".join(out)
+    trimmed = _TRAILING_COMMA.sub("", tail.rstrip())
+    if opener == "{":
+        trimmed = _TRAILING_COMMA.sub("", _DANGLING_KEY.sub("", trimmed).rstrip())
+    if trimmed != tail:
+        out[:] = [trimmed]
+    out.append(_CLOSERS[opener])
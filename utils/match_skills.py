@@ -1,28 +1,118 @@
-from sentence_transformers import SentenceTransformer, util
+from utils.model_registry import get_embedder, embedder_signature
+from utils.skill_index import SkillIndex, load_or_build_index, SKILL_INDEX_DIR
+from utils.skill_search import get_searcher
+from utils.skill_profile import SkillProfile, union_skills
+from utils.embedding_cache import EmbeddingCache
+import numpy as np
+import asyncio
 import json
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Recommendations returned per profile
+TOP_K = 10
+
+# Index for the most recently used skill DB
+_index_cache = {"source": None, "size": 0, "index": None}
+
+# Cached vectors for profile skills, per embedder signature
+_embedding_caches = {}
 
 def load_skill_db(path="data/skills_db.json"):
     with open(path) as f:
         return json.load(f)["skills"]
 
-def recommend_skills(cv_skills, user_skills, skill_db):
-    combined_input = list(set(cv_skills + user_skills))
-    existing_set = set(combined_input)
-    candidates = [skill for skill in skill_db if skill not in existing_set]
-
-    input_embeds = model.encode(combined_input, convert_to_tensor=True)
-    candidate_embeds = model.encode(candidates, convert_to_tensor=True)
-
-    scores = util.cos_sim(input_embeds, candidate_embeds).mean(dim=0)
-    ranked = sorted(zip(candidates, scores), key=lambda x: x[1], reverse=True)[:10]
-
-    recommendations = []
-    for skill, score in ranked:
-        recommendations.append({
-            "skill": skill,
-            "score": round(float(score), 3),
-            "reason": f"Recommended due to similarity with: {', '.join(cv_skills[:3])}"
-        })
-    return recommendations
+def encode_skills(skills):
+    """Encodes skills into L2-normalized float32 vectors"""
+    return get_embedder().encode(skills, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Embedding cache for the configured embedder"""
+    signature = embedder_signature()
+    cache = _embedding_caches.get(signature)
+    if cache is None:
+        cache = _embedding_caches.setdefault(signature, EmbeddingCache(encode_skills, signature))
+    return cache
+
+def get_skill_index(skill_db, index_dir=SKILL_INDEX_DIR) -> SkillIndex:
+    """
+    Returns the embedding index for skill_db, built once and persisted under index_dir.
+    Passing the same list object again skips even the change check.
+    """
+    if _index_cache["source"] is skill_db and _index_cache["size"] == len(skill_db):
+        return _index_cache["index"]
+
+    index = load_or_build_index(skill_db, encode_skills, embedder_signature(), index_dir)
+    _index_cache.update(source=skill_db, size=len(skill_db), index=index)
+    return index
+
+def recommend_skills(cv_skills, user_skills, skill_db, k=TOP_K):
+    return recommend_skills_batch([(cv_skills, user_skills)], skill_db, k=k)[0]
+
+async def recommend_skills_async(cv_skills, user_skills, skill_db, k=TOP_K):
+    return (await recommend_skills_batch_async([(cv_skills, user_skills)], skill_db, k=k))[0]
+
+def recommend_skills_batch(profiles, skill_db, k=TOP_K):
+    """
+    Recommends skills for many (cv_skills, user_skills) profiles at once.
+    Either side may be a list of skill strings or a SkillProfile; their
+    case-insensitive union is the input. Distinct input skills are looked up
+    in the embedding cache (only unseen ones are encoded), and all profiles
+    are searched together through the index's search backend (exact or IVF-PQ).
+    """
+    index = get_skill_index(skill_db)
+    profiles, inputs, vocabulary = _recommendation_inputs(profiles)
+    if not vocabulary or len(index) == 0:
+        return [[] for _ in profiles]
+    vectors = get_embedding_cache().encode(vocabulary)
+    return _rank(index, profiles, inputs, vocabulary, vectors, k)
+
+async def recommend_skills_batch_async(profiles, skill_db, k=TOP_K):
+    """
+    Async version of recommend_skills_batch. Missing embeddings are awaited
+    from the embedder's scheduler, batched with other requests; the index
+    load and the search run in a thread.
+    """
+    loop = asyncio.get_running_loop()
+    index = await loop.run_in_executor(None, get_skill_index, skill_db)
+    profiles, inputs, vocabulary = _recommendation_inputs(profiles)
+    if not vocabulary or len(index) == 0:
+        return [[] for _ in profiles]
+    vectors = await get_embedding_cache().encode_async(vocabulary)
+    return await loop.run_in_executor(None, _rank, index, profiles, inputs, vocabulary, vectors, k)
+
+def _recommendation_inputs(profiles):
+    """(profiles with plain cv skill lists, combined input per profile, distinct input skills)"""
+    profiles = [
+        (cv_skills.skills() if isinstance(cv_skills, SkillProfile) else cv_skills, user_skills)
+        for cv_skills, user_skills in profiles
+    ]
+    inputs = [union_skills(cv_skills, user_skills) for cv_skills, user_skills in profiles]
+    vocabulary = list({skill for combined_input in inputs for skill in combined_input})
+    return profiles, inputs, vocabulary
+
+def _rank(index, profiles, inputs, vocabulary, vectors, k):
+    positions = {skill: i for i, skill in enumerate(vocabulary)}
+
+    # Mean cosine similarity to the inputs == dot product with the mean input vector
+    queries = np.zeros((len(inputs), vectors.shape[1]), dtype=np.float32)
+    for row, combined_input in enumerate(inputs):
+        if combined_input:
+            queries[row] = vectors[[positions[skill] for skill in combined_input]].mean(axis=0)
+
+    # Never recommend a skill the profile already has
+    exclude = [index.mask(combined_input) for combined_input in inputs]
+    ids, scores = get_searcher(index).search(queries, k, exclude)
+
+    results = []
+    for row, (cv_skills, _) in enumerate(profiles):
+        recommendations = []
+        if inputs[row]:
+            for i, score in zip(ids[row], scores[row]):
+                if i < 0:
+                    break
+                recommendations.append({
+                    "skill": index.skills[i],
+                    "score": round(float(score), 3),
+                    "reason": f"Recommended due to similarity with: {', '.join(cv_skills[:3])}"
+                })
+        results.append(recommendations)
+    return results
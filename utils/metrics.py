@@ -0,0 +1,233 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency histogram buckets (seconds); LLM stages run from tens of ms to minutes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 1000)
+
+# Set OTEL_TRACING=1 (with opentelemetry-api installed and configured) to emit a span per stage
+OTEL_TRACING = os.getenv("OTEL_TRACING", "0") == "1"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Metric):
+    """Gauge set directly, moved with inc/dec, or read from callbacks at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels):
+        with self._lock:
+            self._functions[_label_key(labels)] = function
+
+    @contextmanager
+    def track(self, **labels):
+        """Counts the block as in flight while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+            functions = list(self._functions.items())
+        for key, function in functions:
+            try:
+                items.append((key, float(function())))
+            except Exception:
+                continue
+        return self.header() + [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(series[0]), series[1], series[2])) for key, series in self._series.items()]
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def counter(name: str, documentation: str) -> Counter:
+    return registry.register(Counter(name, documentation))
+
+def gauge(name: str, documentation: str) -> Gauge:
+    return registry.register(Gauge(name, documentation))
+
+def histogram(name: str, documentation: str, buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, documentation, buckets))
+
+STAGE_SECONDS = histogram("skills_stage_seconds", "Time spent per pipeline stage")
+STAGE_ERRORS = counter("skills_stage_errors_total", "Pipeline stage failures")
+OLLAMA_TOKENS = counter("skills_ollama_tokens_total", "Tokens processed by Ollama, by phase (prompt or generation)")
+OLLAMA_TOKENS_PER_SECOND = histogram(
+    "skills_ollama_tokens_per_second", "Ollama throughput per request, by phase",
+    buckets=(5, 10, 20, 40, 80, 160, 320, 640, 1280, 2560, 5120)
+)
+IN_FLIGHT = gauge("skills_in_flight", "Work currently in progress, by kind")
+
+_tracer = None
+if OTEL_TRACING:
+    try:
+        from opentelemetry import trace
+        _tracer = trace.get_tracer("ai-skill-recommender")
+    except ImportError:
+        _tracer = None
+
+@contextmanager
+def stage_timer(stage: str, **attributes):
+    """
+    Times a pipeline stage into skills_stage_seconds{stage=...}, counts failures,
+    and wraps it in a trace span when tracing is enabled.
+    """
+    span = _tracer.start_as_current_span(stage, attributes=attributes) if _tracer is not None else None
+    if span is not None:
+        span.__enter__()
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        STAGE_ERRORS.inc(stage=stage)
+        if span is not None:
+            span.__exit__(type(e), e, e.__traceback__)
+            span = None
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        if span is not None:
+            span.__exit__(None, None, None)
+
+def observe_ollama(response: dict):
+    """Records the prompt-eval and generation timings Ollama reports on a final response"""
+    for phase, count_field, duration_field in (
+        ("prompt_eval", "prompt_eval_count", "prompt_eval_duration"),
+        ("generation", "eval_count", "eval_duration"),
+    ):
+        count = response.get(count_field)
+        duration = response.get(duration_field)
+        if duration:
+            seconds = duration / 1e9
+            STAGE_SECONDS.observe(seconds, stage=f"ollama_{phase}")
+            if count:
+                OLLAMA_TOKENS.inc(count, phase=phase)
+                OLLAMA_TOKENS_PER_SECOND.observe(count / seconds, phase=phase)
+    load = response.get("load_duration")
+    if load:
+        STAGE_SECONDS.observe(load / 1e9, stage="ollama_load")
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,194 @@
+import os
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bundled model directories at the repo root, with their hub fallbacks
+REPO_ROOT = Path(__file__).resolve().parent.parent
+LOCAL_MODEL_DIRS = {
+    "embedder": REPO_ROOT / "all-MiniLM-L6-v2",
+    "ner": REPO_ROOT / "dslim_bert_base_NER",
+}
+HUB_MODEL_IDS = {
+    "embedder": "sentence-transformers/all-MiniLM-L6-v2",
+    "ner": "dslim/bert-base-NER",
+}
+
+# Inference backend per model: torch, onnx, onnx-int8, openvino or openvino-int8.
+# MODEL_BACKEND sets both; EMBEDDER_BACKEND / NER_BACKEND override one model.
+BACKENDS = ("torch", "onnx", "onnx-int8", "openvino", "openvino-int8")
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch")
+MODEL_BACKENDS = {
+    "embedder": os.getenv("EMBEDDER_BACKEND", MODEL_BACKEND),
+    "ner": os.getenv("NER_BACKEND", MODEL_BACKEND),
+}
+
+TORCH_WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin")
+
+# Exported embedder files inside the model directory, per backend
+EMBEDDER_FILES = {
+    "onnx": "onnx/model.onnx",
+    "onnx-int8": "onnx/model_quint8_avx2.onnx",
+    "openvino": "openvino/openvino_model.xml",
+    "openvino-int8": "openvino/openvino_model_qint8_quantized.xml",
+}
+
+# BERT position limit; the bundled tokenizer config only carries the legacy max_len key
+NER_MAX_TOKENS = 512
+
+# Where dynamically quantized exports are written
+QUANTIZED_CACHE_DIR = REPO_ROOT / "data" / "model_cache"
+
+# One instance per (model, backend) per process. Workers forked after a preload share it copy-on-write.
+_models: Dict[Tuple[str, str], object] = {}
+_load_seconds: Dict[Tuple[str, str], float] = {}
+_sources: Dict[Tuple[str, str], str] = {}
+_lock = threading.Lock()
+_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+def _weight_files(name: str, backend: str) -> Tuple[str, ...]:
+    """Files that must exist locally for a backend, otherwise the hub copy is used"""
+    if backend == "torch" or (name == "ner" and backend.startswith("openvino")):
+        # There is no bundled OpenVINO NER export; it is converted from the torch weights
+        return TORCH_WEIGHT_FILES
+    if name == "embedder":
+        return (EMBEDDER_FILES[backend].replace(".xml", ".bin"),)
+    return ("onnx/model.onnx",)
+
+def model_source(name: str, backend: str = "torch") -> str:
+    """Local directory if it holds weights for the backend, otherwise the hub id"""
+    local_dir = LOCAL_MODEL_DIRS[name]
+    if any((local_dir / weights).exists() for weights in _weight_files(name, backend)):
+        return str(local_dir)
+    logger.info("No %s weights in %s, falling back to %s", backend, local_dir, HUB_MODEL_IDS[name])
+    return HUB_MODEL_IDS[name]
+
+def _load_embedder(source: str, backend: str):
+    from sentence_transformers import SentenceTransformer
+    if backend == "torch":
+        return SentenceTransformer(source)
+    return SentenceTransformer(
+        source,
+        backend=backend.split("-")[0],
+        model_kwargs={"file_name": EMBEDDER_FILES[backend]}
+    )
+
+def _onnx_file(source: str, file_name: str) -> Path:
+    local = Path(source) / file_name
+    if local.exists():
+        return local
+    from huggingface_hub import hf_hub_download
+    return Path(hf_hub_download(source, file_name))
+
+def _quantized_ner_onnx(source: str) -> Path:
+    """Dynamically quantizes the NER ONNX export to int8 once and caches it"""
+    target_dir = QUANTIZED_CACHE_DIR / "ner-onnx-int8"
+    target = target_dir / "model.onnx"
+    if not target.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from transformers import AutoConfig
+        target_dir.mkdir(parents=True, exist_ok=True)
+        logger.info("Quantizing NER ONNX model to int8 at %s", target)
+        quantize_dynamic(str(_onnx_file(source, "onnx/model.onnx")), str(target), weight_type=QuantType.QInt8)
+        AutoConfig.from_pretrained(source).save_pretrained(target_dir)
+    return target
+
+def _load_ner(source: str, backend: str):
+    ner = _build_ner_pipeline(source, backend)
+    # Windows for strided (chunked) inference are sized from this
+    ner.tokenizer.model_max_length = NER_MAX_TOKENS
+    return ner
+
+def _build_ner_pipeline(source: str, backend: str):
+    from transformers import AutoTokenizer, pipeline
+    if backend == "torch":
+        return pipeline("token-classification", model=source, aggregation_strategy="simple")
+
+    if backend.startswith("onnx"):
+        from optimum.onnxruntime import ORTModelForTokenClassification
+        if backend == "onnx-int8":
+            onnx_path = _quantized_ner_onnx(source)
+            model = ORTModelForTokenClassification.from_pretrained(onnx_path.parent, file_name=onnx_path.name)
+        else:
+            model = ORTModelForTokenClassification.from_pretrained(source, subfolder="onnx", file_name="model.onnx")
+        tokenizer = AutoTokenizer.from_pretrained(source, subfolder="onnx")
+    else:
+        from optimum.intel import OVModelForTokenClassification
+        model = OVModelForTokenClassification.from_pretrained(
+            source, export=True, load_in_8bit=backend == "openvino-int8"
+        )
+        tokenizer = AutoTokenizer.from_pretrained(source)
+    return pipeline("token-classification", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+
+_loaders = {
+    "embedder": _load_embedder,
+    "ner": _load_ner,
+}
+
+def get_model(name: str, backend: Optional[str] = None):
+    """Returns the named model on the given (or configured) backend, loading it on first use"""
+    backend = backend or MODEL_BACKENDS[name]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend for {name}: {backend}")
+    key = (name, backend)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        model = _models.get(key)
+        if model is None:
+            source = model_source(name, backend)
+            started = time.perf_counter()
+            model = _loaders[name](source, backend)
+            _load_seconds[key] = time.perf_counter() - started
+            _sources[key] = source
+            _models[key] = model
+            logger.info("Loaded %s model (%s) from %s in %.2fs", name, backend, source, _load_seconds[key])
+    return model
+
+def get_embedder():
+    """SentenceTransformer used for skill embeddings"""
+    return get_model("embedder")
+
+def get_ner_pipeline():
+    """transformers token-classification pipeline used for NER skill extraction"""
+    return get_model("ner")
+
+def embedder_signature() -> str:
+    """Identifies the configured embedder; vectors from different signatures are not mixed"""
+    backend = MODEL_BACKENDS["embedder"]
+    return "all-MiniLM-L6-v2" if backend == "torch" else f"all-MiniLM-L6-v2/{backend}"
+
+def warmup(names: Iterable[str] = ("embedder", "ner")):
+    """Loads the given models now instead of on the first request"""
+    for name in names:
+        try:
+            get_model(name)
+        except Exception as e:
+            logger.error("Failed to warm up %s model: %s", name, e)
+
+def warmup_in_background(names: Iterable[str] = ("embedder", "ner")) -> threading.Thread:
+    """Starts warmup() on a daemon thread so server startup is not blocked"""
+    thread = threading.Thread(target=warmup, args=(list(names),), name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def model_status() -> Dict[str, Dict[str, Optional[object]]]:
+    """Backend, load state, source and load time of every configured model"""
+    status = {}
+    for name, backend in MODEL_BACKENDS.items():
+        key = (name, backend)
+        status[name] = {
+            "backend": backend,
+            "loaded": key in _models,
+            "source": _sources.get(key),
+            "load_seconds": round(_load_seconds[key], 3) if key in _load_seconds else None,
+        }
+    return status
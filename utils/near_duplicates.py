@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+from functools import partial
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# "flag" reports near-duplicates, "reuse" also returns the stored skills of a (much closer) match,
+# "off" disables the index
+NEAR_DUP_MODE = os.getenv("NEAR_DUP_MODE", "flag")
+NEAR_DUP_DB = os.getenv("NEAR_DUP_DB", "data/near_duplicates.db")
+
+# Estimated Jaccard similarity of word-pair shingles above which two resumes count as the same CV.
+# Re-laid-out variants of one CV in Resumes/ score 0.67-0.84, unrelated resumes below 0.05.
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.5"))
+
+# Stored skills are only reused (mode "reuse") at or above this similarity. A one-word edit
+# ("Python and SQL" -> "Python and Java") still scores ~0.76, and an edited CV is exactly
+# one whose skills may have changed, so reuse is kept to copies that are practically identical.
+NEAR_DUP_REUSE_THRESHOLD = float(os.getenv("NEAR_DUP_REUSE_THRESHOLD", "0.97"))
+
+# MinHash signature length, split into LSH_BANDS bands of NUM_PERM / LSH_BANDS rows.
+# 64 bands x 4 rows makes a pair at similarity 0.5 a candidate with ~98% probability,
+# and one at 0.05 with ~0.04%, so lookups stay sub-linear.
+NUM_PERM = 256
+LSH_BANDS = 64
+SHINGLE_WORDS = 2
+
+NEAR_DUP_SEED = 20240917
+_WORD = re.compile(r"\w+")
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> np.ndarray:
+    """64-bit hashes of the lowercased word n-grams of a text (layout and punctuation ignored)"""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    hashes = {int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+              for gram in grams}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+class NearDuplicateMatch:
+    """A previously seen document similar to the query"""
+
+    def __init__(self, doc_id: int, name: Optional[str], similarity: float, result: Optional[dict]):
+        self.doc_id = doc_id
+        self.name = name
+        self.similarity = similarity
+        self.result = result
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH index over resume text, persisted in SQLite.
+    Each document's signature is split into bands; a band hashes to one
+    bucket row, so a lookup is one indexed query for LSH_BANDS buckets
+    followed by an exact signature comparison of the few candidates.
+    Stored results are tagged with a version and only reused under it.
+    """
+
+    def __init__(self, db_path: Optional[str] = NEAR_DUP_DB, threshold: float = NEAR_DUP_THRESHOLD,
+                 num_perm: int = NUM_PERM, bands: int = LSH_BANDS, version: str = "", mode: str = NEAR_DUP_MODE,
+                 reuse_threshold: float = NEAR_DUP_REUSE_THRESHOLD):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.reuse_threshold = max(reuse_threshold, threshold)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.version = version
+        self.mode = mode
+        # Multiply-shift hash family: (a * x + b) >> 32 over uint64 (wrapping) with odd a
+        rng = np.random.default_rng(NEAR_DUP_SEED)
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._resolving: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = None
+        self._stats = {"lookups": 0, "matches": 0, "reused": 0, "added": 0}
+        self._db = None
+        if mode != "off":
+            if db_path and db_path != ":memory:":
+                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS near_dup_docs ("
+                "id INTEGER PRIMARY KEY, name TEXT, signature BLOB NOT NULL, "
+                "result TEXT, version TEXT, created REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS near_dup_buckets (bucket INTEGER NOT NULL, doc_id INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_near_dup_bucket ON near_dup_buckets (bucket)")
+            self._db.commit()
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        MinHash signature (num_perm uint32 values) of the text's shingles, or None for
+        text without words: every such text would share one signature and match all others.
+        """
+        hashes = shingles(text)
+        if not len(hashes):
+            return None
+        with np.errstate(over="ignore"):
+            permuted = (hashes[:, None] * self._a[None, :] + self._b[None, :]) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _buckets(self, signature: np.ndarray) -> List[int]:
+        """One signed 64-bit bucket id per band (the band number is part of the hash)"""
+        buckets = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(band.to_bytes(2, "little") + rows, digest_size=8).digest()
+            buckets.append(int.from_bytes(digest, "little", signed=True))
+        return buckets
+
+    def query(self, text: str, signature: Optional[np.ndarray] = None) -> Optional[NearDuplicateMatch]:
+        """Most similar stored document at or above the threshold, or None"""
+        if self._db is None:
+            return None
+        signature = self.signature(text) if signature is None else signature
+        if signature is None:
+            return None
+        buckets = self._buckets(signature)
+        with self._lock:
+            self._stats["lookups"] += 1
+            placeholders = ",".join("?" * len(buckets))
+            rows = self._db.execute(
+                f"SELECT id, name, signature, result, version FROM near_dup_docs WHERE id IN "
+                f"(SELECT DISTINCT doc_id FROM near_dup_buckets WHERE bucket IN ({placeholders}))",
+                buckets
+            ).fetchall()
+        best = None
+        for doc_id, name, stored, result, version in rows:
+            similarity = float(np.mean(np.frombuffer(stored, dtype=np.uint32) == signature))
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                reusable = json.loads(result) if result is not None and version == self.version else None
+                best = NearDuplicateMatch(doc_id, name, round(similarity, 4), reusable)
+        if best is not None:
+            self._stats["matches"] += 1
+        return best
+
+    def add(self, text: str, name: Optional[str] = None, result: Optional[dict] = None,
+            signature: Optional[np.ndarray] = None) -> Optional[int]:
+        """Indexes a document (optionally with its skills) and returns its id, or None if it has no words"""
+        if self._db is None:
+            return None
+        signature = self.signature(text) if signature is None else signature
+        if signature is None:
+            return None
+        encoded = json.dumps(result, ensure_ascii=False) if result is not None else None
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO near_dup_docs (name, signature, result, version, created) VALUES (?, ?, ?, ?, ?)",
+                (name, signature.tobytes(), encoded, self.version, time.time())
+            )
+            doc_id = cursor.lastrowid
+            self._db.executemany(
+                "INSERT INTO near_dup_buckets (bucket, doc_id) VALUES (?, ?)",
+                [(bucket, doc_id) for bucket in self._buckets(signature)]
+            )
+            self._db.commit()
+            self._stats["added"] += 1
+        return doc_id
+
+    def set_result(self, doc_id: int, result: dict):
+        """Stores the skills extracted for an indexed document"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE near_dup_docs SET result = ?, version = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False), self.version, doc_id)
+            )
+            self._db.commit()
+
+    async def resolve(self, text: str, name: Optional[str],
+                      extract: Callable[[str], Awaitable[dict]]) -> Tuple[dict, Optional[NearDuplicateMatch]]:
+        """
+        Runs extract(text) unless a near-duplicate's skills can be reused (mode
+        "reuse", similarity at least reuse_threshold). Such a near-duplicate still
+        being extracted in this process is awaited rather than extracted twice.
+        New documents are indexed with their result. Returns (skills, match),
+        match being None when nothing similar was seen before. Index reads and
+        writes run in a thread, off the event loop.
+        """
+        if self._db is None:
+            return await extract(text), None
+
+        loop = asyncio.get_running_loop()
+        signature = await loop.run_in_executor(None, self.signature, text)
+        if signature is None:
+            # Nothing to compare: text without words is neither looked up nor indexed
+            return await extract(text), None
+        # Lookup and indexing are one step, so a copy arriving meanwhile finds the new
+        # document (and its pending extraction) instead of indexing a second one
+        async with self._resolve_lock(loop):
+            match = await loop.run_in_executor(None, self.query, text, signature)
+            if match is None:
+                doc_id = await loop.run_in_executor(None, partial(self.add, text, name, signature=signature))
+                future = loop.create_future()
+                self._pending[doc_id] = future
+
+        if match is not None and self.mode == "reuse" and match.similarity >= self.reuse_threshold:
+            if match.result is not None:
+                self._stats["reused"] += 1
+                return match.result, match
+            pending = self._pending.get(match.doc_id)
+            if pending is not None:
+                skills = await asyncio.shield(pending)
+                if skills is not None:
+                    self._stats["reused"] += 1
+                    return skills, match
+
+        if match is not None:
+            # The earlier document already represents this CV in the index. If its own
+            # extraction failed (or predates the current model), this result takes its place.
+            skills = await extract(text)
+            if match.result is None and match.doc_id not in self._pending and skills_found(skills):
+                await loop.run_in_executor(None, self.set_result, match.doc_id, skills)
+            return skills, match
+
+        skills = None
+        try:
+            skills = await extract(text)
+            if skills_found(skills):
+                await loop.run_in_executor(None, self.set_result, doc_id, skills)
+            return skills, None
+        finally:
+            # Waiters fall back to their own extraction if this one failed
+            future.set_result(skills if skills_found(skills) else None)
+            del self._pending[doc_id]
+
+    def _resolve_lock(self, loop: asyncio.AbstractEventLoop) -> asyncio.Lock:
+        """Lock serialising lookups on this event loop (the index may outlive a loop, e.g. across asyncio.run calls)"""
+        if self._resolving is None or self._resolving[0] is not loop:
+            self._resolving = (loop, asyncio.Lock())
+        return self._resolving[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            if self._db is not None:
+                stats["documents"] = self._db.execute("SELECT COUNT(*) FROM near_dup_docs").fetchone()[0]
+        stats["mode"] = self.mode
+        stats["threshold"] = self.threshold
+        stats["reuse_threshold"] = self.reuse_threshold
+        return stats
+
+def skills_found(skills: Optional[dict]) -> bool:
+    """True if an extraction produced at least one skill (failed extractions return an empty template)"""
+    if not isinstance(skills, dict):
+        return False
+    return any(values if isinstance(values, list) else skills_found(values) for values in skills.values())
+
+_index: Optional[NearDuplicateIndex] = None
+
+def get_near_duplicate_index(mode: Optional[str] = None) -> NearDuplicateIndex:
+    """Shared index, opened on first use; stored results are tied to the current Ollama model and prompt"""
+    global _index
+    from utils.extract_skills_ollama import ollama, PROMPT_VERSION
+    mode = mode or NEAR_DUP_MODE
+    if _index is None or _index.mode != mode:
+        _index = NearDuplicateIndex(version=f"{ollama.model}/{PROMPT_VERSION}", mode=mode)
+    return _index
@@ -0,0 +1,81 @@
+import re
+from typing import List, Tuple
+
+# Upper bound on resume text per LLM call (~1.5k tokens); larger resumes are split
+CHUNK_CHARS = 6000
+
+# Sections that never carry skills and are dropped before prompting. Personal details and
+# contact sections are kept: CVs often list spoken languages or a driving licence there.
+SKIP_SECTIONS = re.compile(r"^(references?|referees|declaration)$", re.IGNORECASE)
+
+_MARKDOWN_HEADING = re.compile(r"^\s{0,3}#{1,6}\s*(.*?)\s*#*\s*$")
+_BOLD_LINE = re.compile(r"^\s*\*\*(.+?)\*\*\s*:?\s*$")
+
+def _heading_text(line: str):
+    """Heading title if the line is a section heading, else None"""
+    match = _MARKDOWN_HEADING.match(line)
+    if match:
+        return match.group(1).strip("*_ :").strip()
+    match = _BOLD_LINE.match(line)
+    if match and len(match.group(1).split()) <= 5:
+        return match.group(1).strip("*_ :").strip()
+    stripped = line.strip().rstrip(":")
+    # pymupdf4llm often leaves plain ALL-CAPS headings such as "EXPERIENCE"
+    if stripped.isupper() and 1 <= len(stripped.split()) <= 4 and len(stripped) >= 3:
+        return stripped
+    return None
+
+def split_sections(markdown_text: str) -> List[Tuple[str, str]]:
+    """Splits pymupdf4llm markdown into (heading, text) sections, heading '' for the preamble"""
+    sections = []
+    heading, lines = "", []
+    for line in markdown_text.splitlines():
+        title = _heading_text(line)
+        if title is not None:
+            sections.append((heading, "\n".join(lines).strip()))
+            heading, lines = title, [line]
+        else:
+            lines.append(line)
+    sections.append((heading, "\n".join(lines).strip()))
+    return [(heading, text) for heading, text in sections if text]
+
+def is_boilerplate(heading: str) -> bool:
+    """True for sections with no skill content (references, declarations)"""
+    # Strip icon-font glyphs and punctuation pymupdf4llm leaves in front of headings
+    return bool(SKIP_SECTIONS.match(re.sub(r"^[\W_]+", "", heading).strip()))
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """Splits an oversized section on line boundaries (hard-cutting only single huge lines)"""
+    pieces, current = [], ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if len(current) + len(line) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current.strip():
+        pieces.append(current)
+    return pieces
+
+def chunk_resume(markdown_text: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    """
+    Drops boilerplate sections and packs the rest, in order, into chunks of
+    at most max_chars. A short resume comes back as a single chunk.
+    """
+    chunks, current = [], ""
+    for heading, text in split_sections(markdown_text):
+        if is_boilerplate(heading):
+            continue
+        for piece in _split_long(text, max_chars) if len(text) > max_chars else [text]:
+            if current and len(current) + len(piece) + 2 > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
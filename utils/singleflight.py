@@ -0,0 +1,57 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one in-flight task.
+    The first caller starts the work, later callers await the same task and
+    share its result (or exception). Nothing is kept once the task finishes,
+    so this removes simultaneous duplicate work rather than caching results.
+    """
+
+    def __init__(self):
+        # key -> [task, number of callers awaiting it]
+        self.flights: Dict[Hashable, list] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs factory() unless a call with this key is already in flight. A waiter
+        that is cancelled (e.g. its client disconnected) only cancels the shared
+        task when nobody else is still waiting on it.
+        """
+        self.calls += 1
+        flight = self.flights.get(key)
+        if flight is None:
+            self.executions += 1
+            flight = [asyncio.ensure_future(factory()), 0]
+            self.flights[key] = flight
+            flight[0].add_done_callback(lambda _: self._land(key, flight))
+        else:
+            self.coalesced += 1
+
+        task = flight[0]
+        flight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not task.done():
+                task.cancel()
+                self._land(key, flight)
+
+    def _land(self, key: Hashable, flight: list):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.flights),
+        }
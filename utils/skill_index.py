@@ -0,0 +1,186 @@
+import os
+import logging
+import json
+import hashlib
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Where the persisted index lives, and how vectors are stored on disk
+SKILL_INDEX_DIR = "data/skill_index"
+SKILL_INDEX_DTYPE = "float32"
+
+# Rows upcast per block when scoring a float16 index
+SCORE_BLOCK_ROWS = 65536
+
+EMBEDDINGS_FILE = "embeddings.npy"
+META_FILE = "skills.json"
+
+def skills_fingerprint(skills: Iterable[str]) -> str:
+    """Stable hash of a skill list, used to detect DB changes"""
+    digest = hashlib.sha1()
+    for skill in skills:
+        digest.update(skill.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def unique_skills(skill_db: Iterable[str]) -> List[str]:
+    """Drops duplicate and blank entries, keeping first-seen order"""
+    seen = set()
+    skills = []
+    for skill in skill_db:
+        if isinstance(skill, str) and skill.strip() and skill not in seen:
+            seen.add(skill)
+            skills.append(skill)
+    return skills
+
+class SkillIndex:
+    """
+    Normalized embeddings for every skill in the DB, one row per skill.
+    The matrix is memory-mapped when loaded from disk, so several
+    processes share the same pages.
+    """
+
+    def __init__(self, skills: List[str], embeddings: np.ndarray, model_name: str, fingerprint: Optional[str] = None):
+        self.skills = skills
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.fingerprint = fingerprint or skills_fingerprint(skills)
+        self.ids: Dict[str, int] = {skill: i for i, skill in enumerate(skills)}
+        # Search backend, attached lazily by utils.skill_search.get_searcher
+        self.searcher = None
+        # Directory the index was loaded from; search indexes are persisted next to it
+        self.index_dir: Optional[str] = None
+
+    def __len__(self):
+        return len(self.skills)
+
+    @classmethod
+    def load(cls, index_dir: str = SKILL_INDEX_DIR) -> Optional["SkillIndex"]:
+        """Loads a persisted index (memory-mapped), or None if there is none"""
+        index_dir = Path(index_dir)
+        meta_path = index_dir / META_FILE
+        embeddings_path = index_dir / EMBEDDINGS_FILE
+        if not meta_path.exists() or not embeddings_path.exists():
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        embeddings = np.load(embeddings_path, mmap_mode="r")
+        if embeddings.shape[0] != len(meta["skills"]):
+            logger.warning("Skill index at %s is inconsistent, ignoring it", index_dir)
+            return None
+        index = cls(meta["skills"], embeddings, meta["model"], meta["fingerprint"])
+        index.index_dir = str(index_dir)
+        return index
+
+    def save(self, index_dir: str = SKILL_INDEX_DIR):
+        """Writes the index atomically so readers never see a half-written file"""
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        # Per-process temporary names, so workers rebuilding at once never share a file
+        tmp_embeddings = index_dir / f"{EMBEDDINGS_FILE}.{os.getpid()}.tmp"
+        tmp_meta = index_dir / f"{META_FILE}.{os.getpid()}.tmp"
+        with open(tmp_embeddings, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.embeddings))
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({
+                "model": self.model_name,
+                "fingerprint": self.fingerprint,
+                "dtype": str(self.embeddings.dtype),
+                "skills": self.skills
+            }, f, ensure_ascii=False)
+        os.replace(tmp_embeddings, index_dir / EMBEDDINGS_FILE)
+        os.replace(tmp_meta, index_dir / META_FILE)
+
+    @classmethod
+    def build(cls, skill_db: Iterable[str], encode: Callable[[List[str]], np.ndarray], model_name: str,
+              previous: Optional["SkillIndex"] = None, dtype: str = SKILL_INDEX_DTYPE) -> "SkillIndex":
+        """
+        Builds an index for skill_db. Rows for skills already present in
+        previous (same model) are reused, so only new skills get encoded.
+        encode must return L2-normalized vectors.
+        """
+        skills = unique_skills(skill_db)
+        reusable = previous if previous is not None and previous.model_name == model_name else None
+
+        new_skills = [skill for skill in skills if reusable is None or skill not in reusable.ids]
+        new_embeddings = encode(new_skills) if new_skills else None
+        logger.info("Building skill index: %d skills, %d to encode", len(skills), len(new_skills))
+
+        if new_embeddings is not None:
+            dim = new_embeddings.shape[1]
+        else:
+            dim = reusable.embeddings.shape[1] if reusable is not None else 0
+        embeddings = np.empty((len(skills), dim), dtype=dtype)
+        new_row = 0
+        for i, skill in enumerate(skills):
+            if reusable is not None and skill in reusable.ids:
+                embeddings[i] = reusable.embeddings[reusable.ids[skill]]
+            else:
+                embeddings[i] = new_embeddings[new_row]
+                new_row += 1
+        return cls(skills, embeddings, model_name)
+
+    def mask(self, skills: Iterable[str]) -> List[int]:
+        """Row ids of the given skills that exist in the index"""
+        return [self.ids[skill] for skill in skills if skill in self.ids]
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """
+        Dot product of every skill vector with the query (cosine for normalized vectors).
+        A (d,) query gives (n,) scores, an (m, d) batch of queries gives (m, n).
+        """
+        query = np.asarray(query, dtype=np.float32)
+        queries = np.atleast_2d(query)
+        if self.embeddings.dtype == np.float32:
+            scores = queries @ self.embeddings.T
+        else:
+            scores = np.empty((len(queries), len(self.skills)), dtype=np.float32)
+            for start in range(0, len(self.skills), SCORE_BLOCK_ROWS):
+                block = np.asarray(self.embeddings[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+                scores[:, start:start + len(block)] = queries @ block.T
+        return scores[0] if query.ndim == 1 else scores
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores along the last axis, best first.
+    Uses argpartition, so only the k winners are sorted.
+    """
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape).copy()
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1)
+
+def load_or_build_index(skill_db: Iterable[str], encode: Callable[[List[str]], np.ndarray], model_name: str,
+                        index_dir: Optional[str] = SKILL_INDEX_DIR) -> SkillIndex:
+    """
+    Returns the persisted index if it matches skill_db, otherwise rebuilds it
+    incrementally from the persisted one and saves the result.
+    """
+    skills = unique_skills(skill_db)
+    previous = SkillIndex.load(index_dir) if index_dir else None
+    if previous is not None and previous.model_name == model_name and previous.fingerprint == skills_fingerprint(skills):
+        return previous
+
+    index = SkillIndex.build(skills, encode, model_name, previous=previous)
+    if index_dir:
+        index.save(index_dir)
+        # Reload so the serving copy is memory-mapped rather than private memory
+        index = SkillIndex.load(index_dir)
+    return index
+
+if __name__ == "__main__":
+    from utils.match_skills import load_skill_db, get_skill_index
+    from utils.skill_search import get_searcher
+    index = get_skill_index(load_skill_db())
+    searcher = get_searcher(index)
+    print(f"✅ Skill index ready: {len(index)} skills, dim {index.embeddings.shape[1]}, "
+          f"{searcher.name} search, stored in {index.index_dir}")
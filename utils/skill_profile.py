@@ -0,0 +1,219 @@
+import sys
+import threading
+import numpy as np
+from array import array
+from typing import Dict, Iterable, List, Optional, Union
+
+# Key paths of every skill list in the SkillsResponse schema, in response order
+SKILL_CATEGORIES = (
+    ("technical_skills", "programming_languages"),
+    ("technical_skills", "frameworks"),
+    ("technical_skills", "databases"),
+    ("technical_skills", "devops_tools"),
+    ("technical_skills", "data_science_tools"),
+    ("technical_skills", "design_tools"),
+    ("platforms",),
+    ("soft_skills",),
+    ("certifications",),
+    ("languages",),
+    ("domain_skills",),
+)
+
+class SkillVocabulary:
+    """
+    Interns skill strings to dense integer IDs shared by every profile, so
+    "Python" is stored once however many resumes mention it. Each spelling
+    keeps its own ID (responses preserve the model's casing); `canonical`
+    maps it to the first spelling with the same stripped, casefolded text,
+    which is the identity used for deduplication and set operations.
+    IDs are only meaningful within one process, and the vocabulary never
+    shrinks: only intern skills of profiles that are retained (SkillProfile),
+    never every response on the serving path.
+    """
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self.canonical = array("I")
+        self._ids: Dict[str, int] = {}
+        self._folded: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def __getitem__(self, skill_id: int) -> str:
+        return self.strings[skill_id]
+
+    def intern(self, skill: str) -> int:
+        """ID of a non-blank skill string, assigning one on first sight"""
+        skill_id = self._ids.get(skill)
+        if skill_id is not None:
+            return skill_id
+        with self._lock:
+            skill_id = self._ids.get(skill)
+            if skill_id is None:
+                skill_id = len(self.strings)
+                skill = sys.intern(skill)
+                canonical_id = self._folded.setdefault(skill.strip().casefold(), skill_id)
+                self.canonical.append(canonical_id)
+                self.strings.append(skill)
+                self._ids[skill] = skill_id
+        return skill_id
+
+    def lookup(self, skill: str) -> Optional[int]:
+        """Canonical ID of a skill in any casing, or None if it was never seen"""
+        return self._folded.get(skill.strip().casefold())
+
+    def intern_list(self, items) -> List[int]:
+        """
+        IDs of the non-blank strings of a model-produced list, keeping the
+        first spelling of case-insensitive duplicates. Strings seen before
+        resolve with one dict lookup each; anything else is skipped.
+        """
+        if not isinstance(items, list):
+            return []
+        try:
+            ids = list(map(self._ids.get, items))
+        except TypeError:
+            ids = [None]
+        if None in ids:
+            ids = [self.intern(item) for item in items if isinstance(item, str) and item.strip()]
+
+        folded = list(map(self.canonical.__getitem__, ids))
+        if len(set(folded)) == len(folded):
+            return ids
+        first = {}
+        for key, skill_id in zip(folded, ids):
+            first.setdefault(key, skill_id)
+        return list(first.values())
+
+    def canonical_ids(self, ids: Iterable[int]) -> np.ndarray:
+        """Sorted, unique canonical IDs for a sequence of IDs"""
+        canonical = self.canonical
+        return np.unique(np.fromiter((canonical[skill_id] for skill_id in ids), dtype=np.uint32))
+
+    def strings_for(self, ids: Iterable[int]) -> List[str]:
+        strings = self.strings
+        return [strings[skill_id] for skill_id in ids]
+
+    def stats(self) -> dict:
+        return {"skills": len(self.strings), "distinct": len(self._folded)}
+
+vocabulary = SkillVocabulary()
+
+class SkillProfile:
+    """
+    One resume's skills as interned IDs: every category's IDs back to back in
+    a single uint32 array, with the category boundaries in a uint16 array.
+    Converts to and from the SkillsResponse JSON, and supports case-insensitive
+    overlap / gap / union against other profiles or plain skill lists.
+    """
+
+    __slots__ = ("ids", "offsets")
+
+    def __init__(self, ids: array, offsets: array):
+        self.ids = ids
+        self.offsets = offsets
+
+    @classmethod
+    def from_skills(cls, skills) -> "SkillProfile":
+        """
+        Builds a profile from a skills dict (raw model output or SkillsResponse
+        JSON) or a SkillsResponse model. Missing or malformed categories are empty.
+        """
+        if hasattr(skills, "model_dump"):
+            skills = skills.model_dump()
+        elif hasattr(skills, "dict"):
+            skills = skills.dict()
+        ids = array("I")
+        offsets = array("H", [0])
+        for path in SKILL_CATEGORIES:
+            items = skills if isinstance(skills, dict) else None
+            for key in path:
+                items = items.get(key) if isinstance(items, dict) else None
+            ids.extend(vocabulary.intern_list(items))
+            offsets.append(len(ids))
+        return cls(ids, offsets)
+
+    @classmethod
+    def from_skill_list(cls, skills: Iterable[str], category: tuple = ("domain_skills",)) -> "SkillProfile":
+        """A profile holding a flat list of skills (e.g. a role's requirements) in one category"""
+        return cls.from_skills(_nest(category, list(skills)))
+
+    def category(self, path: tuple) -> List[str]:
+        position = SKILL_CATEGORIES.index(path)
+        return vocabulary.strings_for(self.ids[self.offsets[position]:self.offsets[position + 1]])
+
+    def to_skills(self) -> Dict[str, Union[Dict[str, List[str]], List[str]]]:
+        """The SkillsResponse JSON for this profile"""
+        skills = {"technical_skills": {}}
+        strings = vocabulary.strings
+        for position, path in enumerate(SKILL_CATEGORIES):
+            items = [strings[skill_id] for skill_id in self.ids[self.offsets[position]:self.offsets[position + 1]]]
+            if len(path) == 2:
+                skills[path[0]][path[1]] = items
+            else:
+                skills[path[0]] = items
+        return skills
+
+    def skills(self) -> List[str]:
+        """Every skill of the profile, category by category"""
+        return vocabulary.strings_for(self.ids)
+
+    def skill_ids(self) -> np.ndarray:
+        """Sorted, unique canonical IDs of every skill in the profile"""
+        return vocabulary.canonical_ids(self.ids)
+
+    def overlap(self, other: Union["SkillProfile", Iterable[str]]) -> List[str]:
+        """Skills both have"""
+        return vocabulary.strings_for(np.intersect1d(self.skill_ids(), skill_ids_of(other), assume_unique=True))
+
+    def gap(self, other: Union["SkillProfile", Iterable[str]]) -> List[str]:
+        """Skills other has that this profile lacks, e.g. a role's missing requirements"""
+        return vocabulary.strings_for(np.setdiff1d(skill_ids_of(other), self.skill_ids(), assume_unique=True))
+
+    def union(self, other: Union["SkillProfile", Iterable[str]]) -> List[str]:
+        return vocabulary.strings_for(np.union1d(self.skill_ids(), skill_ids_of(other)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, skill: str) -> bool:
+        skill_id = vocabulary.lookup(skill)
+        canonical = vocabulary.canonical
+        return skill_id is not None and any(canonical[own] == skill_id for own in self.ids)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, SkillProfile) and self.ids == other.ids and self.offsets == other.offsets
+
+    def __repr__(self) -> str:
+        return f"SkillProfile({len(self.ids)} skills)"
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by this profile (strings live once in the vocabulary)"""
+        return sys.getsizeof(self) + sys.getsizeof(self.ids) + sys.getsizeof(self.offsets)
+
+def _nest(path: tuple, items: List[str]) -> dict:
+    return {path[0]: {path[1]: items}} if len(path) == 2 else {path[0]: items}
+
+def skill_ids_of(skills: Union[SkillProfile, Iterable[str]]) -> np.ndarray:
+    """Sorted, unique canonical IDs of a profile or a plain list of skill strings"""
+    if isinstance(skills, SkillProfile):
+        return skills.skill_ids()
+    return vocabulary.canonical_ids(vocabulary.intern_list(list(skills)))
+
+def union_skills(*groups: Union[SkillProfile, Iterable[str]]) -> List[str]:
+    """
+    Case-insensitive union of profiles and / or skill lists, one spelling per
+    skill (the first seen). Plain lists are not interned, so arbitrary request
+    input does not grow the vocabulary.
+    """
+    union = {}
+    for group in groups:
+        for skill in group.skills() if isinstance(group, SkillProfile) else group:
+            if isinstance(skill, str):
+                key = skill.strip().casefold()
+                if key:
+                    union.setdefault(key, skill)
+    return list(union.values())
@@ -0,0 +1,280 @@
+import os
+import logging
+import json
+import threading
+import numpy as np
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+from utils.skill_index import SkillIndex, top_k
+
+logger = logging.getLogger(__name__)
+
+# "exact", "ivfpq", or "auto" (exact below ANN_MIN_SKILLS, ivfpq above)
+SKILL_SEARCH_BACKEND = os.getenv("SKILL_SEARCH_BACKEND", "auto")
+ANN_MIN_SKILLS = 50000
+
+# Upper bound on score matrix cells per exact batch (queries x skills), ~256 MB of float32
+SCORE_BUDGET = 64 * 1024 * 1024
+
+# IVF-PQ parameters
+IVF_NPROBE = 16
+PQ_SUBQUANTIZERS = 48
+PQ_CENTROIDS = 256
+KMEANS_ITERATIONS = 12
+KMEANS_SAMPLES_PER_CLUSTER = 64
+RERANK_FACTOR = 32
+
+IVFPQ_DIR = "ivfpq"
+
+SearchResult = Tuple[np.ndarray, np.ndarray]
+
+class ExactSearch:
+    """Brute-force inner product over the whole index"""
+
+    name = "exact"
+
+    def __init__(self, index: SkillIndex):
+        self.index = index
+
+    def search(self, queries: np.ndarray, k: int, exclude: Sequence[List[int]]) -> SearchResult:
+        """
+        Returns (ids, scores), both (m, k), best first. Rows with fewer than
+        k valid hits are padded with id -1 and score -inf.
+        """
+        n = len(self.index)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        chunk_size = max(1, SCORE_BUDGET // max(n, 1))
+        for start in range(0, len(queries), chunk_size):
+            chunk = self.index.scores(queries[start:start + chunk_size])
+            for row in range(len(chunk)):
+                chunk[row, exclude[start + row]] = -np.inf
+            winners = top_k(chunk, k)
+            width = winners.shape[1]
+            ids[start:start + len(chunk), :width] = winners
+            scores[start:start + len(chunk), :width] = np.take_along_axis(chunk, winners, axis=1)
+        ids[~np.isfinite(scores)] = -1
+        return ids, scores
+
+def _cluster_sums(data: np.ndarray, assignment: np.ndarray, clusters: int) -> np.ndarray:
+    """Per-cluster sum of the rows of data (column-wise bincount, much faster than np.add.at)"""
+    return np.stack([np.bincount(assignment, weights=data[:, d], minlength=clusters)
+                     for d in range(data.shape[1])], axis=1).astype(np.float32)
+
+def _spherical_kmeans(data: np.ndarray, clusters: int, iterations: int, rng) -> np.ndarray:
+    """k-means on the unit sphere (assignment by max inner product)"""
+    centroids = data[rng.choice(len(data), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(data @ centroids.T, axis=1)
+        sums = _cluster_sums(data, assignment, clusters)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        centroids = np.where(empty[:, None], centroids, sums / np.maximum(norms, 1e-12))
+    return centroids.astype(np.float32)
+
+def _kmeans(data: np.ndarray, clusters: int, iterations: int, rng) -> np.ndarray:
+    """Plain L2 k-means, used for the product quantizer codebooks"""
+    clusters = min(clusters, len(data))
+    centroids = data[rng.choice(len(data), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        distances = (data ** 2).sum(1)[:, None] - 2 * data @ centroids.T + (centroids ** 2).sum(1)[None, :]
+        assignment = np.argmin(distances, axis=1)
+        counts = np.bincount(assignment, minlength=clusters)
+        sums = _cluster_sums(data, assignment, clusters)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids.astype(np.float32)
+
+def _pick_subquantizers(dim: int, wanted: int) -> int:
+    for m in range(min(wanted, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+class IVFPQSearch:
+    """
+    Inverted file index with product-quantized residuals.
+    Each query probes the nprobe closest coarse lists, scores their members
+    from uint8 PQ codes via per-query lookup tables, and reranks the best
+    candidates exactly against the stored vectors.
+    """
+
+    name = "ivfpq"
+
+    def __init__(self, index: SkillIndex, centroids: np.ndarray, codebooks: np.ndarray,
+                 codes: np.ndarray, list_offsets: np.ndarray, list_ids: np.ndarray,
+                 nprobe: int = IVF_NPROBE, rerank_factor: int = RERANK_FACTOR):
+        self.index = index
+        self.centroids = centroids
+        self.codebooks = codebooks
+        self.codes = codes
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.nprobe = nprobe
+        self.rerank_factor = rerank_factor
+
+    @classmethod
+    def train(cls, index: SkillIndex, nlist: Optional[int] = None, subquantizers: int = PQ_SUBQUANTIZERS,
+              previous: Optional["IVFPQSearch"] = None, seed: int = 0) -> "IVFPQSearch":
+        """
+        Trains the coarse quantizer and PQ codebooks on a sample of the index,
+        then encodes every vector. Quantizers from previous are reused when
+        the dimension matches, so a DB update only re-encodes.
+        """
+        rng = np.random.default_rng(seed)
+        data = np.asarray(index.embeddings, dtype=np.float32)
+        n, dim = data.shape
+
+        if previous is not None and previous.centroids.shape[1] == dim:
+            centroids, codebooks = previous.centroids, previous.codebooks
+        else:
+            nlist = nlist or max(1, min(n, int(4 * np.sqrt(n))))
+            logger.info("Training IVF-PQ: %d vectors, %d lists", n, nlist)
+            sample = data[rng.choice(n, min(n, KMEANS_SAMPLES_PER_CLUSTER * nlist), replace=False)]
+            centroids = _spherical_kmeans(sample, nlist, KMEANS_ITERATIONS, rng)
+            sample = sample[:KMEANS_SAMPLES_PER_CLUSTER * PQ_CENTROIDS]
+            residuals = sample - centroids[np.argmax(sample @ centroids.T, axis=1)]
+            m = _pick_subquantizers(dim, subquantizers)
+            sub_dim = dim // m
+            codebooks = np.zeros((m, PQ_CENTROIDS, sub_dim), dtype=np.float32)
+            for j in range(m):
+                trained = _kmeans(residuals[:, j * sub_dim:(j + 1) * sub_dim], PQ_CENTROIDS, KMEANS_ITERATIONS, rng)
+                codebooks[j, :len(trained)] = trained
+
+        assignment = np.empty(n, dtype=np.int64)
+        codes = np.empty((n, codebooks.shape[0]), dtype=np.uint8)
+        sub_dim = codebooks.shape[2]
+        for start in range(0, n, 65536):
+            block = data[start:start + 65536]
+            lists = np.argmax(block @ centroids.T, axis=1)
+            residuals = block - centroids[lists]
+            assignment[start:start + len(block)] = lists
+            for j in range(codebooks.shape[0]):
+                sub = residuals[:, j * sub_dim:(j + 1) * sub_dim]
+                book = codebooks[j]
+                distances = -2 * sub @ book.T + (book ** 2).sum(1)[None, :]
+                codes[start:start + len(block), j] = np.argmin(distances, axis=1)
+
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=len(centroids))
+        list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(index, centroids, codebooks, codes[order], list_offsets, order.astype(np.int64))
+
+    def save(self, path: str):
+        """Persists the quantizers and codes as plain .npy files (memory-mappable)"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ("centroids", "codebooks", "codes", "list_offsets", "list_ids"):
+            # Per-process temporary name, so workers saving at once never share a file
+            tmp = path / f"{name}.npy.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, getattr(self, name))
+            os.replace(tmp, path / f"{name}.npy")
+        tmp = path / f"meta.json.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.index.fingerprint, "model": self.index.model_name, "nprobe": self.nprobe}, f)
+        os.replace(tmp, path / "meta.json")
+
+    @classmethod
+    def load(cls, index: SkillIndex, path: str) -> Optional["IVFPQSearch"]:
+        """
+        Loads a persisted IVF-PQ index, or None if there is none or it was trained
+        on another embedder's vectors. If it was built for a different skill list,
+        codes is None and only the quantizers are reusable.
+        """
+        path = Path(path)
+        if not (path / "meta.json").exists():
+            return None
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != index.model_name:
+            # Quantizers and codes describe a different vector space
+            return None
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r")
+                  for name in ("centroids", "codebooks", "codes", "list_offsets", "list_ids")}
+        searcher = cls(index, nprobe=meta.get("nprobe", IVF_NPROBE), **arrays)
+        if meta["fingerprint"] != index.fingerprint:
+            # Stale codes, but the quantizers are still usable for a re-encode
+            searcher.codes = None
+        return searcher
+
+    def search(self, queries: np.ndarray, k: int, exclude: Sequence[List[int]],
+               nprobe: Optional[int] = None) -> SearchResult:
+        """Same contract as ExactSearch.search"""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        sub_dim = self.codebooks.shape[2]
+        m = self.codebooks.shape[0]
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        coarse = queries @ np.asarray(self.centroids).T
+        probes = top_k(coarse, nprobe)
+        for row, query in enumerate(queries):
+            # Lookup tables: inner product of each query slice with every codeword
+            lut = np.einsum("md,mcd->mc", query.reshape(m, sub_dim), self.codebooks)
+
+            candidate_ids = []
+            candidate_scores = []
+            for lst in probes[row]:
+                start, end = self.list_offsets[lst], self.list_offsets[lst + 1]
+                if start == end:
+                    continue
+                codes = self.codes[start:end]
+                candidate_ids.append(self.list_ids[start:end])
+                candidate_scores.append(coarse[row, lst] + lut[np.arange(m), codes].sum(axis=1))
+            if not candidate_ids:
+                continue
+            candidate_ids = np.concatenate(candidate_ids)
+            candidate_scores = np.concatenate(candidate_scores)
+
+            candidate_scores[np.isin(candidate_ids, exclude[row])] = -np.inf
+
+            # Rerank the best approximate hits exactly (sorted ids keep mmap reads sequential)
+            best = top_k(candidate_scores, k * self.rerank_factor)
+            shortlist = np.sort(candidate_ids[best[np.isfinite(candidate_scores[best])]])
+            if not len(shortlist):
+                continue
+            exact = np.asarray(self.index.embeddings[shortlist], dtype=np.float32) @ query
+            best = top_k(exact, k)
+            ids[row, :len(best)] = shortlist[best]
+            scores[row, :len(best)] = exact[best]
+        return ids, scores
+
+# Serialises searcher construction, so concurrent first queries train IVF-PQ only once
+_searcher_lock = threading.Lock()
+
+def get_searcher(index: SkillIndex, backend: str = SKILL_SEARCH_BACKEND, index_dir: Optional[str] = None):
+    """
+    Returns the search backend for an index, cached on the index object.
+    IVF-PQ indexes are persisted under index_dir, by default next to the skill
+    index in the directory it was loaded from (not persisted if it has none).
+    """
+    if backend == "auto":
+        backend = "ivfpq" if len(index) >= ANN_MIN_SKILLS else "exact"
+
+    searcher = index.searcher
+    if searcher is not None and searcher.name == backend:
+        return searcher
+
+    with _searcher_lock:
+        # Another thread may have built it while this one waited
+        searcher = index.searcher
+        if searcher is not None and searcher.name == backend:
+            return searcher
+        searcher = _build_searcher(index, backend, index_dir if index_dir is not None else index.index_dir)
+        index.searcher = searcher
+    return searcher
+
+def _build_searcher(index: SkillIndex, backend: str, index_dir: Optional[str]):
+    if backend == "exact":
+        searcher = ExactSearch(index)
+    elif backend == "ivfpq":
+        ann_dir = Path(index_dir) / IVFPQ_DIR if index_dir else None
+        searcher = IVFPQSearch.load(index, ann_dir) if ann_dir else None
+        if searcher is None or searcher.codes is None:
+            searcher = IVFPQSearch.train(index, previous=searcher)
+            if ann_dir:
+                searcher.save(ann_dir)
+    else:
+        raise ValueError(f"Unknown skill search backend: {backend}")
+    return searcher
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+def normalize_text(text: str) -> str:
+    """Normalizes resume text so re-uploads of the same document hash identically"""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+def make_cache_key(text: str, model: str, prompt_version: int, options: dict) -> str:
+    """Content-addressed key: hash of the normalized text plus everything that affects the output"""
+    material = json.dumps({
+        "text": normalize_text(text),
+        "model": model,
+        "prompt_version": prompt_version,
+        "options": options
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class SkillsCache:
+    """
+    Two-tier result cache for skill extraction.
+    Tier 1 is an in-memory LRU, tier 2 an optional SQLite file with
+    size-based eviction. Both tiers honour the same TTL.
+    """
+
+    def __init__(self, max_entries: int = 1024, db_path: Optional[str] = None,
+                 max_db_bytes: int = 256 * 1024 * 1024, ttl_seconds: Optional[float] = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.max_db_bytes = max_db_bytes
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "saved_seconds": 0.0
+        }
+        self.db_path = db_path
+        if db_path:
+            self._connect()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS skills_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "cost REAL NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_skills_cache_access ON skills_cache (last_access)")
+        self._db.commit()
+
+    def reopen(self):
+        """Opens a fresh SQLite connection; call in a forked worker, connections must not cross a fork"""
+        if self.db_path:
+            with self._lock:
+                self._connect()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[dict]:
+        """Returns a fresh copy of the cached result, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, cost, created = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    self._stats["saved_seconds"] += cost
+                    return json.loads(value)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, cost, created FROM skills_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, cost, created = row
+                    if not self._expired(created, now):
+                        self._db.execute("UPDATE skills_cache SET last_access = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, value, cost, created)
+                        self._stats["disk_hits"] += 1
+                        self._stats["saved_seconds"] += cost
+                        return json.loads(value)
+                    self._db.execute("DELETE FROM skills_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: dict, cost: float = 0.0):
+        """Stores a result; cost is the generation time in seconds a future hit will save"""
+        now = time.time()
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, encoded, cost, now)
+            self._stats["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO skills_cache (key, value, size, cost, created, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, encoded, len(encoded), cost, now, now)
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def _remember(self, key: str, encoded: str, cost: float, created: float):
+        self._memory[key] = (encoded, cost, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self):
+        """Drops expired rows, then least recently used rows until under max_db_bytes"""
+        if self.ttl_seconds is not None:
+            self._db.execute("DELETE FROM skills_cache WHERE created < ?", (time.time() - self.ttl_seconds,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM skills_cache").fetchone()[0]
+        if total <= self.max_db_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM skills_cache ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if total <= self.max_db_bytes:
+                break
+            self._db.execute("DELETE FROM skills_cache WHERE key = ?", (key,))
+            total -= size
+            self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                count, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM skills_cache"
+                ).fetchone()
+                stats["disk_entries"] = count
+                stats["disk_bytes"] = size
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["saved_seconds"] = round(stats["saved_seconds"], 3)
+        return stats
+
+    def clear(self):
+        """Empties both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM skills_cache")
+                self._db.commit()